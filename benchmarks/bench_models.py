@@ -0,0 +1,150 @@
+#
+# Benchmarks of each stage of a simulation, from building the model to processing
+# the solution
+#
+import itertools
+
+import numpy as np
+import pybamm
+import pytest
+
+import encapsulated_ltes as ltes
+
+MODELS = {"ReducedModel": ltes.ReducedModel, "FullModel": ltes.FullModel}
+
+T_INTERP = np.linspace(0, 10000, 1001)
+
+#: Inputs of the reduced-order model, with the values of its training set
+ROM_INPUTS = {
+    "Inlet temperature [K]": [340, 345, 350],
+    "Inlet velocity [m.s-1]": [5e-4, 7.5e-4, 1e-3],
+}
+
+
+def get_var_pts(model, mesh_level):
+    """The mesh of examples/mesh_refinement.py at the given level"""
+    return {
+        model.variables["r [m]"]: 10 * 2**mesh_level,
+        model.variables["x [m]"]: 20 * 2**mesh_level,
+    }
+
+
+def set_parameters(model_name, parameter_set):
+    """Returns a new model and its parameterised copy and geometry"""
+    model = MODELS[model_name]()
+    parameter_values = ltes.get_parameter_values(parameter_set)
+    geometry = model.default_geometry
+    parameterised = parameter_values.process_model(
+        model, inplace=False, delayed_variable_processing=True
+    )
+    parameter_values.process_geometry(geometry)
+    return model, parameterised, geometry
+
+
+def discretise(model, parameterised, geometry, var_pts):
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, var_pts)
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    return disc.process_model(
+        parameterised, inplace=False, delayed_variable_processing=True
+    )
+
+
+def get_simulation(model_name, parameter_set, mesh_level):
+    """Returns a new simulation, built but not solved"""
+    model = MODELS[model_name]()
+    sim = ltes.LTESSimulation(
+        model,
+        parameter_values=ltes.get_parameter_values(parameter_set),
+        var_pts=get_var_pts(model, mesh_level),
+    )
+    sim.build()
+    return sim
+
+
+def solve(sim):
+    return sim.solve([0, 10000], t_interp=T_INTERP)
+
+
+def process(solution):
+    """Process all the variables, as the plotting functions do"""
+    return [solution[name].entries for name in solution.all_models[0].variables]
+
+
+@pytest.mark.parametrize("model_name", MODELS)
+def test_model_construction(benchmark, measure_memory, model_name):
+    benchmark(MODELS[model_name])
+    measure_memory(MODELS[model_name])
+
+
+@pytest.mark.parametrize("model_name", MODELS)
+def test_parameter_processing(benchmark, measure_memory, model_name, parameter_set):
+    def setup():
+        model = MODELS[model_name]()
+        return (ltes.get_parameter_values(parameter_set), model), {}
+
+    def process_model(parameter_values, model):
+        parameter_values.process_model(
+            model, inplace=False, delayed_variable_processing=True
+        )
+
+    benchmark.pedantic(process_model, setup=setup, rounds=5)
+    measure_memory(process_model, *setup()[0])
+
+
+@pytest.mark.parametrize("model_name", MODELS)
+def test_discretisation(
+    benchmark, measure_memory, model_name, parameter_set, mesh_level
+):
+    def setup():
+        model, parameterised, geometry = set_parameters(model_name, parameter_set)
+        return (model, parameterised, geometry, get_var_pts(model, mesh_level)), {}
+
+    benchmark.pedantic(discretise, setup=setup, rounds=5)
+    measure_memory(discretise, *setup()[0])
+
+
+@pytest.mark.parametrize("model_name", MODELS)
+def test_solve(benchmark, measure_memory, model_name, parameter_set, mesh_level):
+    # The set-up of the solver is included, as it is paid by every new simulation
+    def setup():
+        return (get_simulation(model_name, parameter_set, mesh_level),), {}
+
+    benchmark.pedantic(solve, setup=setup, rounds=3)
+    measure_memory(solve, *setup()[0])
+
+
+@pytest.mark.parametrize("model_name", MODELS)
+def test_post_processing(
+    benchmark, measure_memory, model_name, parameter_set, mesh_level
+):
+    solution = solve(get_simulation(model_name, parameter_set, mesh_level))
+
+    # Copies of the solution don't keep the processed variables
+    def setup():
+        return (solution.copy(),), {}
+
+    benchmark.pedantic(process, setup=setup, rounds=5)
+    measure_memory(process, solution.copy())
+
+
+def test_reduced_order_model(benchmark, mesh_level):
+    # The speed-up over the full model is stored with the timings
+    model = ltes.FullModel(options={"closures": "smooth"})
+    sim = ltes.LTESSimulation(
+        model, var_pts=get_var_pts(model, mesh_level), inputs=list(ROM_INPUTS)
+    )
+    rom = ltes.ReducedOrderModel(sim, seed=0)
+    t = np.linspace(0, 6000, 61)
+    rom.train(
+        [
+            dict(zip(ROM_INPUTS, values))
+            for values in itertools.product(*ROM_INPUTS.values())
+        ],
+        t,
+    )
+    # inputs outside the training set
+    inputs = dict(zip(ROM_INPUTS, (343, 6.3e-4)))
+    variables = ["Outlet temperature [K]"]
+    report = rom.validate(t, inputs, variables=variables)
+    benchmark.extra_info["speed-up"] = report["Speed-up"]
+    benchmark(rom.solve, t, inputs, variables=variables)
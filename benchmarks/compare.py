@@ -0,0 +1,103 @@
+#
+# Comparison of benchmark results against a stored baseline
+#
+import argparse
+import json
+import sys
+from pathlib import Path
+
+#: Default location of the baseline, saved with ``nox -s benchmarks -- --save``
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def load(path):
+    """Returns the mean time and peak memory of each benchmark of a results file"""
+    with Path(path).open() as f:
+        benchmarks = json.load(f)["benchmarks"]
+    return {
+        benchmark["fullname"]: {
+            "time [s]": benchmark["stats"]["mean"],
+            "peak memory [MB]": benchmark["extra_info"].get("peak memory [MB]"),
+        }
+        for benchmark in benchmarks
+    }
+
+
+def compare(results, baseline, time_tolerance=0.2, memory_tolerance=0.1):
+    """
+    Compares the results of the benchmarks against the baseline.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        The results, as returned by :func:`load`
+    time_tolerance, memory_tolerance : float, optional
+        The relative increase of the mean time (default is 20%) and of the peak
+        memory (default is 10%) above which a benchmark is a regression
+
+    Returns
+    -------
+    rows : list of tuple
+        The name, baseline, result and ratio of each metric of each benchmark
+    regressions : list of str
+        The metrics of the benchmarks which regressed
+    """
+    tolerances = {"time [s]": time_tolerance, "peak memory [MB]": memory_tolerance}
+    rows = []
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric, tolerance in tolerances.items():
+            old, new = baseline[name][metric], result[metric]
+            if not old or new is None:
+                continue
+            ratio = new / old
+            rows.append((name, metric, old, new, ratio))
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} ({metric}: {ratio:.2f}x)")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare benchmark results (from pytest --benchmark-json) "
+        "against a baseline"
+    )
+    parser.add_argument("results", help="The benchmark results")
+    parser.add_argument("--baseline", default=BASELINE, help="The baseline results")
+    parser.add_argument("--time-tolerance", type=float, default=0.2)
+    parser.add_argument("--memory-tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if not Path(args.baseline).exists():
+        print(
+            f"No baseline at {args.baseline}. Generate it on the reference machine "
+            "with `nox -s benchmarks -- --save` and commit it (see "
+            "benchmarks/README.md)."
+        )
+        return 1
+    baseline = load(args.baseline)
+    results = load(args.results)
+    missing = sorted(set(results) - set(baseline))
+    rows, regressions = compare(
+        results,
+        baseline,
+        args.time_tolerance,
+        args.memory_tolerance,
+    )
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'Benchmark':<{width}} {'Metric':>16} {'Baseline':>10} {'New':>10} Ratio")
+    for name, metric, old, new, ratio in rows:
+        print(f"{name:<{width}} {metric:>16} {old:>10.4g} {new:>10.4g} {ratio:.2f}")
+    if missing:
+        print("\nNot in the baseline:\n" + "\n".join(missing))
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#
+# Options and fixtures of the benchmark suite
+#
+import tracemalloc
+
+import pytest
+
+#: Parameter sets of the packed bed models ("Raul2018 enthalpy" is for a single
+#: capsule)
+PARAMETER_SETS = ["Raul2018", "Nallusamy2007"]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--mesh-levels",
+        default="0,1",
+        help="Comma-separated mesh levels, with 10 * 2**level points in the capsule "
+        "and 20 * 2**level in the pipe as in examples/mesh_refinement.py "
+        "(default is 0,1; the example uses 0,1,2,3,4)",
+    )
+    parser.addoption(
+        "--parameter-sets",
+        default=",".join(PARAMETER_SETS),
+        help="Comma-separated parameter sets (default is all)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "mesh_level" in metafunc.fixturenames:
+        levels = metafunc.config.getoption("mesh_levels").split(",")
+        metafunc.parametrize("mesh_level", [int(level) for level in levels])
+    if "parameter_set" in metafunc.fixturenames:
+        names = metafunc.config.getoption("parameter_sets").split(",")
+        metafunc.parametrize("parameter_set", names)
+
+
+@pytest.fixture
+def measure_memory(benchmark):
+    """
+    Returns a function which runs ``function(*args)`` once with tracemalloc and
+    stores its peak memory in the extra info of the benchmark, which is saved with
+    the timings and compared by ``compare.py``
+    """
+
+    def measure(function, *args):
+        tracemalloc.start()
+        try:
+            function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak memory [MB]"] = peak / 1024**2
+
+    return measure
@@ -0,0 +1,75 @@
+#
+# Benchmark of the import time of the package, with a target for the model-only path
+#
+import argparse
+import subprocess
+import sys
+
+#: Modules which the model-only import path must not import
+LAZY_MODULES = ["matplotlib", "scienceplots", "h5py", "encapsulated_ltes.entry_point"]
+
+MODEL_ONLY = "import encapsulated_ltes; encapsulated_ltes.FullModel"
+
+
+def import_times(statement):
+    """
+    Runs ``statement`` in a new interpreter with ``-X importtime`` and returns the
+    cumulative import time, in seconds, of each imported module
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import time of the model-only path (python -X importtime)"
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        default=0.25,
+        help="Maximum import time in seconds on top of pybamm (default is 0.25)",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    # The best of several runs, as the first ones warm up the file system cache
+    runs = [import_times(MODEL_ONLY) for _ in range(args.repeats)]
+    times = min(runs, key=lambda times: times["encapsulated_ltes"])
+    total = times["encapsulated_ltes"]
+    overhead = total - times["pybamm"]
+    print(f"import encapsulated_ltes: {total:.3f} s (pybamm: {times['pybamm']:.3f} s)")
+    print(f"Overhead on top of pybamm: {overhead:.3f} s (target {args.target} s)")
+
+    slowest = sorted(
+        (
+            (time, name)
+            for name, time in times.items()
+            if name.startswith("encapsulated_ltes.")
+        ),
+        reverse=True,
+    )
+    for time, name in slowest[:5]:
+        print(f"  {name:<40} {time:.3f} s")
+
+    failures = [name for name in LAZY_MODULES if name in times]
+    if failures:
+        print(f"Imported by the model-only path: {failures}")
+    if overhead > args.target:
+        print("Import time above target")
+    return 1 if failures or overhead > args.target else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
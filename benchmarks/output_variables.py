@@ -0,0 +1,65 @@
+#
+# Benchmark of the cost of processing the solution for each output variables preset
+#
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+
+
+def benchmark(model_class, preset, n_r, n_x, n_t):
+    model = model_class(options={"output variables": preset})
+    var_pts = {model.variables["r [m]"]: n_r, model.variables["x [m]"]: n_x}
+    param = ltes.get_parameter_values("Nallusamy2007")
+    sim = pybamm.Simulation(model, parameter_values=param, var_pts=var_pts)
+
+    start = time.perf_counter()
+    solution = sim.solve([0, 10000], t_interp=np.linspace(0, 10000, n_t))
+    solve_time = time.perf_counter() - start
+
+    # Process (and keep) all the output variables, as the plotting functions do
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = [solution[name].entries for name in model.variables]
+    process_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "variables": len(entries),
+        "solve [s]": solve_time,
+        "post-processing [s]": process_time,
+        "peak memory [MB]": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost of processing the solution for each output variables preset"
+    )
+    parser.add_argument("--n-r", type=int, default=40)
+    parser.add_argument("--n-x", type=int, default=80)
+    parser.add_argument("--n-t", type=int, default=1001)
+    args = parser.parse_args()
+
+    print(f"Mesh {args.n_r} x {args.n_x}, {args.n_t} output times")
+    header = ["model", "preset", "variables", "solve [s]", "post-processing [s]"]
+    header.append("peak memory [MB]")
+    print(" | ".join(f"{h:>20}" for h in header))
+    for model_class in [ltes.ReducedModel, ltes.FullModel]:
+        for preset in ltes.OUTPUT_VARIABLE_PRESETS:
+            result = benchmark(model_class, preset, args.n_r, args.n_x, args.n_t)
+            row = [model_class.__name__, preset, *result.values()]
+            print(
+                " | ".join(
+                    f"{v:>20.3f}" if isinstance(v, float) else f"{v:>20}" for v in row
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import pybamm
+
+import encapsulated_ltes as ltes
+
+param = ltes.get_parameter_values("Nallusamy2007")
+sensors = ltes.load_nallusamy_sensors(param)
+
+models = [
+    ltes.ReducedModel(options={"closures": "smooth"}),
+    ltes.FullModel(options={"closures": "smooth"}),
+]
+
+for model in models:
+    # Coarsest mesh of the convergence study in mesh_refinement.py
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    calibration = ltes.Calibration(
+        model,
+        ["Heat transfer coefficient [W.m-2.K-1]"],
+        sensors,
+        parameter_values=param,
+        bounds={"Heat transfer coefficient [W.m-2.K-1]": (10, 5000)},
+        var_pts=var_pts,
+        solver=pybamm.IDAKLUSolver(rtol=1e-6, atol=1e-6),
+    )
+    result = calibration.fit()
+
+    print(f"{model.name}: {result['message']}")
+    for name, value in result["parameters"].items():
+        print(f"  {name}: {value:.4g}")
+    print(f"  RMSE: {result['initial RMSE']:.3f} -> {result['RMSE']:.3f} degC")
+    for sensor in result["RMSE by sensor"]:
+        print(f"    {sensor['variable']} at x = {sensor['x']:.3f} m: {sensor['RMSE']:.3f}")
+    print(f"  {result['solves']} solves in {result['time [s]']:.2f} s")
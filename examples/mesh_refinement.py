@@ -3,7 +3,6 @@ import math
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pybamm
 
 import encapsulated_ltes as ltes
 
@@ -33,7 +32,12 @@ for l in range(min_mesh, max_mesh + 1):
         r = model.variables["r [m]"]
         x = model.variables["x [m]"]
         var_pts = {r: math.floor(10 * 2**l), x: math.floor(20 * 2**l)}
-        sim = pybamm.Simulation(model, parameter_values=param, var_pts=var_pts)
+        sim = ltes.LTESSimulation(
+            model,
+            parameter_values=param,
+            var_pts=var_pts,
+            profiler=ltes.Profiler(memory=False),
+        )
         # sol = sim.solve(np.linspace(0, 10000, 2000))
         # sol = sim.solve([0, 10000])
         sol = sim.solve([0, 10000], t_interp = np.linspace(0, 10000, 1001))
@@ -44,7 +48,8 @@ for l in range(min_mesh, max_mesh + 1):
         solution.append(sol)
         time.append(sol.solve_time.value)
 
-        print(f"{model.name}: {sol.solve_time}")
+        print(f"{model.name}, {var_pts[r]} x {var_pts[x]} points")
+        print(ltes.get_profile(sol))
 
         del sol
         gc.collect()
@@ -120,9 +125,9 @@ data = {}
 print("Generating HTF temperature plot")
 errors = [[], []]
 for solution, error in zip(solutions, errors):
-    benchmark = solution[-1]["Heat transfer fluid temperature [K]"](t=t, x=x)
+    benchmark = ltes.evaluate(solution[-1], "Heat transfer fluid temperature [K]", t=t, x=x)
     for sol in solution[:-1]:
-        result = sol["Heat transfer fluid temperature [K]"](t=t, x=x)
+        result = ltes.evaluate(sol, "Heat transfer fluid temperature [K]", t=t, x=x)
         err = np.sqrt(
             (((result - benchmark) ** 2).mean()) / ((benchmark**2).mean())
         )
@@ -137,11 +142,11 @@ gc.collect()
 print("Generating PCM temperature plot")
 errors = [[], []]
 for solution, error in zip(solutions, errors):
-    benchmark = solution[-1]["Phase-change material temperature [K]"](
-        t=t, x=x, r=r
+    benchmark = ltes.evaluate(
+        solution[-1], "Phase-change material temperature [K]", t=t, x=x, r=r
     )
     for sol in solution[:-1]:
-        result = sol["Phase-change material temperature [K]"](t=t, x=x, r=r)
+        result = ltes.evaluate(sol, "Phase-change material temperature [K]", t=t, x=x, r=r)
         err = np.sqrt(((result - benchmark) ** 2).mean()) / np.sqrt(
             (benchmark**2).mean()
         )
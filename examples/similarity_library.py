@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+
+import encapsulated_ltes as ltes
+
+param = ltes.get_parameter_values("Nallusamy2007")
+model = ltes.FullModel()
+var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+
+# Build the library offline (or load it if it was already built)
+path = ltes.cache_dir() / "similarity_library_Nallusamy2007.npz"
+if path.exists():
+    library = ltes.SimilarityLibrary.load(path)
+else:
+    grid = {
+        "Biot number": np.geomspace(3, 12, 7),
+        "Peclet number": np.geomspace(0.5, 25, 9),
+    }
+    start = time.perf_counter()
+    library = ltes.SimilarityLibrary.build(
+        grid, t_max=10, parameter_values=param, model=model, var_pts=var_pts
+    )
+    print(f"Built the library in {time.perf_counter() - start:.1f} s")
+    library.save(path)
+
+# Screen designs with different capsule radii and velocities, which only change the
+# Biot and Peclet numbers (the other groups are those of the reference parameters)
+rng = np.random.default_rng(0)
+n_designs = 10000
+radius = rng.uniform(0.015, 0.04, n_designs)
+velocity = rng.uniform(3e-4, 1.5e-3, n_designs)
+
+start = time.perf_counter()
+k_s = param["Solid phase conductivity [W.m-1.K-1]"]
+rho_c_s = (
+    param["Solid phase density [kg.m-3]"]
+    * param["Solid phase specific heat capacity [J.kg-1.K-1]"]
+)
+time_scale = rho_c_s * radius**2 / k_s
+groups = {
+    "Biot number": param["Heat transfer coefficient [W.m-2.K-1]"] * radius / k_s,
+    "Peclet number": velocity * time_scale / param["Pipe length [m]"],
+}
+results = library(groups)
+soc = results["X-averaged state of charge"]
+# Time to reach 90% state of charge
+charged = np.argmax(soc >= 0.9, axis=1)
+time_to_charge = np.where(soc[:, -1] >= 0.9, library.t[charged], np.nan) * time_scale
+print(f"Screened {n_designs} designs in {time.perf_counter() - start:.2f} s")
+best = np.nanargmin(time_to_charge)
+print(
+    f"Fastest charge: {time_to_charge[best] / 3600:.2f} h with R = "
+    f"{radius[best] * 1000:.1f} mm and u = {velocity[best] * 1000:.2f} mm/s "
+    f"(SoC error estimate {results['X-averaged state of charge error'][best]:.3f})"
+)
+
+# Check the best design against a full solve
+design = param.copy()
+design.update(
+    {
+        "Capsule radius [m]": radius[best],
+        "Inlet velocity [m.s-1]": velocity[best],
+    }
+)
+prediction = library.predict(design)
+sim = ltes.LTESSimulation(model, parameter_values=design, var_pts=var_pts)
+t = prediction["Time [s]"]
+solution = sim.solve([0, t[-1]], t_interp=t)
+for name in ["Outlet temperature [K]", "X-averaged state of charge"]:
+    error = np.max(np.abs(solution[name].entries - prediction[name]))
+    print(f"{name}: error {error:.3g} (estimate {prediction[f'{name} error']:.3g})")
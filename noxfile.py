@@ -54,6 +54,24 @@ def run_user_tests(session):
     """Run user written tests"""
     install_and_run_tests(session, "tests/user_tests")
 
+@nox.session(name="benchmarks")
+def run_benchmarks(session):
+    """
+    Run the benchmark suite and compare it against the stored baseline, and check
+    the import time of the models against its target. Pass
+    ``--save`` to store the results as the new baseline, and any other arguments to
+    pytest (e.g. ``--mesh-levels=0,1,2``).
+    """
+    session.install("setuptools", silent=False)
+    session.install("-e", ".[bench]", silent=False)
+    save = "--save" in session.posargs
+    args = [arg for arg in session.posargs if arg != "--save"]
+    results = "benchmarks/baseline.json" if save else "benchmarks/results.json"
+    session.run("pytest", "benchmarks", f"--benchmark-json={results}", *args)
+    if not save:
+        session.run("python", "benchmarks/compare.py", results)
+    session.run("python", "benchmarks/import_time.py")
+
 @nox.session(name="coverage")
 def run_coverage(session):
     """Run the coverage tests and generate an XML report."""
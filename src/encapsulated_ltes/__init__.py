@@ -5,13 +5,84 @@ encapsulated-LTES: A project to simulate encapsulated latent thermal energy stor
 """
 __version__ = "0.1.0"
 
+import importlib
+
 import pybamm
 
 from .models import *
 from .parameter_values import get_parameter_values
 from .parameters import EncapsulatedLTESParameters
-from .plot import *
-from .utils import get_interface_position, root_dir
+from .simulation import LTESSimulation
+from .utils import cache_dir, get_interface_position, root_dir
+
+#: Attributes imported from their module on first access, so that the models can be
+#: imported without the plotting stack, the entry points or the optional features
+_LAZY_ATTRIBUTES = {
+    "Calibration": "calibration",
+    "load_nallusamy_sensors": "calibration",
+    "Checkpoint": "checkpoint",
+    "resume": "checkpoint",
+    "solve_with_checkpoints": "checkpoint",
+    "CompactSolution": "compact",
+    "StoragePolicy": "compact",
+    "ExperimentalDataset": "data",
+    "load_dataset": "data",
+    "Model": "entry_point",
+    "parameter_sets": "entry_point",
+    "EnsembleKalmanFilter": "estimation",
+    "SolutionEvaluator": "evaluation",
+    "evaluate": "evaluation",
+    "InletProfile": "inlet",
+    "load_inlet_profile": "inlet",
+    "set_inlet_profiles": "inlet",
+    "KPISummary": "kpis",
+    "get_adaptive_times": "kpis",
+    "solve_kpis": "kpis",
+    "MultiFidelitySimulation": "multifidelity",
+    "StorageNetwork": "network",
+    "DesignOptimisation": "optimisation",
+    "PCMProperties": "pcm",
+    "set_pcm_properties": "pcm",
+    "compare_0D_variables": "plot",
+    "compare_1D_variables": "plot",
+    "compare_2D_variables": "plot",
+    "draw_loglog_slope": "plot",
+    "plot_comparison_data": "plot",
+    "set_plotting_format": "plot",
+    "Profiler": "profiling",
+    "ProfileReport": "profiling",
+    "get_profile": "profiling",
+    "ResultCache": "result_cache",
+    "ReducedOrderModel": "rom",
+    "check_sensitivities": "sensitivities",
+    "get_sensitivities": "sensitivities",
+    "SimilarityLibrary": "similarity",
+    "get_dimensionless_groups": "similarity",
+    "get_scales": "similarity",
+    "set_dimensionless_groups": "similarity",
+    "SolutionWriter": "storage",
+    "StoredSolution": "storage",
+    "solve_to_file": "storage",
+    "write_solution": "storage",
+    "StreamingSobolIndices": "uq",
+    "StreamingStatistics": "uq",
+    "UncertaintyStudy": "uq",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
 
 __all__ = [
     "__version__",
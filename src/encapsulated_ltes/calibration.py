@@ -0,0 +1,218 @@
+#
+# Calibration of model parameters against experimental data
+#
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import least_squares
+
+from .data import load_dataset
+from .interpolation import interpolation_matrix, interpolation_matrix_2D, sensor_matrix
+from .sensitivities import get_sensitivities
+from .simulation import LTESSimulation
+
+
+def load_nallusamy_sensors(parameter_values, r_probe=0.8):
+    """
+    Returns the measurements of Nallusamy et al (2007) as a list of sensors, in the
+    format used by :class:`Calibration`.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`
+        The parameter values, used to locate the probes
+    r_probe : float, optional
+        The radial position of the PCM probes, as a fraction of the capsule radius
+        (default is 0.8)
+    """
+    return load_dataset("Nallusamy2007").get_sensors(parameter_values, r_probe)
+
+
+class Calibration:
+    """
+    Least-squares calibration of model parameters against sensor measurements. The
+    model is built once, with the fitted parameters as inputs, and the Jacobian of
+    the residuals is computed from the forward sensitivities (if enabled).
+
+    Parameters
+    ----------
+    model : :class:`encapsulated_ltes.BaseLTESModel`
+        The model to calibrate. Smooth closures (``options={"closures": "smooth"}``)
+        are recommended when using sensitivities.
+    parameters : list of str
+        The names of the parameters to fit
+    sensors : list of dict
+        The measurements, as dictionaries with keys "variable" (the model variable,
+        in the same units as the measurements), "x" and "r" (the position of the
+        sensor, with "r" None for variables in the pipe), "t" (the times of the
+        measurements, in seconds) and "values" (the measurements)
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values, which also give the initial guess of the fitted
+        parameters (default is the model default parameter values)
+    bounds : dict, optional
+        The lower and upper bounds of each fitted parameter (default is between 0.1
+        and 10 times the initial guess)
+    use_sensitivities : bool, optional
+        Whether to compute the Jacobian from the forward sensitivities (default is
+        True) or by finite differences
+    **kwargs
+        Keyword arguments passed to :class:`encapsulated_ltes.LTESSimulation`, such
+        as ``var_pts`` and ``solver``
+    """
+
+    def __init__(
+        self,
+        model,
+        parameters,
+        sensors,
+        parameter_values=None,
+        bounds=None,
+        use_sensitivities=True,
+        **kwargs,
+    ):
+        self.parameters = list(parameters)
+        self.sensors = sensors
+        self.use_sensitivities = use_sensitivities
+        self.sim = LTESSimulation(
+            model, parameter_values=parameter_values, inputs=self.parameters, **kwargs
+        )
+        self.sim.build()
+        self.initial_guess = np.array(
+            [self.sim.default_inputs[p] for p in self.parameters], dtype=float
+        )
+        bounds = bounds or {}
+        self.bounds = np.array(
+            [
+                bounds.get(p, (0.1 * value, 10 * value))
+                for p, value in zip(self.parameters, self.initial_guess)
+            ]
+        ).T
+
+        # Solve at all the measurement times, and precompute the space-time
+        # interpolation from the model output to the measurements of each variable, so
+        # the model values at the sensors are one sparse product per variable
+        times = [sensor["t"] for sensor in sensors]
+        self.t_interp = np.unique(np.concatenate([[0], *times]))
+        x_nodes = self.sim.get_nodes("pipe")
+        r_nodes = self.sim.get_nodes("capsule")
+        blocks = []
+        for sensor in sensors:
+            if sensor["r"] is None:
+                W = interpolation_matrix(x_nodes, sensor["x"])
+            else:
+                W = interpolation_matrix_2D(r_nodes, x_nodes, sensor["r"], sensor["x"])
+            blocks.append(sensor_matrix(W, [sensor["t"]], self.t_interp))
+        self.sensor_matrices = {}
+        for name in dict.fromkeys(sensor["variable"] for sensor in sensors):
+            n_columns = next(
+                S.shape[1] for sensor, S in zip(sensors, blocks)
+                if sensor["variable"] == name
+            )
+            self.sensor_matrices[name] = sparse.vstack(
+                [
+                    S
+                    if sensor["variable"] == name
+                    else sparse.csr_matrix((S.shape[0], n_columns))
+                    for sensor, S in zip(sensors, blocks)
+                ]
+            ).tocsr()
+        self.measurements = np.concatenate([sensor["values"] for sensor in sensors])
+
+        self._cache = (None, None, None)
+        self.n_solves = 0
+
+    def _evaluate(self, x):
+        """Returns the residuals and their Jacobian for the scaled parameters x"""
+        if self._cache[0] is not None and np.array_equal(self._cache[0], x):
+            return self._cache[1], self._cache[2]
+
+        inputs = dict(zip(self.parameters, x * self.initial_guess))
+        solution = self.sim.solve(
+            [0, self.t_interp[-1]],
+            inputs=inputs,
+            t_interp=self.t_interp,
+            calculate_sensitivities=self.use_sensitivities,
+        )
+        self.n_solves += 1
+
+        residuals = -self.measurements
+        jacobian = np.zeros((len(residuals), len(x))) if self.use_sensitivities else None
+        if self.use_sensitivities:
+            sensitivities = get_sensitivities(
+                solution, list(self.sensor_matrices), self.parameters
+            )
+        for name, S in self.sensor_matrices.items():
+            residuals = residuals + S @ solution[name].entries.flatten(order="F")
+            if self.use_sensitivities:
+                dfield = np.column_stack(
+                    [sensitivities[name][p].flatten(order="F") for p in self.parameters]
+                )
+                jacobian += (S @ dfield) * self.initial_guess
+        self._cache = (np.array(x), residuals, jacobian)
+        return residuals, jacobian
+
+    def residuals(self, parameters):
+        """Returns the residuals (model minus measurements) for the given parameters"""
+        return self._evaluate(np.asarray(parameters) / self.initial_guess)[0]
+
+    def fit(self, initial_guess=None, **kwargs):
+        """
+        Fit the parameters with :func:`scipy.optimize.least_squares`.
+
+        Parameters
+        ----------
+        initial_guess : array-like, optional
+            The initial guess (default is the values in the parameter values)
+        **kwargs
+            Keyword arguments passed to :func:`scipy.optimize.least_squares`
+
+        Returns
+        -------
+        dict
+            The fitted parameters and a report of the quality of the fit and the
+            computational cost
+        """
+        if initial_guess is None:
+            initial_guess = self.initial_guess
+        x0 = np.asarray(initial_guess, dtype=float) / self.initial_guess
+        if self.use_sensitivities:
+            kwargs.setdefault("jac", lambda x: self._evaluate(x)[1])
+        else:
+            # Steps larger than the solver tolerances
+            kwargs.setdefault("diff_step", 1e-3)
+        self.n_solves = 0
+
+        start = time.perf_counter()
+        initial_residuals = self._evaluate(x0)[0]
+        result = least_squares(
+            lambda x: self._evaluate(x)[0],
+            x0,
+            bounds=self.bounds / self.initial_guess,
+            **kwargs,
+        )
+        elapsed = time.perf_counter() - start
+
+        return {
+            "parameters": dict(zip(self.parameters, result.x * self.initial_guess)),
+            "success": result.success,
+            "message": result.message,
+            "initial RMSE": _rmse(initial_residuals),
+            "RMSE": _rmse(result.fun),
+            "RMSE by sensor": self._rmse_by_sensor(result.fun),
+            "function evaluations": result.nfev,
+            "Jacobian evaluations": result.njev,
+            "solves": self.n_solves,
+            "time [s]": elapsed,
+        }
+
+    def _rmse_by_sensor(self, residuals):
+        sizes = np.cumsum([len(sensor["values"]) for sensor in self.sensors])[:-1]
+        return [
+            {"variable": sensor["variable"], "x": sensor["x"], "RMSE": _rmse(res)}
+            for sensor, res in zip(self.sensors, np.split(residuals, sizes))
+        ]
+
+
+def _rmse(residuals):
+    return float(np.sqrt(np.mean(residuals**2)))
@@ -0,0 +1,237 @@
+#
+# Checkpoint and restart of long simulations
+#
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .kpis import KPI_VARIABLES
+from .result_cache import get_cache_key
+
+CHECKPOINT_FILE = "checkpoint.npz"
+
+
+class Checkpoint:
+    """
+    State of a simulation at a given time, from which it can be restarted.
+
+    Parameters
+    ----------
+    t : float
+        The time, in seconds, which also gives the position in time-dependent inlet
+        profiles
+    y : array-like
+        The state vector of the discretised model
+    states : dict
+        The values of each state variable (e.g. the heat transfer fluid temperature,
+        the enthalpy and temperature of the phase-change material and the stored
+        energy), in their units
+    segment : int, optional
+        The number of segments of the run already solved
+    metadata : dict, optional
+        The settings of the run
+    """
+
+    def __init__(self, t, y, states, segment=0, metadata=None):
+        self.t = float(t)
+        self.y = np.asarray(y, dtype=float)
+        self.states = states
+        self.segment = segment
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_simulation(cls, simulation, t, y, **kwargs):
+        """Create a checkpoint, with the state variables of a simulation"""
+        states = {}
+        for name in simulation.state_slices:
+            J, c = simulation.get_variable_map(name)
+            states[name] = J @ y + c
+        return cls(t, y, states, **kwargs)
+
+    def save(self, path):
+        """Save the checkpoint to a ``.npz`` file, replacing it atomically"""
+        path = Path(path)
+        arrays = {f"state/{name}": value for name, value in self.states.items()}
+        temporary = path.with_suffix(".tmp.npz")
+        np.savez(
+            temporary,
+            t=self.t,
+            y=self.y,
+            segment=self.segment,
+            metadata=json.dumps(self.metadata),
+            **arrays,
+        )
+        temporary.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a checkpoint saved with :meth:`save`"""
+        with np.load(path) as file:
+            states = {
+                key[len("state/") :]: file[key]
+                for key in file.files
+                if key.startswith("state/")
+            }
+            return cls(
+                file["t"],
+                file["y"],
+                states,
+                int(file["segment"]),
+                json.loads(str(file["metadata"])),
+            )
+
+
+def solve_with_checkpoints(
+    simulation,
+    path,
+    t_eval,
+    interval,
+    t_interp=None,
+    inputs=None,
+    initial_state=None,
+    variables=None,
+):
+    """
+    Solve a simulation in segments of a given duration, saving a checkpoint of the
+    state and the outputs of each segment to a directory, so the run can be continued
+    with :func:`resume` if it is interrupted.
+
+    Parameters
+    ----------
+    simulation : :class:`encapsulated_ltes.LTESSimulation`
+        The simulation, with ``initial_state_input=True``
+    path : str or Path
+        The directory of the checkpoints
+    t_eval : array-like
+        The start and end times of the simulation, in seconds
+    interval : float
+        The time between checkpoints, in seconds
+    t_interp : array-like, optional
+        The times at which to return the outputs (default is 101 equally spaced times)
+    inputs : dict, optional
+        The values of the inputs of the simulation
+    initial_state : array-like or :class:`Checkpoint`, optional
+        The initial state vector (default is the initial conditions of the model),
+        e.g. from :meth:`encapsulated_ltes.LTESSimulation.get_state_vector` or a
+        checkpoint of another run
+    variables : list of str, optional
+        The output variables (default is the outlet temperature, the X-averaged state
+        of charge, the stored energy and the relative error in energy conservation)
+
+    Returns
+    -------
+    dict
+        The outputs, as well as "Time [s]"
+    """
+    if not simulation.initial_state_input:
+        msg = "Checkpointing needs a simulation with `initial_state_input=True`"
+        raise ValueError(msg)
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for filename in path.glob("segment_*.npz"):
+        filename.unlink()
+
+    inputs = dict(inputs or {})
+    if t_interp is None:
+        t_interp = np.linspace(t_eval[0], t_eval[-1], 101)
+    if isinstance(initial_state, Checkpoint):
+        initial_state = initial_state.y
+    if initial_state is None:
+        initial_state = simulation.get_initial_state(inputs)
+    metadata = {
+        "t_eval": [float(t_eval[0]), float(t_eval[-1])],
+        "interval": float(interval),
+        "t_interp": np.asarray(t_interp, dtype=float).tolist(),
+        "inputs": {name: np.asarray(value).tolist() for name, value in inputs.items()},
+        "variables": list(variables or KPI_VARIABLES),
+    }
+    # the key is computed from the inputs as restored by resume
+    metadata["key"] = get_cache_key(
+        simulation, [0], _restore_inputs(metadata["inputs"])
+    )
+    checkpoint = Checkpoint.from_simulation(
+        simulation, t_eval[0], initial_state, metadata=metadata
+    )
+    checkpoint.save(path / CHECKPOINT_FILE)
+    return _run(simulation, path, checkpoint)
+
+
+def resume(path, simulation):
+    """
+    Continue a run of :func:`solve_with_checkpoints` from its last checkpoint.
+
+    Parameters
+    ----------
+    path : str or Path
+        The directory of the checkpoints
+    simulation : :class:`encapsulated_ltes.LTESSimulation`
+        A simulation with the same configuration (model, parameter values, mesh and
+        solver) as the interrupted run
+
+    Returns
+    -------
+    dict
+        The outputs of the whole run, as well as "Time [s]"
+    """
+    path = Path(path)
+    checkpoint = Checkpoint.load(path / CHECKPOINT_FILE)
+    inputs = _restore_inputs(checkpoint.metadata["inputs"])
+    if get_cache_key(simulation, [0], inputs) != checkpoint.metadata["key"]:
+        msg = "The simulation does not match the configuration of the checkpoint"
+        raise ValueError(msg)
+    return _run(simulation, path, checkpoint)
+
+
+def _restore_inputs(inputs):
+    """The inputs saved in the metadata of a run, with arrays for the lists"""
+    return {
+        name: np.asarray(value) if isinstance(value, list) else value
+        for name, value in inputs.items()
+    }
+
+
+def _run(simulation, path, checkpoint):
+    """Solve the remaining segments of a run"""
+    metadata = checkpoint.metadata
+    t_start, t_end = metadata["t_eval"]
+    t_interp = np.asarray(metadata["t_interp"])
+    inputs = _restore_inputs(metadata["inputs"])
+    variables = metadata["variables"]
+    n_segments = max(int(np.ceil((t_end - t_start) / metadata["interval"] - 1e-9)), 1)
+    bounds = np.minimum(t_start + metadata["interval"] * np.arange(n_segments + 1), t_end)
+    bounds[-1] = t_end
+
+    for segment in range(checkpoint.segment, n_segments):
+        a, b = bounds[segment], bounds[segment + 1]
+        # The outputs at the start of a segment belong to the previous one
+        outputs = t_interp[(t_interp > a) & (t_interp <= b)]
+        if segment == 0:
+            outputs = t_interp[(t_interp >= a) & (t_interp <= b)]
+        times = np.unique(np.concatenate([[a, b], outputs]))
+        solution = simulation.solve(
+            [a, b], inputs=inputs, initial_state=checkpoint.y, t_interp=times
+        )
+        index = np.searchsorted(times, outputs)
+        np.savez(
+            path / f"segment_{segment:05d}.npz",
+            t=outputs,
+            **{
+                f"variable/{i}": solution[name].entries[..., index]
+                for i, name in enumerate(variables)
+            },
+        )
+        y = simulation.get_final_state(solution)
+        checkpoint = Checkpoint.from_simulation(
+            simulation, b, y, segment=segment + 1, metadata=metadata
+        )
+        checkpoint.save(path / CHECKPOINT_FILE)
+
+    # Gather the outputs of all the segments
+    results = {"Time [s]": [], **{name: [] for name in variables}}
+    for segment in range(n_segments):
+        with np.load(path / f"segment_{segment:05d}.npz") as file:
+            results["Time [s]"].append(file["t"])
+            for i, name in enumerate(variables):
+                results[name].append(file[f"variable/{i}"])
+    return {name: np.concatenate(value, axis=-1) for name, value in results.items()}
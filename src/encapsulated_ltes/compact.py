@@ -0,0 +1,296 @@
+#
+# Compact (reduced precision, decimated and subsampled) storage of solutions
+#
+import json
+
+import numpy as np
+from scipy import sparse
+
+from .evaluation import SolutionEvaluator
+from .interpolation import interpolation_matrix
+
+#: Default policy for dashboards and archival: float32 fields with error-bounded
+#: decimation in time, and the phase as packed bits
+DEFAULT_STORAGE_POLICY = {
+    "Heat transfer fluid temperature [K]": {"dtype": "float32", "tolerance": 0.1},
+    "Phase-change material temperature [K]": {"dtype": "float32", "tolerance": 0.1},
+    "Phase-change material enthalpy [J.m-3]": {"dtype": "float32", "tolerance": 2e5},
+    "Phase": {"dtype": "bool"},
+    "Outlet temperature [K]": {"dtype": "float32", "tolerance": 0.01},
+    "X-averaged state of charge": {"dtype": "float32", "tolerance": 1e-3},
+    "Stored energy per unit area [J.m-2]": {"dtype": "float32", "tolerance": 1e4},
+}
+
+
+class StoragePolicy:
+    """
+    Policy to store the variables of a solution compactly. The options of each
+    variable are
+
+    - ``"dtype"``: the type of the stored values, "float64", "float32" (default) or
+      "bool" (packed as bits, for indicators such as the phase)
+    - ``"tolerance"``: the maximum absolute error of the linear interpolation in time
+      between the stored snapshots, which are selected greedily (default is None, to
+      keep every ``decimation``-th snapshot)
+    - ``"decimation"``: keep every ``decimation``-th snapshot, as well as the last
+      one, if no tolerance is given (default is 1)
+    - ``"subsample"``: keep every ``subsample``-th mesh node in each direction, as
+      well as the last one (default is 1)
+
+    Parameters
+    ----------
+    variables : dict or list, optional
+        The variables to store, as a dictionary of options or a list of names using
+        the default options (default is :data:`DEFAULT_STORAGE_POLICY`)
+    **default
+        The default options, e.g. ``dtype="float32"``
+    """
+
+    def __init__(self, variables=None, **default):
+        if variables is None:
+            variables = DEFAULT_STORAGE_POLICY
+        if not isinstance(variables, dict):
+            variables = {name: {} for name in variables}
+        unknown = set(default) - {"dtype", "tolerance", "decimation", "subsample"}
+        if unknown:
+            msg = f"Unknown storage options {sorted(unknown)}"
+            raise ValueError(msg)
+        default = {
+            "dtype": "float32",
+            "tolerance": None,
+            "decimation": 1,
+            "subsample": 1,
+            **default,
+        }
+        self.variables = {
+            name: {**default, **options} for name, options in variables.items()
+        }
+
+    def apply(self, solution):
+        """Returns the :class:`CompactSolution` of a solution"""
+        evaluator = SolutionEvaluator(solution)
+        variables = {}
+        report = {}
+        for name, options in self.variables.items():
+            domains, field, nodes = evaluator.get_field(name)
+            variable = CompactVariable.compress(
+                field, evaluator.t, nodes, domains, **options
+            )
+            variables[name] = variable
+            # Error of the compressed variable on the original grid
+            error = np.abs(variable.decompress(evaluator.t, nodes) - field)
+            scale = np.max(np.abs(field)) or 1
+            report[name] = {
+                "max absolute error": float(error.max()),
+                "max relative error": float(error.max() / scale),
+                "bytes": variable.nbytes,
+                "original bytes": field.nbytes,
+            }
+        return CompactSolution(evaluator.t, variables, report)
+
+
+def _interpolation_error(field, t, start, end):
+    """The error of the linear interpolation between the snapshots start and end"""
+    if end - start < 2:
+        return 0
+    weight = (t[start + 1 : end] - t[start]) / (t[end] - t[start])
+    interpolant = field[:, [start]] * (1 - weight) + field[:, [end]] * weight
+    return np.max(np.abs(interpolant - field[:, start + 1 : end]))
+
+
+def _select_times(field, t, tolerance):
+    """
+    Select snapshots so the linear interpolation between consecutive ones has an
+    error below the tolerance. The end of each segment is found by doubling its
+    length until the error exceeds the tolerance, then bisecting, so each segment of
+    m times costs O(m log m) evaluations of the field rather than O(m^2).
+    """
+    n_t = len(t)
+    indices = [0]
+    start = 0
+    while start < n_t - 1:
+        # longest segment within the tolerance, and shortest one beyond it
+        good, bad = start + 1, n_t
+        while good < n_t - 1:
+            candidate = min(start + 2 * (good - start), n_t - 1)
+            if _interpolation_error(field, t, start, candidate) > tolerance:
+                bad = candidate
+                break
+            good = candidate
+        while bad - good > 1:
+            candidate = (good + bad) // 2
+            if _interpolation_error(field, t, start, candidate) > tolerance:
+                bad = candidate
+            else:
+                good = candidate
+        indices.append(good)
+        start = good
+    return np.array(indices)
+
+
+def _stride(n, step):
+    """Every step-th index up to n, always including the last one"""
+    return np.unique(np.append(np.arange(0, n, step), n - 1))
+
+
+class CompactVariable:
+    """
+    Variable of a :class:`CompactSolution`, stored at a subset of the times and mesh
+    nodes with a reduced precision. Create with :meth:`compress`.
+    """
+
+    def __init__(self, data, dtype, shape, t, nodes, domains):
+        self.data = data
+        self.dtype = dtype
+        self.shape = tuple(shape)
+        self.t = t
+        self.nodes = nodes
+        self.domains = domains
+
+    @classmethod
+    def compress(
+        cls,
+        field,
+        t,
+        nodes,
+        domains,
+        dtype="float32",
+        tolerance=None,
+        decimation=1,
+        subsample=1,
+    ):
+        """
+        Compress a field, given as an array of shape (mesh nodes, times) with the
+        capsule nodes varying fastest
+        """
+        shape = [len(n) for n in nodes]
+        field = field.reshape(*shape, len(t), order="F")
+        index = [_stride(n, subsample) for n in shape]
+        field = field[np.ix_(*index, np.arange(len(t)))]
+        nodes = [n[i] for n, i in zip(nodes, index)]
+        field = field.reshape(-1, len(t), order="F")
+
+        if dtype == "bool":
+            field = field >= 0.5
+        if tolerance is None or dtype == "bool":
+            times = _stride(len(t), decimation)
+        else:
+            times = _select_times(field.astype(dtype), t, tolerance)
+        field = field[:, times]
+        is_bool = dtype == "bool"
+        data = np.packbits(field) if is_bool else np.ascontiguousarray(field, dtype)
+        return cls(data, dtype, field.shape, t[times], nodes, domains)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.t.nbytes + sum(n.nbytes for n in self.nodes)
+
+    def _values(self):
+        """The stored values as float64, of shape (stored nodes, stored times)"""
+        if self.dtype == "bool":
+            size = int(np.prod(self.shape))
+            values = np.unpackbits(self.data, count=size)
+            return values.reshape(self.shape).astype(float)
+        return self.data.astype(float)
+
+    def decompress(self, t, nodes=None):
+        """
+        Returns the values at the times ``t`` and the mesh ``nodes`` (default is the
+        stored nodes), interpolating linearly, as an array of shape (nodes, times)
+        """
+        W_t = interpolation_matrix(self.t, t)
+        values = self._values() @ W_t.T.toarray() if len(self.t) > 1 else self._values()
+        if nodes is not None and self.nodes:
+            matrices = [interpolation_matrix(n, m) for n, m in zip(self.nodes, nodes)]
+            W = matrices[0]
+            for matrix in matrices[1:]:
+                W = sparse.kron(matrix, W, format="csr")
+            values = W @ values
+        if self.dtype == "bool":
+            values = np.round(values)
+        return values
+
+    @property
+    def entries(self):
+        """The stored values, with the same shape as in pybamm"""
+        values = self._values()
+        shape = [len(n) for n in self.nodes]
+        if not shape:
+            return values[0]
+        return values.reshape(*shape, len(self.t), order="F")
+
+
+class CompactSolution:
+    """
+    Solution stored compactly according to a :class:`StoragePolicy`, with a report of
+    the memory footprint and the error of each variable.
+
+    Parameters
+    ----------
+    t : array-like
+        The times of the original solution
+    variables : dict
+        The :class:`CompactVariable` objects
+    report : dict, optional
+        The error and size of each variable
+    """
+
+    def __init__(self, t, variables, report=None):
+        self.t = np.asarray(t, dtype=float)
+        self.variables = variables
+        self.report = report or {}
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    @property
+    def nbytes(self):
+        return sum(variable.nbytes for variable in self.variables.values())
+
+    def get_entries(self, name, t=None):
+        """
+        Returns the values of a variable at the times ``t`` (default is the times of
+        the original solution) and at the stored nodes, with the same shape as in
+        pybamm
+        """
+        variable = self.variables[name]
+        t = self.t if t is None else np.atleast_1d(t)
+        values = variable.decompress(t)
+        shape = [len(n) for n in variable.nodes]
+        if not shape:
+            return values[0]
+        return values.reshape(*shape, len(t), order="F")
+
+    def save(self, path):
+        """Save the solution to a compressed ``.npz`` file"""
+        arrays = {"t": self.t, "report": np.array(json.dumps(self.report))}
+        for i, (name, variable) in enumerate(self.variables.items()):
+            arrays[f"{i}/name"] = np.array(name)
+            arrays[f"{i}/data"] = variable.data
+            arrays[f"{i}/dtype"] = np.array(variable.dtype)
+            arrays[f"{i}/shape"] = np.array(variable.shape)
+            arrays[f"{i}/t"] = variable.t
+            arrays[f"{i}/domains"] = np.array(variable.domains, dtype=str)
+            for j, nodes in enumerate(variable.nodes):
+                arrays[f"{i}/nodes/{j}"] = nodes
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a solution saved with :meth:`save`"""
+        with np.load(path) as file:
+            variables = {}
+            i = 0
+            while f"{i}/name" in file:
+                domains = [str(d) for d in file[f"{i}/domains"]]
+                variables[str(file[f"{i}/name"])] = CompactVariable(
+                    file[f"{i}/data"],
+                    str(file[f"{i}/dtype"]),
+                    file[f"{i}/shape"],
+                    file[f"{i}/t"],
+                    [file[f"{i}/nodes/{j}"] for j in range(len(domains))],
+                    domains,
+                )
+                i += 1
+            report = json.loads(str(file["report"])) if "report" in file else None
+            return cls(file["t"], variables, report)
@@ -0,0 +1,204 @@
+#
+# Registry of experimental datasets
+#
+import re
+
+import numpy as np
+
+from .interpolation import interpolation_matrix, interpolation_matrix_2D, sensor_matrix
+from .utils import cache_dir, root_dir
+
+#: Model variables measured by each family of sensors
+DATASET_VARIABLES = {
+    "HTF": "Heat transfer fluid temperature [degC]",
+    "PCM": "Phase-change material temperature [degC]",
+}
+
+_datasets = {}
+
+
+class ExperimentalDataset:
+    """
+    Temperature measurements at probes along the pipe, stored as aligned NumPy arrays.
+    For each family of sensors (e.g. "HTF" and "PCM"), ``time[family]`` and
+    ``values[family]`` have one row per probe, padded with NaN to the length of the
+    longest series, and ``positions[family]`` are the probe positions as fractions of
+    the pipe length.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset
+    columns : dict
+        The measurements, as ``{(family, position): (time [s], values)}``
+    """
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.families = sorted({family for family, _ in columns})
+        self.positions = {}
+        self.time = {}
+        self.values = {}
+        for family in self.families:
+            keys = sorted((k for k in columns if k[0] == family), key=lambda k: k[1])
+            n_max = max(len(columns[key][0]) for key in keys)
+            self.positions[family] = np.array([position for _, position in keys])
+            self.time[family] = np.full((len(keys), n_max), np.nan)
+            self.values[family] = np.full((len(keys), n_max), np.nan)
+            for i, key in enumerate(keys):
+                time, values = columns[key]
+                self.time[family][i, : len(time)] = time
+                self.values[family][i, : len(values)] = values
+
+    def get_series(self, family, i):
+        """Returns the times and values measured by probe ``i`` of a family"""
+        mask = ~np.isnan(self.time[family][i])
+        return self.time[family][i, mask], self.values[family][i, mask]
+
+    def get_sensors(self, parameter_values, r_probe=0.8):
+        """
+        Returns the measurements as a list of sensors, in the format used by
+        :class:`encapsulated_ltes.Calibration`.
+
+        Parameters
+        ----------
+        parameter_values : :class:`pybamm.ParameterValues`
+            The parameter values, used to locate the probes
+        r_probe : float, optional
+            The radial position of the PCM probes, as a fraction of the capsule
+            radius (default is 0.8)
+        """
+        L = parameter_values["Pipe length [m]"]
+        R = parameter_values["Capsule radius [m]"]
+        sensors = []
+        for family in self.families:
+            for i, position in enumerate(self.positions[family]):
+                time, values = self.get_series(family, i)
+                sensors.append(
+                    {
+                        "variable": DATASET_VARIABLES[family],
+                        "x": position * L,
+                        "r": r_probe * R if family == "PCM" else None,
+                        "t": time,
+                        "values": values,
+                    }
+                )
+        return sensors
+
+    def get_sensor_matrix(self, family, t, x_nodes, r_nodes=None, L=1, R=1, r_probe=0.8):
+        """
+        Returns the sparse matrix that maps a model field, sampled at the mesh nodes
+        and the times ``t`` and flattened in Fortran order, to all the measurements of
+        a family (ordered by probe, NaN padding excluded). The model values at the
+        sensors are then a single sparse matrix-vector product.
+
+        Parameters
+        ----------
+        family : str
+            The family of sensors
+        t : array-like
+            The times of the model output
+        x_nodes, r_nodes : array-like
+            The mesh nodes in the pipe and the capsule (``r_nodes`` only for fields in
+            the capsule)
+        L, R : float, optional
+            The pipe length and capsule radius
+        r_probe : float, optional
+            The radial position of the probes, as a fraction of the capsule radius
+        """
+        x = self.positions[family] * L
+        if r_nodes is None:
+            weights = interpolation_matrix(x_nodes, x)
+        else:
+            weights = interpolation_matrix_2D(r_nodes, x_nodes, r_probe * R, x)
+        times = [self.get_series(family, i)[0] for i in range(len(x))]
+        return sensor_matrix(weights, times, t)
+
+    def get_measurements(self, family):
+        """Returns all the measurements of a family, ordered by probe"""
+        values = self.values[family]
+        return values[~np.isnan(values)]
+
+
+def _read_columns(name):
+    """Read the CSV files of a dataset, named ``{name}_{family}_{position}L.csv``"""
+    pattern = re.compile(rf"{re.escape(name)}_(\w+)_([\d.]+)L\.csv")
+    columns = {}
+    for path in sorted((root_dir() / "data").glob(f"{name}_*.csv")):
+        match = pattern.fullmatch(path.name)
+        if match is None:
+            continue
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        family, position = match.group(1), float(match.group(2))
+        # Times are given in minutes
+        columns[(family, position)] = (data[:, 0] * 60, data[:, 1])
+    if not columns:
+        msg = f"Dataset '{name}' not found"
+        raise ValueError(msg)
+    return columns
+
+
+def _get_signature(name):
+    """Size and modification time of the CSV files of a dataset"""
+    paths = sorted((root_dir() / "data").glob(f"{name}_*.csv"))
+    return np.array(
+        [[path.stat().st_size, path.stat().st_mtime_ns] for path in paths],
+        dtype=np.int64,
+    )
+
+
+def load_dataset(name="Nallusamy2007", use_cache=True):
+    """
+    Returns an experimental dataset from the ``data`` directory. Each dataset is only
+    read once per session, and the CSV files are converted to a binary cache (in
+    :func:`encapsulated_ltes.utils.cache_dir`) which is used while they do not change.
+
+    Parameters
+    ----------
+    name : str, optional
+        The name of the dataset (default is "Nallusamy2007")
+    use_cache : bool, optional
+        Whether to use the cached datasets (default is True)
+
+    Returns
+    -------
+    :class:`ExperimentalDataset`
+        The dataset
+    """
+    if use_cache and name in _datasets:
+        return _datasets[name]
+
+    signature = _get_signature(name)
+    path = cache_dir() / f"{name}.npz"
+    columns = None
+    if use_cache and path.exists():
+        with np.load(path) as cache:
+            if np.array_equal(cache["signature"], signature):
+                columns = {
+                    (str(family), float(position)): (time, values)
+                    for family, position, time, values in zip(
+                        cache["family"],
+                        cache["position"],
+                        np.split(cache["time"], cache["split"]),
+                        np.split(cache["values"], cache["split"]),
+                    )
+                }
+
+    if columns is None:
+        columns = _read_columns(name)
+        if use_cache:
+            keys = list(columns)
+            np.savez(
+                path,
+                signature=signature,
+                family=np.array([family for family, _ in keys]),
+                position=np.array([position for _, position in keys]),
+                split=np.cumsum([len(columns[key][0]) for key in keys])[:-1],
+                time=np.concatenate([columns[key][0] for key in keys]),
+                values=np.concatenate([columns[key][1] for key in keys]),
+            )
+
+    dataset = ExperimentalDataset(name, columns)
+    if use_cache:
+        _datasets[name] = dataset
+    return dataset
@@ -31,6 +31,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 
+import functools
 import importlib.metadata
 import sys
 import textwrap
@@ -75,18 +76,27 @@ class EntryPoint(Mapping):
         if not hasattr(self, 'initialized'):    # Ensure __init__ is called once per instance
             self.initialized = True
             EntryPoint._instances += 1
-            self._all_entries = dict()
+            self._entries = None
             self.group = group
-            for entry_point in self.get_entries(self.group):
-                self._all_entries[entry_point.name] = entry_point
+
+    @property
+    def _all_entries(self):
+        """The entry points of the group, only scanned when first needed"""
+        if self._entries is None:
+            self._entries = {
+                entry_point.name: entry_point
+                for entry_point in self.get_entries(self.group)
+            }
+        return self._entries
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_entries(group_name):
-        """Wrapper for the importlib version logic"""
+        """Wrapper for the importlib version logic, cached as scanning is slow"""
         if sys.version_info < (3, 10):  # pragma: no cover
-            return importlib.metadata.entry_points()[group_name]
+            return tuple(importlib.metadata.entry_points()[group_name])
         else:
-            return importlib.metadata.entry_points(group=group_name)
+            return tuple(importlib.metadata.entry_points(group=group_name))
 
     def __new__(cls, group):
         """Ensure only two instances of entry points exist, one for parameter sets and the other for models"""
@@ -0,0 +1,176 @@
+#
+# Ensemble Kalman filter for state estimation from temperature sensors
+#
+import numpy as np
+
+from .simulation import LTESSimulation
+
+
+class EnsembleKalmanFilter:
+    """
+    Ensemble Kalman filter (with perturbed observations) which estimates the state of
+    an encapsulated LTES model, and in particular the hidden enthalpy of the
+    phase-change material, from temperature sensors in the bed.
+
+    The whole ensemble is propagated in a single batched solve of a simulation that is
+    built only once, with the initial state of each member passed as an input.
+
+    Parameters
+    ----------
+    model : :class:`encapsulated_ltes.BaseLTESModel`
+        The model used to propagate the ensemble
+    sensors : list of tuple
+        The sensors, as tuples ``(variable, x)`` for variables in the pipe (such as
+        "Heat transfer fluid temperature [K]") or ``(variable, x, r)`` for variables
+        in the capsules (such as "Phase-change material temperature [K]")
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the model default parameter values)
+    n_members : int, optional
+        The number of ensemble members (default is 32)
+    initial_temperature_std : float, optional
+        The standard deviation, in K, of the initial temperature of the ensemble
+        members (default is 1)
+    process_noise : float, optional
+        The standard deviation, in K, of the noise added to the fluid temperature at
+        each step, which is also added to the enthalpy of the phase-change material
+        after scaling by the solid heat capacity (default is 0.1)
+    measurement_noise : float, optional
+        The standard deviation, in K, of the sensor noise (default is 0.5)
+    var_pts : dict, optional
+        The number of points of the mesh
+    solver : :class:`pybamm.BaseSolver`, optional
+        The solver used to propagate the ensemble
+    seed : int, optional
+        The seed of the random number generator
+    """
+
+    def __init__(
+        self,
+        model,
+        sensors,
+        parameter_values=None,
+        n_members=32,
+        initial_temperature_std=1,
+        process_noise=0.1,
+        measurement_noise=0.5,
+        var_pts=None,
+        solver=None,
+        seed=None,
+    ):
+        self.sim = LTESSimulation(
+            model,
+            parameter_values=parameter_values,
+            inputs=["Initial temperature [K]"],
+            initial_state_input=True,
+            var_pts=var_pts,
+            solver=solver,
+        )
+        self.sim.build()
+        self.sensors = sensors
+        self.n_members = n_members
+        self.measurement_noise = measurement_noise
+        self.rng = np.random.default_rng(seed)
+
+        # Sensors as an affine map of the state vector
+        maps = [self.sim.get_probe_map(*sensor) for sensor in sensors]
+        self.observation_matrix = np.vstack([W.toarray() for W, _ in maps])
+        self.observation_offset = np.concatenate([c for _, c in maps])
+
+        # Initial ensemble, with perturbed initial temperatures
+        T_0 = self.sim.default_inputs["Initial temperature [K]"]
+        T_0 = T_0 + initial_temperature_std * self.rng.standard_normal(n_members)
+        self.member_inputs = [{"Initial temperature [K]": T} for T in T_0]
+        self.states = np.column_stack(
+            [self.sim.get_initial_state(inputs) for inputs in self.member_inputs]
+        )
+        self.t = 0
+
+        # Process noise in the units of the (scaled) state vector
+        self.process_noise = np.zeros(self.states.shape[0])
+        heat_capacity = self.sim.parameter_values.evaluate(
+            model.param.rho_s * model.param.c_p_s
+        )
+        for name, state_slice in self.sim.state_slices.items():
+            if name == "Heat transfer fluid temperature [K]":
+                std = process_noise
+            elif "enthalpy" in name:
+                std = process_noise * heat_capacity
+            else:
+                continue
+            J, _ = self.sim.get_variable_map(name)
+            scale = J[:, state_slice].diagonal()
+            self.process_noise[state_slice] = std / np.abs(scale)
+
+    def predict(self, t):
+        """Propagate the ensemble to time ``t``, in seconds"""
+        solutions = self.sim.solve(
+            [self.t, t],
+            inputs=self.member_inputs,
+            initial_state=list(self.states.T),
+            t_interp=[self.t, t],
+        )
+        self.states = np.column_stack(
+            [self.sim.get_final_state(sol) for sol in solutions]
+        )
+        self.states += self.process_noise[:, None] * self.rng.standard_normal(
+            self.states.shape
+        )
+        self.t = t
+
+    def update(self, measurements):
+        """Assimilate the sensor measurements, in the same order as the sensors"""
+        measurements = np.asarray(measurements, dtype=float)
+        predicted = self.observation_matrix @ self.states + self.observation_offset[
+            :, None
+        ]
+        perturbed = measurements[:, None] + self.measurement_noise * (
+            self.rng.standard_normal(predicted.shape)
+        )
+
+        X = self.states - self.states.mean(axis=1, keepdims=True)
+        Y = predicted - predicted.mean(axis=1, keepdims=True)
+        P_xy = X @ Y.T / (self.n_members - 1)
+        P_yy = Y @ Y.T / (self.n_members - 1) + self.measurement_noise**2 * np.eye(
+            len(measurements)
+        )
+        gain = np.linalg.solve(P_yy, P_xy.T).T
+        self.states += gain @ (perturbed - predicted)
+
+    def step(self, t, measurements):
+        """
+        Propagate the ensemble to time ``t`` and assimilate the measurements taken at
+        that time. Returns the mean and standard deviation of the X-averaged state of
+        charge.
+        """
+        self.predict(t)
+        self.update(measurements)
+        return self.get_variable("X-averaged state of charge")
+
+    def get_variable(self, name):
+        """
+        Returns the ensemble mean and standard deviation of a model variable at the
+        current time
+        """
+        expression = self.sim.built_model.get_processed_variable(name)
+        values = np.array(
+            [
+                np.asarray(
+                    expression.evaluate(
+                        t=self.t, y=y, inputs=self.sim.get_inputs(inputs, y)
+                    ),
+                    dtype=float,
+                ).flatten()
+                for y, inputs in zip(self.states.T, self.member_inputs)
+            ]
+        )
+        mean = values.mean(axis=0)
+        std = values.std(axis=0, ddof=1)
+        if mean.size == 1:
+            return mean[0], std[0]
+        return mean, std
+
+    @property
+    def measurements(self):
+        """The ensemble mean of the sensor readings predicted by the model"""
+        predicted = self.observation_matrix @ self.states
+        return predicted.mean(axis=1) + self.observation_offset
@@ -0,0 +1,187 @@
+#
+# Vectorised evaluation of the variables of a solution at many points
+#
+import weakref
+
+import numpy as np
+from scipy import sparse
+
+from .interpolation import (
+    _interpolation_weights,
+    interpolation_matrix,
+    interpolation_matrix_2D,
+)
+
+_evaluators = weakref.WeakKeyDictionary()
+
+
+class SolutionEvaluator:
+    """
+    Evaluates the variables of a solution at arrays of query points by linear
+    interpolation in time and space. The field of each variable is processed once and
+    cached, and the interpolation weights are shared by all the variables of a query,
+    so evaluating many variables at many points is a few sparse products instead of
+    repeated calls to ``solution[variable](t=t, x=x, r=r)``.
+
+    Parameters
+    ----------
+    solution : :class:`pybamm.Solution` or :class:`encapsulated_ltes.CompactSolution`
+        The solution
+    """
+
+    def __init__(self, solution):
+        self.solution = solution
+        self.t = np.asarray(solution.t, dtype=float)
+        self._fields = {}
+        self._nodes = None
+
+    @property
+    def nodes(self):
+        """The coordinates of the mesh nodes of the pipe and the capsule"""
+        if self._nodes is None:
+            # The spatial variables are scaled also for symbolic meshes
+            x = self.solution["x [m]"].entries
+            r = self.solution["r [m]"].entries
+            self._nodes = {"pipe": x[:, 0], "capsule": r[:, 0, 0]}
+        return self._nodes
+
+    def get_field(self, name):
+        """
+        Returns the domains of a variable, its values as an array of shape (mesh
+        nodes, times), with the capsule nodes varying fastest, and the mesh nodes of
+        each domain
+        """
+        if name not in self._fields:
+            variable = self.solution[name]
+            if isinstance(variable.domains, list):
+                # variables of compact solutions have their own (subsampled) nodes
+                domains = variable.domains
+                nodes = variable.nodes
+                field = variable.decompress(self.t)
+            else:
+                domains = variable.domains["primary"] + variable.domains["secondary"]
+                nodes = [self.nodes[domain] for domain in domains]
+                entries = np.asarray(variable.entries, dtype=float)
+                field = entries.reshape(-1, len(self.t), order="F")
+            self._fields[name] = (domains, field, nodes)
+        return self._fields[name]
+
+    def _spatial_matrix(self, domains, all_nodes, x, r):
+        """Interpolation matrix from the mesh nodes of the domains to (r, x) grids"""
+        matrices = []
+        queries = [r if d == "capsule" else x for d in domains]
+        for nodes, points in zip(all_nodes, queries):
+            if points is None:
+                matrices.append(sparse.identity(len(nodes), format="csr"))
+            else:
+                matrices.append(interpolation_matrix(nodes, points))
+        if len(matrices) == 1:
+            return matrices[0]
+        # The capsule nodes vary fastest
+        return sparse.kron(matrices[1], matrices[0], format="csr")
+
+    def __call__(self, variables, t=None, x=None, r=None, points=False):
+        """
+        Evaluate one or several variables.
+
+        Parameters
+        ----------
+        variables : str or list of str
+            The variables
+        t : array-like, optional
+            The times, in seconds (default is the solution times)
+        x, r : array-like, optional
+            The positions in the pipe and the capsule, in m (default is the mesh
+            nodes). They are ignored by the variables that do not depend on them.
+        points : bool, optional
+            If False (default), the variables are evaluated on the grid given by
+            ``r``, ``x`` and ``t``, and the values have shape (r, x, t) as for
+            :class:`pybamm.ProcessedVariable`, without the dimensions given as
+            scalars. If True, ``t``, ``x`` and ``r`` are broadcast against each other
+            and the variables are evaluated at each of the points ``(t, x, r)``.
+
+        Returns
+        -------
+        array or dict
+            The values of the variable, or a dictionary of them if ``variables`` is a
+            list
+        """
+        names = [variables] if isinstance(variables, str) else list(variables)
+        if points:
+            values = self._evaluate_points(names, t, x, r)
+        else:
+            values = self._evaluate_grid(names, t, x, r)
+        if isinstance(variables, str):
+            return values[variables]
+        return values
+
+    def _evaluate_grid(self, names, t, x, r):
+        t_query = self.t if t is None else np.atleast_1d(np.asarray(t, dtype=float))
+        W_t = interpolation_matrix(self.t, t_query).T.tocsc()
+        queries = {"capsule": r, "pipe": x}
+
+        weights = {}
+        values = {}
+        for name in names:
+            domains, field, nodes = self.get_field(name)
+            key = (*domains, *map(len, nodes))
+            if key not in weights:
+                W = self._spatial_matrix(domains, nodes, x, r) if domains else None
+                weights[key] = W
+            W = weights[key]
+            value = field @ W_t if W is None else W @ (field @ W_t)
+            # Fields of two dimensions are ordered with r varying fastest
+            shape = [
+                len(n) if queries[d] is None else np.size(queries[d])
+                for d, n in zip(domains, nodes)
+            ]
+            value = np.asarray(value).reshape(*shape, len(t_query), order="F")
+            # Squeeze the dimensions given as scalars
+            scalar = [queries[d] is not None and np.ndim(queries[d]) == 0 for d in domains]
+            scalar.append(t is not None and np.ndim(t) == 0)
+            values[name] = value.reshape(
+                [n for n, s in zip(value.shape, scalar) if not s]
+            )
+        return values
+
+    def _evaluate_points(self, names, t, x, r):
+        t = self.t if t is None else t
+        t, x, r = np.broadcast_arrays(
+            np.asarray(t, dtype=float),
+            np.asarray(0 if x is None else x, dtype=float),
+            np.asarray(0 if r is None else r, dtype=float),
+        )
+        shape = t.shape
+        index_t, weight_t = _interpolation_weights(self.t, t.flatten())
+
+        weights = {}
+        values = {}
+        for name in names:
+            domains, field, nodes = self.get_field(name)
+            key = (*domains, *map(len, nodes))
+            if key not in weights:
+                if not domains:
+                    W = sparse.csr_matrix(np.ones((t.size, 1)))
+                elif len(domains) == 1:
+                    points = r if domains[0] == "capsule" else x
+                    W = interpolation_matrix(nodes[0], points.flatten())
+                else:
+                    W = interpolation_matrix_2D(*nodes, r.flatten(), x.flatten())
+                weights[key] = W.tocoo()
+            W = weights[key]
+            # Each point combines a few nodes at two times
+            time_values = field[W.col[:, None], index_t[W.row]] * weight_t[W.row]
+            value = np.bincount(W.row, W.data * time_values.sum(axis=1), minlength=t.size)
+            values[name] = value.reshape(shape)
+        return values
+
+
+def evaluate(solution, variables, t=None, x=None, r=None, points=False):
+    """
+    Evaluate variables of a solution at arrays of query points, see
+    :class:`SolutionEvaluator`. The evaluator of each solution is cached, so the
+    fields of the variables are only processed once.
+    """
+    if solution not in _evaluators:
+        _evaluators[solution] = SolutionEvaluator(solution)
+    return _evaluators[solution](variables, t=t, x=x, r=r, points=points)
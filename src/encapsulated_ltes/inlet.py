@@ -0,0 +1,304 @@
+#
+# Measured inlet profiles, as interpolants of time with declared discontinuities
+#
+from pathlib import Path
+
+import casadi
+import numpy as np
+import pybamm
+
+#: Parameters which can be set from a measured profile
+INLET_PARAMETERS = {
+    "temperature": "Inlet temperature [K]",
+    "velocity": "Inlet velocity [m.s-1]",
+}
+
+
+def _create_lookup_table(x, y):
+    """The casadi lookup table of a time series, with binary search"""
+    return casadi.interpolant(
+        "LUT", "linear", [x], np.asarray(y).flatten(), {"lookup_mode": ["binary"]}
+    )
+
+
+class TimeSeriesInterpolant(pybamm.Interpolant):
+    """
+    Linear interpolant of a long time series. Unlike :class:`pybamm.Interpolant`,
+    whose data are constants of the casadi expression and are copied at every
+    evaluation, it is converted to a casadi lookup table which keeps the data, so
+    each evaluation is a binary search, i.e. O(log n) for n samples. Its derivative
+    is the slope of each segment.
+
+    Parameters
+    ----------
+    x : array-like
+        The times of the samples, increasing
+    y : array-like
+        The values of the samples
+    children : :class:`pybamm.Symbol`
+        The time at which to evaluate the interpolant
+    name : str, optional
+        The name of the interpolant
+    extrapolate : bool, optional
+        Whether to extrapolate linearly outside the samples (default is True)
+    lookup_table : :class:`casadi.Function`, optional
+        The lookup table of the samples, which the copies of the interpolant share
+        (default is to create it when the interpolant is first converted to casadi)
+    """
+
+    def __init__(
+        self,
+        x,
+        y,
+        children,
+        name=None,
+        extrapolate=True,
+        entries_string=None,
+        lookup_table=None,
+        _num_derivatives=0,
+    ):
+        super().__init__(
+            x,
+            y,
+            children,
+            name=name,
+            interpolator="linear",
+            extrapolate=extrapolate,
+            entries_string=entries_string,
+        )
+        self.lookup_table = lookup_table
+        self._num_derivatives = _num_derivatives
+        if _num_derivatives > 0:
+            x = self.x[0]
+            slopes = np.diff(self.y) / np.diff(x)
+            if _num_derivatives > 1:
+                slopes = np.zeros_like(slopes)
+
+            def derivative(t):
+                i = np.searchsorted(x, t, side="right") - 1
+                return slopes[np.clip(i, 0, len(slopes) - 1)]
+
+            self.function = derivative
+
+    def create_copy(self, new_children=None, perform_simplifications=True):
+        """See :meth:`pybamm.Symbol.new_copy()`."""
+        return TimeSeriesInterpolant(
+            self.x,
+            self.y,
+            self._children_for_copying(new_children),
+            name=self.name,
+            extrapolate=self.extrapolate,
+            entries_string=self.entries_string,
+            lookup_table=self.lookup_table,
+            _num_derivatives=self._num_derivatives,
+        )
+
+    def _function_diff(self, children, idx):
+        """See :meth:`pybamm.Symbol._function_diff()`."""
+        return TimeSeriesInterpolant(
+            self.x,
+            self.y,
+            children,
+            name=self.name,
+            extrapolate=self.extrapolate,
+            entries_string=self.entries_string,
+            lookup_table=self.lookup_table,
+            _num_derivatives=self._num_derivatives + 1,
+        )
+
+    def _get_lookup_table(self):
+        if self.lookup_table is None:
+            self.lookup_table = _create_lookup_table(self.x[0], self.y)
+        return self.lookup_table
+
+    def _to_casadi(self, t, y, y_dot, inputs, casadi_symbols):
+        """See :meth:`pybamm.Symbol._to_casadi()`."""
+        (child,) = self._children_to_casadi(t, y, y_dot, inputs, casadi_symbols)
+        table = self._get_lookup_table()
+        if self._num_derivatives == 0:
+            return table(child)
+        if self._num_derivatives > 1:
+            return casadi.MX.zeros(child.shape)
+        s = casadi.MX.sym("s")
+        slope = casadi.Function("slope", [s], [casadi.jacobian(table(s), s)])
+        return slope(child)
+
+
+class InletProfile:
+    """
+    Measured time series of an inlet condition, e.g. the inlet temperature or velocity
+    exported from a plant historian, as a function of time which can be used as the
+    value of the parameter (see :func:`set_inlet_profiles`).
+
+    The profile is interpolated linearly between the samples, with an O(log n) cost
+    per evaluation (see :class:`TimeSeriesInterpolant`) in a lookup table created
+    once per profile, and its derivative is the slope of each segment. Steps of the
+    profile are kept as discontinuities, and their times are listed in
+    :attr:`breakpoints`, which should be declared to the solver (see
+    :meth:`encapsulated_ltes.BaseLTESModel.add_breakpoints`). A step is either given
+    as two samples at the same time (before and after the step), found from
+    ``jump_threshold`` or declared in ``breakpoints``. In the last two cases, the
+    value before the step is held from the previous sample.
+
+    Parameters
+    ----------
+    t : array-like
+        The times of the samples, in seconds. They are sorted, and samples with NaN
+        values are dropped.
+    values : array-like
+        The values of the samples
+    breakpoints : array-like, optional
+        Times of known discontinuities, e.g. when a pump is switched on or off
+    jump_threshold : float, optional
+        Changes between consecutive samples larger than this are steps
+    scale : float, optional
+        Factor by which to multiply the values (default is 1), e.g. ``1 / (epsilon *
+        A)`` to turn a volumetric flow rate through a column of cross-sectional area
+        ``A`` into the inlet velocity
+    name : str, optional
+        The name of the interpolant (default is "Inlet profile")
+    """
+
+    def __init__(
+        self,
+        t,
+        values,
+        breakpoints=None,
+        jump_threshold=None,
+        scale=1,
+        name="Inlet profile",
+    ):
+        t = np.asarray(t, dtype=float)
+        values = np.asarray(values, dtype=float) * scale
+        if t.shape != values.shape or t.ndim != 1:
+            msg = "The times and values must be 1D arrays of the same length"
+            raise ValueError(msg)
+        keep = np.isfinite(t) & np.isfinite(values)
+        order = np.argsort(t[keep], kind="stable")
+        t, values = t[keep][order], values[keep][order]
+        if len(t) < 2:
+            msg = "An inlet profile needs at least two samples"
+            raise ValueError(msg)
+        self.name = name
+
+        # Samples at the same time are the values before and after a step
+        times, first = np.unique(t, return_index=True)
+        last = np.append(first[1:], len(t)) - 1
+        y = values[last]
+        left = np.where(values[first] != y, values[first], np.nan)
+
+        # Declared steps, held from the previous sample
+        steps = np.zeros(len(times), dtype=bool)
+        if jump_threshold is not None:
+            steps[1:] = np.abs(np.diff(y)) > jump_threshold
+        if breakpoints is not None:
+            breakpoints = np.asarray(breakpoints, dtype=float)
+            breakpoints = breakpoints[
+                (breakpoints > times[0]) & (breakpoints < times[-1])
+            ]
+            new = np.setdiff1d(breakpoints, times)
+            # a step between two samples takes the value of the next sample
+            i = np.searchsorted(times, new)
+            times = np.insert(times, i, new)
+            y = np.insert(y, i, y[i])
+            left = np.insert(left, i, np.nan)
+            steps = np.insert(steps, i, False)
+            steps[np.isin(times, breakpoints)] = True
+        steps[0] = False
+        held = steps & np.isnan(left)
+        left[held] = y[np.nonzero(held)[0] - 1]
+        left[0] = np.nan
+
+        jumps = ~np.isnan(left)
+        self.breakpoints = times[jumps]
+        x = np.concatenate([times, np.nextafter(times[jumps], -np.inf)])
+        y = np.concatenate([y, left[jumps]])
+        order = np.argsort(x, kind="stable")
+        self.t = x[order]
+        self.values = y[order]
+        self._lookup_table = None
+
+    def __call__(self, t):
+        """The profile as a function of time, for the parameter values"""
+        # the lookup table is shared by all the interpolants of the profile
+        if self._lookup_table is None:
+            self._lookup_table = _create_lookup_table(self.t, self.values)
+        return TimeSeriesInterpolant(
+            self.t, self.values, t, name=self.name, lookup_table=self._lookup_table
+        )
+
+    def evaluate(self, t):
+        """The values of the profile at times ``t``, in seconds"""
+        return np.interp(t, self.t, self.values)
+
+
+def load_inlet_profile(path, time_column=0, value_column=1, delimiter=",", **kwargs):
+    """
+    Returns a measured inlet profile read from a CSV file with a header row, e.g. an
+    export of a plant historian. Empty values are dropped.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the file
+    time_column : int or str, optional
+        The index or name of the column of the times (default is 0). Times which
+        are not numbers are read as timestamps (e.g. "2024-03-01T12:00:00"),
+        and measured in seconds from the first one.
+    value_column : int or str, optional
+        The index or name of the column of the values (default is 1)
+    delimiter : str, optional
+        The delimiter of the columns (default is ",")
+    **kwargs
+        Keyword arguments passed to :class:`InletProfile`
+    """
+    with Path(path).open() as f:
+        header = [name.strip() for name in f.readline().split(delimiter)]
+    columns = [
+        header.index(column) if isinstance(column, str) else column
+        for column in (time_column, value_column)
+    ]
+    t, values = np.loadtxt(
+        path,
+        delimiter=delimiter,
+        skiprows=1,
+        usecols=columns,
+        dtype=str,
+        unpack=True,
+    )
+    try:
+        t = t.astype(float)
+    except ValueError:
+        t = t.astype("datetime64[ns]")
+        t = (t - t.min()) / np.timedelta64(1, "s")
+    values = np.char.strip(values)
+    values = np.where(values == "", "nan", values).astype(float)
+    return InletProfile(t, values, **kwargs)
+
+
+def set_inlet_profiles(parameter_values, temperature=None, velocity=None, model=None):
+    """
+    Returns a copy of the parameter values with the inlet temperature and velocity
+    given by measured profiles, and declares the steps of the profiles to the solver
+    as breakpoints of the model.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`
+        The parameter values
+    temperature : :class:`InletProfile`, optional
+        The profile of the inlet temperature, in K
+    velocity : :class:`InletProfile`, optional
+        The profile of the inlet velocity, in m.s-1
+    model : :class:`encapsulated_ltes.BaseLTESModel`, optional
+        The model, to which the breakpoints are added. It must not have been built.
+    """
+    parameter_values = parameter_values.copy()
+    profiles = {"temperature": temperature, "velocity": velocity}
+    for key, profile in profiles.items():
+        if profile is None:
+            continue
+        parameter_values[INLET_PARAMETERS[key]] = profile
+        if model is not None:
+            model.add_breakpoints(profile.breakpoints)
+    return parameter_values
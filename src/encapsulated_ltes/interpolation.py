@@ -0,0 +1,102 @@
+#
+# Linear interpolation weights from mesh nodes to arbitrary points
+#
+import numpy as np
+from scipy import sparse
+
+
+def _interpolation_weights(nodes, points):
+    """Returns the indices of the two nodes used for each point and their weights"""
+    nodes = np.asarray(nodes, dtype=float).flatten()
+    points = np.atleast_1d(np.asarray(points, dtype=float)).flatten()
+    if len(nodes) == 1:
+        index = np.zeros((len(points), 2), dtype=int)
+        weight = np.full((len(points), 2), 0.5)
+        return index, weight
+
+    index = np.clip(np.searchsorted(nodes, points) - 1, 0, len(nodes) - 2)
+    weight = (points - nodes[index]) / (nodes[index + 1] - nodes[index])
+    return np.column_stack([index, index + 1]), np.column_stack([1 - weight, weight])
+
+
+def interpolation_matrix(nodes, points):
+    """
+    Returns the sparse matrix that maps values at the mesh nodes to their linear
+    interpolation at the given points. Points outside the nodes (e.g. at the domain
+    boundaries for a finite volume mesh) are linearly extrapolated from the two
+    closest nodes.
+
+    Parameters
+    ----------
+    nodes : array-like
+        The (increasing) coordinates of the mesh nodes
+    points : array-like
+        The coordinates of the points to interpolate at
+
+    Returns
+    -------
+    :class:`scipy.sparse.csr_matrix`
+        The interpolation matrix, of shape ``(len(points), len(nodes))``
+    """
+    index, weight = _interpolation_weights(nodes, points)
+    rows = np.repeat(np.arange(len(index)), 2)
+    shape = (len(index), np.size(nodes))
+    return sparse.csr_matrix((weight.flatten(), (rows, index.flatten())), shape=shape)
+
+
+def interpolation_matrix_2D(r_nodes, x_nodes, r, x):
+    """
+    Returns the sparse matrix that maps values of a capsule-pipe field (with ``r`` as
+    the primary and ``x`` as the secondary dimension, as ordered by the
+    discretisation) to their bilinear interpolation at the points ``(r, x)``.
+
+    Parameters
+    ----------
+    r_nodes, x_nodes : array-like
+        The coordinates of the mesh nodes in the capsule and the pipe
+    r, x : array-like
+        The coordinates of the points to interpolate at, broadcast against each other
+
+    Returns
+    -------
+    :class:`scipy.sparse.csr_matrix`
+        The interpolation matrix, of shape ``(n_points, len(r_nodes) * len(x_nodes))``
+    """
+    r, x = np.broadcast_arrays(np.atleast_1d(r), np.atleast_1d(x))
+    index_r, weight_r = _interpolation_weights(r_nodes, r.flatten())
+    index_x, weight_x = _interpolation_weights(x_nodes, x.flatten())
+    n_r = np.size(r_nodes)
+    # Each point combines the two closest nodes in each direction
+    index = index_x[:, :, None] * n_r + index_r[:, None, :]
+    weight = weight_x[:, :, None] * weight_r[:, None, :]
+    rows = np.repeat(np.arange(len(index)), 4)
+    shape = (len(index), n_r * np.size(x_nodes))
+    return sparse.csr_matrix((weight.flatten(), (rows, index.flatten())), shape=shape)
+
+
+def sensor_matrix(weights, times, t):
+    """
+    Returns the sparse matrix that maps a field, sampled at the mesh nodes and the
+    times ``t`` and flattened with the nodes varying fastest (i.e. the entries of a
+    processed variable reshaped in Fortran order), to its values at a set of sensors.
+
+    Parameters
+    ----------
+    weights : :class:`scipy.sparse.spmatrix`
+        The spatial interpolation weights, with one row per sensor
+    times : list of array-like
+        The measurement times of each sensor
+    t : array-like
+        The times at which the field is sampled
+
+    Returns
+    -------
+    :class:`scipy.sparse.csr_matrix`
+        The interpolation matrix, with one row per measurement, ordered by sensor
+    """
+    weights = sparse.csr_matrix(weights)
+    blocks = [
+        sparse.kron(interpolation_matrix(t, times_k), weights[k])
+        for k, times_k in enumerate(times)
+    ]
+    return sparse.vstack(blocks).tocsr()
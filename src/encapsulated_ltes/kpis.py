@@ -0,0 +1,231 @@
+#
+# Scalar key performance indicators computed during the solve
+#
+import numpy as np
+import pybamm
+
+from .simulation import LTESSimulation
+
+KPI_VARIABLES = [
+    "Outlet temperature [K]",
+    "X-averaged state of charge",
+    "Stored energy per unit area [J.m-2]",
+    "Relative error in energy conservation [%]",
+]
+
+
+def get_adaptive_times(t, values, n_points):
+    """
+    Returns ``n_points`` times, including the first and last of ``t``, which are
+    concentrated where the time series ``values`` change: they are equally spaced in
+    the arc length of the curve of the series against time, each scaled by its
+    range, so flat parts of the run (e.g. a fully charged bed) get few points.
+
+    Parameters
+    ----------
+    t : array-like
+        The times of the series, e.g. the time steps of the solver
+    values : dict
+        The time series, with one entry per time
+    n_points : int
+        The number of times to return
+    """
+    t = np.asarray(t, dtype=float)
+    if len(t) < 2:
+        return t
+    # the time counts as one series, so the points are never too sparse
+    series = [(t - t[0]) / (t[-1] - t[0])]
+    for value in values.values():
+        y = np.asarray(value, dtype=float)
+        series.append((y - y[0]) / (np.ptp(y) or 1))
+    steps = np.linalg.norm(np.diff(np.array(series), axis=1), axis=0)
+    arc_length = np.concatenate([[0], np.cumsum(steps)])
+    targets = np.linspace(0, arc_length[-1], n_points)
+    return np.unique(np.interp(targets, arc_length, t))
+
+
+class KPISummary:
+    """
+    Summary statistics of the KPIs, updated incrementally as chunks of their time
+    series become available, so the full time series need not be kept.
+
+    Parameters
+    ----------
+    soc_threshold : float, optional
+        The state of charge for the charging time (default is 0.9)
+    """
+
+    def __init__(self, soc_threshold=0.9):
+        self.soc_threshold = soc_threshold
+        self.peak_outlet_temperature = -np.inf
+        self.time_of_peak_outlet_temperature = None
+        self.time_to_soc_threshold = None
+        self.max_energy_error = 0
+        self.final = {}
+        self._last = None
+
+    def update(self, t, values):
+        """
+        Update the statistics with the KPIs at times ``t`` (in seconds), given as a
+        dictionary of arrays with one entry per time
+        """
+        t = np.asarray(t, dtype=float)
+
+        name = "Outlet temperature [K]"
+        if name in values:
+            i = np.argmax(values[name])
+            if values[name][i] > self.peak_outlet_temperature:
+                self.peak_outlet_temperature = float(values[name][i])
+                self.time_of_peak_outlet_temperature = float(t[i])
+
+        name = "X-averaged state of charge"
+        if name in values and self.time_to_soc_threshold is None:
+            soc = np.asarray(values[name], dtype=float)
+            # Include the last point of the previous chunk to catch crossings between
+            # chunks
+            if self._last is not None:
+                t = np.concatenate([[self._last[0]], t])
+                soc = np.concatenate([[self._last[1]], soc])
+            (crossed,) = np.nonzero(soc >= self.soc_threshold)
+            if len(crossed) > 0:
+                i = crossed[0]
+                if i == 0:
+                    self.time_to_soc_threshold = float(t[0])
+                else:
+                    self.time_to_soc_threshold = float(
+                        np.interp(self.soc_threshold, soc[i - 1 : i + 1], t[i - 1 : i + 1])
+                    )
+            self._last = (t[-1], soc[-1])
+
+        name = "Relative error in energy conservation [%]"
+        if name in values:
+            self.max_energy_error = max(
+                self.max_energy_error, float(np.max(np.abs(values[name])))
+            )
+
+        self.final.update({name: float(value[-1]) for name, value in values.items()})
+
+    @property
+    def summary(self):
+        """Dictionary of the summary statistics"""
+        return {
+            "Peak outlet temperature [K]": self.peak_outlet_temperature,
+            "Time of peak outlet temperature [s]": self.time_of_peak_outlet_temperature,
+            f"Time to {self.soc_threshold:.0%} state of charge [s]": (
+                self.time_to_soc_threshold
+            ),
+            "Maximum relative error in energy conservation [%]": self.max_energy_error,
+            **{f"Final {name[0].lower()}{name[1:]}": v for name, v in self.final.items()},
+        }
+
+
+def solve_kpis(
+    model,
+    t_eval,
+    t_interp=None,
+    parameter_values=None,
+    variables=None,
+    inputs=None,
+    n_chunks=1,
+    soc_threshold=0.9,
+    adaptive=False,
+    solver_options=None,
+    **kwargs,
+):
+    """
+    Solve a model returning only the time series of some scalar variables (KPIs),
+    which are evaluated by the solver during the integration, so the full state is not
+    stored at the output times. The integration can be split in chunks, the summary
+    statistics being updated after each chunk.
+
+    The run stops early at the termination events of the model, if any (see
+    :meth:`encapsulated_ltes.BaseLTESModel.add_termination_events`), in which case
+    the time series end at the time of the event.
+
+    Parameters
+    ----------
+    model : :class:`encapsulated_ltes.BaseLTESModel`
+        The model. Its output variables must include the KPIs, e.g. with the "0D KPIs
+        only" output variables option.
+    t_eval : array-like
+        The start and end times of the simulation, in seconds
+    t_interp : array-like, optional
+        The times at which to return the KPIs (default is 101 equally spaced times).
+        With ``adaptive``, only their number (and the bounds of the chunks) is used.
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the model default parameter values)
+    variables : list of str, optional
+        The KPIs (default is the outlet temperature, the X-averaged state of charge,
+        the stored energy and the relative error in energy conservation)
+    inputs : dict, optional
+        Parameters passed as inputs of the simulation, and their values
+    n_chunks : int, optional
+        The number of chunks (default is 1)
+    soc_threshold : float, optional
+        The state of charge for the charging time (default is 0.9)
+    adaptive : bool, optional
+        Whether to concentrate the output times where the KPIs change (default is
+        False). The KPIs are recorded at every time step of the solver and
+        interpolated linearly at the times given by :func:`get_adaptive_times`.
+    solver_options : dict, optional
+        Keyword arguments passed to :class:`pybamm.IDAKLUSolver`
+    **kwargs
+        Keyword arguments passed to :class:`encapsulated_ltes.LTESSimulation`
+
+    Returns
+    -------
+    kpis : dict
+        The time series of the KPIs, as well as "Time [s]"
+    summary : dict
+        The summary statistics (see :class:`KPISummary`), as well as "Termination",
+        the reason the solver stopped (e.g. "event: State of charge target")
+    """
+    variables = variables or KPI_VARIABLES
+    inputs = inputs or {}
+    if t_interp is None:
+        t_interp = np.linspace(t_eval[0], t_eval[-1], 101)
+    t_interp = np.asarray(t_interp, dtype=float)
+
+    solver = pybamm.IDAKLUSolver(output_variables=variables, **(solver_options or {}))
+    sim = LTESSimulation(
+        model,
+        parameter_values=parameter_values,
+        inputs=list(inputs),
+        initial_state_input=n_chunks > 1,
+        solver=solver,
+        **kwargs,
+    )
+
+    summary = KPISummary(soc_threshold)
+    kpis = {"Time [s]": [], **{name: [] for name in variables}}
+    # Consecutive chunks share their end points
+    bounds = np.linspace(0, len(t_interp) - 1, n_chunks + 1).round().astype(int)
+    initial_state = None
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        t_chunk = t_interp[start : end + 1]
+        solution = sim.solve(
+            [t_chunk[0], t_chunk[-1]],
+            inputs=inputs,
+            initial_state=initial_state,
+            # the solver returns its own time steps if there are no output times
+            t_interp=None if adaptive else t_chunk,
+        )
+        t = solution.t
+        values = {name: solution[name].entries for name in variables}
+        if adaptive:
+            t_adaptive = get_adaptive_times(t, values, len(t_chunk))
+            values = {name: np.interp(t_adaptive, t, v) for name, v in values.items()}
+            t = t_adaptive
+        t = t[(i > 0) :]
+        values = {name: value[(i > 0) :] for name, value in values.items()}
+        summary.update(t, values)
+        kpis["Time [s]"].append(t)
+        for name in variables:
+            kpis[name].append(values[name])
+        if solution.termination.startswith("event"):
+            break
+        if n_chunks > 1:
+            initial_state = sim.get_final_state(solution)
+
+    kpis = {name: np.concatenate(value) for name, value in kpis.items()}
+    return kpis, {**summary.summary, "Termination": solution.termination}
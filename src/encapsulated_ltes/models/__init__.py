@@ -1,3 +1,3 @@
-from .base_LTES_model import BaseLTESModel
+from .base_LTES_model import OUTPUT_VARIABLE_PRESETS, BaseLTESModel
 from .full_model import FullModel
 from .reduced_model import ReducedModel
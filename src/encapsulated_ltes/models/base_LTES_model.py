@@ -7,14 +7,52 @@ import pybamm
 from ..parameter_values import get_parameter_values
 from ..parameters import EncapsulatedLTESParameters
 
+#: Output variables registered by each value of the "output variables" option (all of
+#: them for "full")
+OUTPUT_VARIABLE_PRESETS = {
+    "full": None,
+    # Variables that only depend on time
+    "0D KPIs only": [
+        "X-averaged phase-change material surface temperature [K]",
+        "X-averaged phase-change material surface temperature [degC]",
+        "X-averaged state of charge",
+        "Inlet temperature [K]",
+        "Outlet temperature [K]",
+        "Inlet temperature [degC]",
+        "Outlet temperature [degC]",
+        "Total enthalpy of phase-change material per unit area [J.m-2]",
+        "Total enthalpy of heat transfer fluid per unit area [J.m-2]",
+        "Total enthalpy per unit area [J.m-2]",
+        "Variation in total enthalpy per unit area [J.m-2]",
+        "Stored energy per unit area [J.m-2]",
+        "Stored energy rate per unit area [W.m-2]",
+        "X-averaged flux into phase-change material [W.m-2]",
+        "Error in energy conservation [J.m-2]",
+        "Relative error in energy conservation [%]",
+    ],
+    # Temperatures measured by probes in the bed, e.g. to compare with experiments
+    "sensors": [
+        "Heat transfer fluid temperature [K]",
+        "Heat transfer fluid temperature [degC]",
+        "Phase-change material temperature [K]",
+        "Phase-change material temperature [degC]",
+        "Inlet temperature [K]",
+        "Outlet temperature [K]",
+        "Inlet temperature [degC]",
+        "Outlet temperature [degC]",
+    ],
+}
+
 
 class BaseLTESModel(pybamm.models.base_model.BaseModel):
-    def __init__(self, name="Unnamed LTES model"):
+    def __init__(self, name="Unnamed LTES model", options=None):
         super().__init__(name=name)
+        self.options = self._process_options(options)
+
         ######################
         # Get parameters
         ######################
-        self.param = EncapsulatedLTESParameters()
+        self.param = EncapsulatedLTESParameters(self.options)
 
         ######################
         # Define spatial variables
@@ -41,6 +79,46 @@ class BaseLTESModel(pybamm.models.base_model.BaseModel):
             "x [mm]": self.x * 1000,
         }
 
+        # Probes of variables at fixed points, as {name: (variable, x, r)}
+        self.probes = {}
+
+        # Times at which the inputs of the model are discontinuous
+        self.breakpoints = []
+
+        # All the output variables, including those not selected by the "output
+        # variables" option, e.g. for the termination events
+        self._all_variables = {}
+
+    @property
+    def possible_options(self):
+        """Possible values of each model option, the first one being the default"""
+        return {
+            # "smooth" makes the closures differentiable, e.g. for sensitivities, and
+            # "tabulated" uses measured curves (see set_pcm_properties)
+            "closures": ["piecewise", "smooth", "tabulated"],
+            # restricts the output variables to a preset, to reduce the cost of
+            # processing the solution (see OUTPUT_VARIABLE_PRESETS)
+            "output variables": list(OUTPUT_VARIABLE_PRESETS),
+        }
+
+    def _process_options(self, options):
+        """Check the model options and fill in the default values"""
+        options = options or {}
+        for key, value in options.items():
+            if key not in self.possible_options:
+                msg = f"Option '{key}' not recognised"
+                raise pybamm.OptionError(msg)
+            if value not in self.possible_options[key]:
+                msg = (
+                    f"Option '{key}' must be one of {self.possible_options[key]}, "
+                    f"not '{value}'"
+                )
+                raise pybamm.OptionError(msg)
+        return {
+            key: options.get(key, values[0])
+            for key, values in self.possible_options.items()
+        }
+
     def _set_output_variables(self, T_f, T_c, H, Q):
         param = self.param
         T_c_av = pybamm.Integral(T_c, self.x) / param.Z
@@ -59,15 +137,15 @@ class BaseLTESModel(pybamm.models.base_model.BaseModel):
         T_in = pybamm.boundary_value(T_f, "left")
         T_out = pybamm.boundary_value(T_f, "right")
 
-        phase = (param.rho_s * param.c_p_s * param.T_m + param.rho_s * param.L / 2 <= H)
-        phase_av = (H_av >= param.rho_s * param.c_p_s * param.T_m + param.rho_s * param.L / 2)
+        phase = param.phase(H)
+        phase_av = param.phase(H_av)
 
         ones_xr = pybamm.FullBroadcast(pybamm.Scalar(1), broadcast_domains={"primary": "capsule", "secondary": "pipe"})
         ones_r = pybamm.FullBroadcast(pybamm.Scalar(1), broadcast_domains={"primary": "capsule"})
         SoC = pybamm.Integral(phase, self.r) / pybamm.Integral(ones_xr, self.r)
         SoC_av = pybamm.Integral(phase_av, self.r) / pybamm.Integral(ones_r, self.r)
 
-        self.variables.update(
+        self._add_output_variables(
             {
                 "Heat transfer fluid temperature [K]": T_f,
                 "Heat transfer fluid temperature [degC]": T_f - pybamm.Scalar(273.15),
@@ -94,6 +172,7 @@ class BaseLTESModel(pybamm.models.base_model.BaseModel):
                 "Total enthalpy per unit area [J.m-2]": H_tot,
                 "Variation in total enthalpy per unit area [J.m-2]": H_tot - H_tot0,
                 "Stored energy per unit area [J.m-2]": Q,
+                "Stored energy rate per unit area [W.m-2]": self.rhs[Q],
                 "Flux into phase-change material [W.m-2]": q,
                 "X-averaged flux into phase-change material [W.m-2]": q_av,
                 "Error in energy conservation [J.m-2]": H_tot - H_tot0 - Q,
@@ -101,6 +180,153 @@ class BaseLTESModel(pybamm.models.base_model.BaseModel):
             }
         )
 
+    def add_termination_events(
+        self,
+        soc=None,
+        outlet_temperature_difference=None,
+        energy_error=None,
+        stored_energy_rate=None,
+    ):
+        """
+        Add events which stop the solver before the end of the run, e.g. once the bed
+        is charged. Each event is only added if its threshold is given.
+
+        Parameters
+        ----------
+        soc : float, optional
+            The target of the X-averaged state of charge. The event is named "State
+            of charge target".
+        outlet_temperature_difference : float, optional
+            The difference between the inlet and the outlet temperatures, in K, below
+            which the bed is in equilibrium with the inlet ("Outlet temperature").
+            The outlet temperature is compared with the imposed inlet temperature.
+        energy_error : float, optional
+            The largest absolute relative error in energy conservation, in %, which
+            stops runs whose solution is no longer accurate ("Energy conservation
+            error")
+        stored_energy_rate : float, optional
+            The absolute rate of change of the stored energy, in W.m-2, below which the
+            charge (or discharge) has stalled ("Stored energy rate"). It is only
+            armed once 1% of the latent heat of the bed has been stored or released.
+        """
+        param = self.param
+        variables = self._all_variables
+        events = {}
+        if soc is not None:
+            SoC = variables["X-averaged state of charge"]
+            events["State of charge target"] = soc - SoC
+        if outlet_temperature_difference is not None:
+            # the imposed inlet temperature, as the "Inlet temperature [K]" variable
+            # is the boundary value of the fluid temperature
+            T_out = variables["Outlet temperature [K]"]
+            events["Outlet temperature"] = (
+                abs(param.T_in - T_out) - outlet_temperature_difference
+            )
+        if energy_error is not None:
+            error = variables["Relative error in energy conservation [%]"]
+            events["Energy conservation error"] = energy_error - abs(error)
+        if stored_energy_rate is not None:
+            # the rate is zero at the start of the run, when the fluid at the inlet is
+            # still at the initial temperature, so the event is only armed once 1% of
+            # the latent heat of the bed is stored (or released)
+            Q = variables["Stored energy per unit area [J.m-2]"]
+            latent_heat = param.Z * (1 - param.epsilon) * param.rho_s * param.L
+            not_armed = 0.01 * latent_heat - abs(Q)
+            rate = variables["Stored energy rate per unit area [W.m-2]"]
+            events["Stored energy rate"] = pybamm.maximum(
+                abs(rate) - stored_energy_rate, not_armed
+            )
+        for name, expression in events.items():
+            self.events.append(pybamm.Event(name, expression))
+
+    def add_breakpoints(self, times):
+        """
+        Declare times at which the inputs of the model are discontinuous, e.g. the
+        steps of a measured inlet temperature (see
+        :class:`encapsulated_ltes.InletProfile`). The simulation stops the solver
+        just before each of them and restarts it just after (see
+        :meth:`encapsulated_ltes.LTESSimulation.solve`), instead of stepping over
+        them.
+
+        Parameters
+        ----------
+        times : array-like
+            The times of the discontinuities, in seconds
+        """
+        times = np.asarray(times, dtype=float).flatten()
+        self.breakpoints = np.union1d(self.breakpoints, times).tolist()
+
+    def add_probe(self, name, variable, x, r=None):
+        """
+        Add a probe, which measures a variable at a fixed point. Probes are scalar
+        output variables built from the interpolation weights on the discretised mesh
+        (by :class:`encapsulated_ltes.LTESSimulation`), so they can be recorded by the
+        solver (e.g. as ``output_variables`` of :class:`pybamm.IDAKLUSolver`) without
+        storing the whole field.
+
+        Parameters
+        ----------
+        name : str
+            The name of the probe variable
+        variable : str
+            The name of the variable to measure
+        x : float
+            The position of the probe in the pipe, in m
+        r : float, optional
+            The position of the probe in the capsule, in m (only used for variables in
+            the capsule)
+        """
+        if variable not in self.variables:
+            msg = f"Variable '{variable}' is not an output variable of the model"
+            raise KeyError(msg)
+        if self.variables[variable].domain != ["capsule"]:
+            r = None
+        elif r is None:
+            msg = f"Probes of '{variable}' need a position in the capsule"
+            raise ValueError(msg)
+        self.probes[name] = (variable, x, r)
+
+    def add_probes(self, points, variables=None):
+        """
+        Add probes at a list of points, returning their names. Each probe is named
+        after the variable and the index of the point, e.g. "Heat transfer fluid
+        temperature [degC] at probe 0".
+
+        Parameters
+        ----------
+        points : list of tuple
+            The ``(x, r)`` positions of the probes, in m, with ``r`` None for points
+            which only measure the heat transfer fluid
+        variables : list of str, optional
+            The variables to measure (default is the heat transfer fluid temperature
+            and, for points with ``r``, the phase-change material temperature, in
+            degC)
+        """
+        names = []
+        for i, (x, r) in enumerate(points):
+            if variables is not None:
+                point_variables = variables
+            elif r is None:
+                point_variables = ["Heat transfer fluid temperature [degC]"]
+            else:
+                point_variables = [
+                    "Heat transfer fluid temperature [degC]",
+                    "Phase-change material temperature [degC]",
+                ]
+            for variable in point_variables:
+                name = f"{variable} at probe {i}"
+                self.add_probe(name, variable, x, r)
+                names.append(name)
+        return names
+
+    def _add_output_variables(self, variables):
+        """Add the output variables selected by the "output variables" option"""
+        self._all_variables.update(variables)
+        preset = OUTPUT_VARIABLE_PRESETS[self.options["output variables"]]
+        if preset is not None:
+            variables = {name: var for name, var in variables.items() if name in preset}
+        self.variables.update(variables)
+
     @property
     def default_geometry(self):
         return pybamm.Geometry(
@@ -134,13 +360,14 @@ class BaseLTESModel(pybamm.models.base_model.BaseModel):
 
     @property
     def default_quick_plot_variables(self):
-        return [
+        variables = [
             "Heat transfer fluid temperature [K]",
             "Phase-change material temperature [K]",
             "Phase-change material enthalpy [J.m-3]",
             "Phase",
             "Stored energy per unit area [J.m-2]",
         ]
+        return [name for name in variables if name in self.variables]
 
     @property
     def default_parameter_values(self):
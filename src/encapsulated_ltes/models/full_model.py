@@ -7,8 +7,8 @@ from .base_LTES_model import BaseLTESModel
 
 
 class FullModel(BaseLTESModel):
-    def __init__(self, name="Full model"):
-        super().__init__(name=name)
+    def __init__(self, name="Full model", options=None):
+        super().__init__(name=name, options=options)
 
         param = self.param
 
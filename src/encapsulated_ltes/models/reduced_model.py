@@ -7,8 +7,8 @@ from .base_LTES_model import BaseLTESModel
 
 
 class ReducedModel(BaseLTESModel):
-    def __init__(self, name="Reduced model"):
-        super().__init__(name=name)
+    def __init__(self, name="Reduced model", options=None):
+        super().__init__(name=name, options=options)
 
         param = self.param
 
@@ -91,7 +91,7 @@ class ReducedModel(BaseLTESModel):
         ######################
         self._set_output_variables(T_f, T_c, H, Q)
 
-        self.variables.update(
+        self._add_output_variables(
             {
                 "X-averaged phase-change material enthalpy [J.m-3]": H_av,
                 "X-averaged phase-change material temperature [K]": T_c_av,
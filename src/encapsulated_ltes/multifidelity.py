@@ -0,0 +1,328 @@
+#
+# Multi-fidelity simulation, which switches between the reduced and full models
+#
+import casadi
+import numpy as np
+
+from .kpis import KPI_VARIABLES
+from .models import FullModel, ReducedModel
+from .simulation import LTESSimulation
+
+#: Error indicators of the reduced model, computed from the heat transfer fluid
+#: temperature ``T_f`` and relative to the initial difference between the inlet and
+#: the bed temperatures
+INDICATORS = {
+    # max_x T_f - min_x T_f, as all capsules see the averaged fluid temperature
+    "temperature spread": lambda T_f: np.ptp(T_f, axis=0),
+    # average of the mismatch between the flux that the capsules receive from the
+    # averaged fluid temperature and the flux of the local fluid temperature, in
+    # units of the heat transfer coefficient
+    "flux mismatch": lambda T_f: np.mean(np.abs(T_f - np.mean(T_f, axis=0)), axis=0),
+}
+
+FLUID_TEMPERATURE = "Heat transfer fluid temperature [K]"
+STORED_ENERGY = "Stored energy per unit area [J.m-2]"
+ENTHALPY = "Phase-change material enthalpy [J.m-3]"
+
+#: Variables of the phase-change material in the full model, and their averages
+#: along the pipe, which are the states of the reduced model
+AVERAGED_VARIABLES = {
+    ENTHALPY: "X-averaged phase-change material enthalpy [J.m-3]",
+    "Phase-change material temperature [K]": (
+        "X-averaged phase-change material temperature [K]"
+    ),
+}
+
+
+class MultiFidelitySimulation:
+    """
+    Simulation that starts with the reduced model and hands over to the full model
+    when an error indicator of the reduced model crosses a threshold, for example once
+    a thermocline is established along the pipe, and back to the reduced model when
+    the bed becomes uniform again.
+
+    The run is solved in intervals, and the indicators are checked at the end of each
+    interval and at the output times. The full model takes over from the last time at
+    which the indicator was below the threshold, with the averaged enthalpy of the
+    reduced model lifted onto every node of the pipe. At a handover back, the enthalpy
+    of the full model is averaged along the pipe. The fluid temperature and the stored
+    energy are passed on unchanged.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the model default parameter values)
+    inputs : list of str, optional
+        The names of the parameters to turn into input parameters, as in
+        :class:`encapsulated_ltes.LTESSimulation`
+    indicator : str, optional
+        The error indicator of the reduced model, "temperature spread" (default) or
+        "flux mismatch" (see :data:`INDICATORS`)
+    threshold : float, optional
+        The value of the indicator, relative to the initial difference between the
+        inlet and bed temperatures, above which the full model is used (default is
+        0.05)
+    uniform_threshold : float, optional
+        The value of the indicator, and of the spread of the enthalpy along the pipe
+        relative to the latent heat per unit volume, below which the bed is uniform
+        and the reduced model is used again (default is 0.01). It must be lower than
+        ``threshold``. If None, the run never switches back.
+    interval : float, optional
+        The time between checks of the indicator of the reduced model, in s (default
+        is 300)
+    full_interval : float, optional
+        The time between checks of the uniformity of the bed with the full model, in
+        s (default is 10 times ``interval``). Restarting the solver is costly and
+        the full model is accurate, so it is checked less often.
+    options : dict, optional
+        The options of both models
+    var_pts : dict, optional
+        The number of points of the mesh, which is shared by both models
+    solver : :class:`pybamm.BaseSolver`, optional
+        The solver of both models
+    """
+
+    def __init__(
+        self,
+        parameter_values=None,
+        inputs=None,
+        indicator="temperature spread",
+        threshold=0.05,
+        uniform_threshold=0.01,
+        interval=300,
+        full_interval=None,
+        options=None,
+        var_pts=None,
+        solver=None,
+    ):
+        if indicator not in INDICATORS:
+            msg = f"Indicator must be one of {list(INDICATORS)}, not '{indicator}'"
+            raise ValueError(msg)
+        if uniform_threshold is not None and uniform_threshold >= threshold:
+            msg = "The uniform threshold must be lower than the threshold"
+            raise ValueError(msg)
+        self.indicator = indicator
+        self.threshold = threshold
+        self.uniform_threshold = uniform_threshold
+        self.intervals = {
+            "Reduced model": interval,
+            "Full model": full_interval or 10 * interval,
+        }
+
+        self.simulations = {}
+        for model in [ReducedModel(options=options), FullModel(options=options)]:
+            self.simulations[model.name] = LTESSimulation(
+                model,
+                parameter_values=parameter_values,
+                inputs=inputs,
+                initial_state_input=True,
+                var_pts=var_pts,
+                solver=solver.copy() if solver is not None else None,
+            )
+        self.switches = []
+        self._functions = {}
+
+    @property
+    def reduced(self):
+        return self.simulations["Reduced model"]
+
+    @property
+    def full(self):
+        return self.simulations["Full model"]
+
+    def evaluate(self, model_name, variable, t, y, inputs=None):
+        """
+        Returns the values of a variable of one of the models for the states ``y`` at
+        the times ``t``, with shape (number of points, number of times). The variables
+        are evaluated with casadi functions built once per variable, which is much
+        cheaper than processing the variables of each solution of a short interval.
+        """
+        simulation = self.simulations[model_name]
+        key = (model_name, variable)
+        if key not in self._functions:
+            model = simulation.built_model
+            t_sym = casadi.MX.sym("t")
+            y_sym = casadi.MX.sym("y", model.len_rhs_and_alg)
+            p_sym = casadi.MX.sym("p", len(simulation.input_names))
+            casadi_inputs = {
+                name: p_sym[i] for i, name in enumerate(simulation.input_names)
+            }
+            expression = model.get_processed_variable(variable).to_casadi(
+                t_sym, y_sym, inputs=casadi_inputs
+            )
+            self._functions[key] = casadi.Function(
+                "variable", [t_sym, y_sym, p_sym], [expression]
+            )
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        y = np.asarray(y, dtype=float).reshape(-1, len(t))
+        inputs = simulation.get_inputs(inputs, y[:, 0])
+        p = [inputs[name] for name in simulation.input_names]
+        function = self._functions[key].map(len(t))
+        return np.asarray(function(t[None, :], y, np.tile(np.c_[p], len(t))))
+
+    def get_indicator(self, model_name, t, y, inputs, scale):
+        """
+        Returns the error indicator of the reduced model for the states ``y`` of one
+        of the models at the times ``t``, relative to the temperature difference
+        ``scale``
+        """
+        T_f = self.evaluate(model_name, FLUID_TEMPERATURE, t, y, inputs)
+        return INDICATORS[self.indicator](T_f) / scale
+
+    def get_enthalpy_spread(self, t, y, inputs):
+        """
+        Returns the maximum spread of the enthalpy along the pipe for the states ``y``
+        of the full model at the times ``t``, relative to the latent heat per unit
+        volume
+        """
+        H = self._get_enthalpy(t, y, inputs)
+        param = self.full.model.param
+        latent_heat = self.full.parameter_values.evaluate(param.rho_s * param.L)
+        return np.max(np.ptp(H, axis=0), axis=0) / latent_heat
+
+    def _get_enthalpy(self, t, y, inputs):
+        """The enthalpy of the full model, with shape (x, r, t)"""
+        H = self.evaluate("Full model", ENTHALPY, t, y, inputs)
+        n_x = len(self.full.get_nodes("pipe"))
+        return H.reshape(n_x, -1, H.shape[-1])
+
+    def lift(self, t, y, inputs=None):
+        """
+        Returns the state vector of the full model built from the state ``y`` of the
+        reduced model at time ``t``, with the averaged enthalpy and temperature of the
+        phase-change material at every node of the pipe
+        """
+        n_x = len(self.full.get_nodes("pipe"))
+        values = {
+            name: self.evaluate("Reduced model", name, t, y, inputs)[:, 0]
+            for name in [FLUID_TEMPERATURE, STORED_ENERGY]
+        }
+        for name, averaged in AVERAGED_VARIABLES.items():
+            value = self.evaluate("Reduced model", averaged, t, y, inputs)
+            values[name] = np.tile(value, (1, n_x))
+        return self.full.get_state_vector(values, inputs)
+
+    def average(self, t, y, inputs=None):
+        """
+        Returns the state vector of the reduced model built from the state ``y`` of
+        the full model at time ``t``, with the enthalpy and temperature of the
+        phase-change material averaged along the pipe
+        """
+        n_x = len(self.full.get_nodes("pipe"))
+        values = {
+            name: self.evaluate("Full model", name, t, y, inputs)[:, 0]
+            for name in [FLUID_TEMPERATURE, STORED_ENERGY]
+        }
+        for name, averaged in AVERAGED_VARIABLES.items():
+            value = self.evaluate("Full model", name, t, y, inputs)
+            values[averaged] = np.mean(value.reshape(n_x, -1), axis=0)
+        return self.reduced.get_state_vector(values, inputs)
+
+    def _find_switch(self, model_name, t, y, inputs, scale):
+        """
+        Returns the index of the time from which the other model should be used, or
+        None if the current model remains valid
+        """
+        indicator = self.get_indicator(model_name, t, y, inputs, scale)
+        if model_name == "Reduced model":
+            switch = indicator > self.threshold
+        elif self.uniform_threshold is None:
+            return None
+        else:
+            switch = (indicator < self.uniform_threshold) & (
+                self.get_enthalpy_spread(t, y, inputs) < self.uniform_threshold
+            )
+        # switches at the start of an interval are delayed to the next time, so the
+        # run always advances
+        switch[0] = False
+        if not switch.any():
+            return None
+        index = int(np.argmax(switch))
+        if model_name == "Reduced model":
+            # hand over from the last time at which the reduced model was valid
+            index -= 1
+        return index
+
+    def solve(self, t_eval, t_interp=None, inputs=None, variables=None):
+        """
+        Solve the run, switching between the models as needed. The times of the
+        switches are recorded in :attr:`switches`, as tuples ``(t, model name)``.
+
+        Parameters
+        ----------
+        t_eval : array-like
+            The start and end times of the simulation, in seconds
+        t_interp : array-like, optional
+            The times at which to return the outputs (default is 101 equally spaced
+            times)
+        inputs : dict, optional
+            The values of the inputs of the simulation
+        variables : list of str, optional
+            The output variables, which must be scalar variables of both models
+            (default is the outlet temperature, the X-averaged state of charge, the
+            stored energy and the relative error in energy conservation)
+
+        Returns
+        -------
+        dict
+            The outputs, as well as "Time [s]" and "Full model", which is True for the
+            outputs given by the full model
+        """
+        inputs = dict(inputs or {})
+        variables = list(variables or KPI_VARIABLES)
+        t_start, t_end = t_eval[0], t_eval[-1]
+        if t_interp is None:
+            t_interp = np.linspace(t_start, t_end, 101)
+        t_interp = np.asarray(t_interp, dtype=float)
+
+        results = {"Time [s]": [], "Full model": [], **{name: [] for name in variables}}
+        model_name = "Reduced model"
+        state = self.reduced.get_initial_state(inputs)
+        # the imposed inlet temperature, as the "Inlet temperature [K]" variable is
+        # extrapolated from the fluid temperature and starts at the bed temperature
+        T_in = self.reduced.parameter_values.process_symbol(
+            self.reduced.model.param.T_in
+        ).evaluate(t=t_start, inputs=self.reduced.get_inputs(inputs, state))
+        T_0 = self.evaluate(model_name, FLUID_TEMPERATURE, t_start, state)
+        scale = max(np.max(np.abs(T_in - T_0)), 1)
+        self.switches = []
+        t = t_start
+        last_output = -np.inf
+        while t < t_end:
+            b = min(t + self.intervals[model_name], t_end)
+            outputs = t_interp[(t_interp > last_output) & (t_interp <= b)]
+            times = np.unique(np.concatenate([[t, b], outputs]))
+            simulation = self.simulations[model_name]
+            solution = simulation.solve(
+                [t, b], inputs=inputs, initial_state=state, t_interp=times
+            )
+            y = solution.y
+
+            switch = self._find_switch(model_name, times, y, inputs, scale)
+            index = len(times) - 1 if switch is None else switch
+            recorded = outputs[outputs <= times[index]]
+            if len(recorded) > 0:
+                indices = np.searchsorted(times, recorded)
+                last_output = recorded[-1]
+                results["Time [s]"].append(recorded)
+                results["Full model"].append(
+                    np.full(len(recorded), model_name == "Full model")
+                )
+                for variable in variables:
+                    values = self.evaluate(
+                        model_name, variable, recorded, y[:, indices], inputs
+                    )
+                    results[variable].append(values[0])
+
+            t = times[index]
+            if switch is None:
+                state = y[:, -1]
+            elif model_name == "Reduced model":
+                state = self.lift(t, y[:, index], inputs)
+                model_name = "Full model"
+                self.switches.append((t, model_name))
+            else:
+                state = self.average(t, y[:, index], inputs)
+                model_name = "Reduced model"
+                self.switches.append((t, model_name))
+        return {name: np.concatenate(value) for name, value in results.items()}
@@ -0,0 +1,553 @@
+#
+# Networks of storage columns connected in series and parallel through manifolds
+#
+import casadi
+import numpy as np
+import pybamm
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+from .kpis import KPI_VARIABLES
+from .simulation import LTESSimulation
+
+#: Names of the inlet and outlet of the network, for the connections
+INLET = "inlet"
+OUTLET = "outlet"
+
+#: Inputs of each column, which are set by the network
+NETWORK_INPUTS = ["Inlet temperature [K]", "Inlet velocity [m.s-1]"]
+
+OUTLET_TEMPERATURE = "Outlet temperature [K]"
+STORED_ENERGY = "Stored energy per unit area [J.m-2]"
+
+
+class _ColumnType:
+    """
+    A discretised column model, shared by all the columns of a type, as casadi
+    functions of the time, the state vector and the inputs of a column
+    """
+
+    def __init__(self, simulation, variables):
+        simulation.build()
+        model = simulation.built_model
+        self.simulation = simulation
+        self.len_rhs = model.len_rhs
+        self.len_alg = model.len_alg
+        self.extra_inputs = simulation.input_names[len(NETWORK_INPUTS) :]
+
+        t = casadi.MX.sym("t")
+        y = casadi.MX.sym("y", model.len_rhs_and_alg)
+        p = casadi.MX.sym("p", len(simulation.input_names))
+        inputs = {name: p[i] for i, name in enumerate(simulation.input_names)}
+        rhs = model.concatenated_rhs.to_casadi(t, y, inputs=inputs)
+        alg = model.concatenated_algebraic.to_casadi(t, y, inputs=inputs)
+        outputs = []
+        for name in variables:
+            output = model.get_processed_variable(name).to_casadi(t, y, inputs=inputs)
+            if output.shape != (1, 1):
+                msg = f"The output variables must be scalars, not '{name}'"
+                raise ValueError(msg)
+            outputs.append(output)
+        T_out = outputs[variables.index(OUTLET_TEMPERATURE)]
+        if casadi.which_depends(T_out, p, 1, True)[0]:
+            msg = "The outlet temperature must not depend on the inlet temperature"
+            raise ValueError(msg)
+        self.dae = casadi.Function("dae", [t, y, p], [rhs, alg])
+        self.outlet = casadi.Function("outlet", [t, y, p], [T_out])
+        self.outputs = casadi.Function("outputs", [t, y, p], [casadi.vertcat(*outputs)])
+
+    def get_initial_state(self, inputs):
+        y0 = self.simulation.get_initial_state(inputs)
+        return y0[: self.len_rhs], y0[self.len_rhs :]
+
+
+class StorageNetwork:
+    """
+    Network of storage columns, e.g. a cascade of columns with different capsules or
+    phase-change materials, connected in series and in parallel, directly or through
+    manifolds which mix and split the flow.
+
+    Columns of the same type (model, parameter values and mesh) share a single
+    discretised model, in which the inlet temperature and velocity are inputs, so the
+    network only builds one :class:`encapsulated_ltes.LTESSimulation` per column
+    type. Each column can set other inputs of its type, e.g. its capsule radius.
+
+    The flow through each column is a fixed fraction of the flow at the inlet of the
+    network, set by the fractions of the connections. The inlet temperature of each
+    column is the flow-weighted mix of the outlet temperatures of the columns and
+    of the network inlet which feed it (through manifolds or not), which is a sparse
+    linear map of the outlet temperatures.
+
+    The network can be solved as a single DAE, with the states of all the columns
+    (which also handles recirculation), or by a sweep from upstream to downstream,
+    where the columns whose upstream columns are solved are solved together, with
+    their inlet temperatures interpolated linearly from the outlet temperatures of
+    the upstream columns at the output times. Both use the IDAS solver of casadi,
+    with a sparse Jacobian, and evaluate the columns of each type with a single map
+    of the casadi functions of the type.
+
+    Parameters
+    ----------
+    flow_rate : float or callable
+        The volumetric flow rate at the inlet of the network, in m3.s-1, or a
+        function of time such as a :class:`encapsulated_ltes.InletProfile`
+    inlet_temperature : float or callable
+        The temperature at the inlet of the network, in K, or a function of time
+        such as a :class:`encapsulated_ltes.InletProfile`
+    variables : list of str, optional
+        The scalar variables of the columns to output (default is the outlet
+        temperature, the X-averaged state of charge, the stored energy and the
+        relative error in energy conservation)
+    solver_options : dict, optional
+        Options of the casadi IDAS integrator (default is absolute and relative
+        tolerances of 1e-6)
+    """
+
+    def __init__(
+        self, flow_rate, inlet_temperature, variables=None, solver_options=None
+    ):
+        self.flow_rate = flow_rate
+        self.inlet_temperature = inlet_temperature
+        variables = list(variables or KPI_VARIABLES)
+        if OUTLET_TEMPERATURE not in variables:
+            variables.insert(0, OUTLET_TEMPERATURE)
+        self.variables = variables
+        self.solver_options = {"abstol": 1e-6, "reltol": 1e-6, **(solver_options or {})}
+        self.column_types = {}
+        self.columns = {}
+        self.manifolds = []
+        self.connections = {}
+
+    def add_column_type(
+        self, name, model, parameter_values=None, inputs=None, **kwargs
+    ):
+        """
+        Add a type of column, which is discretised once for all its columns.
+
+        Parameters
+        ----------
+        name : str
+            The name of the type
+        model : :class:`encapsulated_ltes.BaseLTESModel`
+            The model of the columns, e.g. a :class:`encapsulated_ltes.FullModel`
+        parameter_values : :class:`pybamm.ParameterValues`, optional
+            The parameter values (default is the model default parameter values)
+        inputs : list of str, optional
+            Other parameters which can differ between the columns of the type, e.g.
+            "Capsule radius [m]"
+        **kwargs
+            Keyword arguments passed to :class:`encapsulated_ltes.LTESSimulation`,
+            e.g. ``var_pts``
+        """
+        if name in self.column_types:
+            msg = f"Column type '{name}' already exists"
+            raise ValueError(msg)
+        inputs = [
+            *NETWORK_INPUTS,
+            *[i for i in inputs or [] if i not in NETWORK_INPUTS],
+        ]
+        simulation = LTESSimulation(
+            model, parameter_values=parameter_values, inputs=inputs, **kwargs
+        )
+        self.column_types[name] = _ColumnType(simulation, self.variables)
+
+    def add_column(self, name, column_type, area, inputs=None):
+        """
+        Add a column.
+
+        Parameters
+        ----------
+        name : str
+            The name of the column
+        column_type : str
+            The name of its type (see :meth:`add_column_type`)
+        area : float
+            The cross-sectional area of the column, in m2, which relates its flow rate
+            to its inlet velocity
+        inputs : dict, optional
+            The values of the other inputs of the type for this column (default is
+            the values of the parameter values of the type)
+        """
+        self._check_new_node(name)
+        if column_type not in self.column_types:
+            msg = f"Unknown column type '{column_type}'"
+            raise ValueError(msg)
+        inputs = dict(inputs or {})
+        unknown = set(inputs) - set(self.column_types[column_type].extra_inputs)
+        if unknown:
+            msg = f"Parameters {sorted(unknown)} are not inputs of '{column_type}'"
+            raise ValueError(msg)
+        self.columns[name] = {"type": column_type, "area": area, "inputs": inputs}
+
+    def add_manifold(self, name):
+        """Add a manifold, which mixes the flows into it and splits the mixed flow"""
+        self._check_new_node(name)
+        self.manifolds.append(name)
+
+    def _check_new_node(self, name):
+        if name in [INLET, OUTLET, *self.columns, *self.manifolds]:
+            msg = f"Node '{name}' already exists"
+            raise ValueError(msg)
+
+    def connect(self, source, target, fraction=1):
+        """
+        Connect the outlet of a node (a column, a manifold or the inlet of the
+        network) to the inlet of another (a column, a manifold or the outlet of the
+        network).
+
+        Parameters
+        ----------
+        source : str
+            The upstream node, or "inlet"
+        target : str
+            The downstream node, or "outlet"
+        fraction : float, optional
+            The fraction of the flow out of ``source`` which goes to ``target``
+            (default is 1). The fractions of the flow out of each node must sum to 1.
+        """
+        nodes = [*self.columns, *self.manifolds]
+        if source not in [INLET, *nodes]:
+            msg = f"Unknown source '{source}'"
+            raise ValueError(msg)
+        if target not in [OUTLET, *nodes]:
+            msg = f"Unknown target '{target}'"
+            raise ValueError(msg)
+        if not 0 < fraction <= 1:
+            msg = "The fraction of the flow must be in (0, 1]"
+            raise ValueError(msg)
+        self.connections[(source, target)] = fraction
+
+    def get_coupling(self):
+        """
+        Returns the sparse coupling of the columns: the inlet temperatures of the
+        columns are ``A @ T_out + a * T_source`` and the outlet temperature of the
+        network is ``b @ T_out + b_0 * T_source``, with ``T_out`` the outlet
+        temperatures of the columns and ``T_source`` the inlet temperature of the
+        network. Manifolds are eliminated.
+
+        Returns
+        -------
+        dict
+            The matrix "A" (sparse), the vectors "a" and "b", the scalar "b_0" and
+            the "Flow fractions" of the columns, relative to the flow rate at the
+            inlet of the network
+        """
+        nodes = [*self.columns, *self.manifolds]
+        index = {name: i for i, name in enumerate(nodes)}
+        n = len(nodes)
+        rows, cols, fractions = [], [], []
+        f_in, f_out = np.zeros(n), np.zeros(n)
+        bypass = 0
+        totals = dict.fromkeys([INLET, *nodes], 0)
+        for (source, target), fraction in self.connections.items():
+            totals[source] += fraction
+            if source == INLET and target == OUTLET:
+                bypass = fraction
+            elif source == INLET:
+                f_in[index[target]] = fraction
+            elif target == OUTLET:
+                f_out[index[source]] = fraction
+            else:
+                rows.append(index[target])
+                cols.append(index[source])
+                fractions.append(fraction)
+        for name, total in totals.items():
+            if not np.isclose(total, 1):
+                msg = (
+                    f"The fractions of the flow out of '{name}' sum to {total:g}, not 1"
+                )
+                raise ValueError(msg)
+
+        # flows of the nodes, relative to the flow at the inlet of the network
+        F = sparse.csc_matrix((fractions, (rows, cols)), shape=(n, n))
+        identity = sparse.identity(n, format="csc")
+        q = np.atleast_1d(spsolve(identity - F, f_in))
+        if np.any(q <= 0):
+            names = [name for name, flow in zip(nodes, q) if flow <= 0]
+            msg = f"No flow goes through {names}"
+            raise ValueError(msg)
+
+        # inlet temperatures of the nodes, T_in = W @ T_out + w_0 * T_source
+        W = sparse.diags(1 / q) @ F @ sparse.diags(q)
+        w_0 = f_in / q
+        b = f_out * q
+        n_c = len(self.columns)
+        C, M = slice(0, n_c), slice(n_c, n)
+        W = W.tocsr()
+        if n > n_c:
+            # the outlet temperature of a manifold is its inlet temperature
+            S = sparse.identity(n - n_c, format="csc") - W[M, M].tocsc()
+            T_M = sparse.csr_matrix(spsolve(S, W[M, C].tocsc()).reshape(n - n_c, -1))
+            T_M0 = np.atleast_1d(spsolve(S, w_0[M]))
+            A = W[C, C] + W[C, M] @ T_M
+            a = w_0[C] + W[C, M] @ T_M0
+            b_C = b[C] + T_M.T @ b[M]
+            b_0 = bypass + b[M] @ T_M0
+        else:
+            A, a, b_C, b_0 = W, w_0, b, bypass
+        total = np.sum(b_C) + b_0
+        return {
+            "A": sparse.csr_matrix(A),
+            "a": np.asarray(a),
+            "b": np.asarray(b_C) / total,
+            "b_0": b_0 / total,
+            "Flow fractions": q[C],
+        }
+
+    def get_levels(self, A=None):
+        """
+        Returns the columns grouped by level from upstream to downstream: the columns
+        of each level are only fed by the network inlet and columns of the previous
+        levels
+        """
+        A = sparse.csr_matrix(self.get_coupling()["A"] if A is None else A)
+        names = list(self.columns)
+        upstream = [
+            set(A.indices[A.indptr[i] : A.indptr[i + 1]]) for i in range(A.shape[0])
+        ]
+        solved, levels = set(), []
+        while len(solved) < len(names):
+            level = [
+                i
+                for i in range(len(names))
+                if i not in solved and upstream[i] <= solved
+            ]
+            if not level:
+                msg = "The network has recirculation, so it must be solved as a whole"
+                raise ValueError(msg)
+            levels.append([names[i] for i in level])
+            solved.update(level)
+        return levels
+
+    def _get_time_function(self, value, t):
+        """A constant or function of time, as a casadi expression of the time t"""
+        if callable(value):
+            return value(pybamm.t).to_casadi(t=t)
+        return casadi.MX(value)
+
+    def _evaluate_time_function(self, value, t):
+        """A constant or function of time, at the times t"""
+        if hasattr(value, "evaluate"):
+            return np.asarray(value.evaluate(t), dtype=float)
+        if callable(value):
+            symbol = value(pybamm.t)
+            return np.array([symbol.evaluate(t=time) for time in t]).flatten()
+        return np.full(len(t), float(value))
+
+    def _get_column_parameters(self):
+        """The other inputs and the inlet velocity per unit flow rate of each column"""
+        parameters = {}
+        flows = self._coupling["Flow fractions"]
+        for i, (name, column) in enumerate(self.columns.items()):
+            column_type = self.column_types[column["type"]]
+            simulation = column_type.simulation
+            inputs = {**simulation.default_inputs, **column["inputs"]}
+            porosity = inputs.get("Porosity", simulation.parameter_values["Porosity"])
+            parameters[name] = (
+                [inputs[key] for key in column_type.extra_inputs],
+                flows[i] / (porosity * column["area"]),
+            )
+        return parameters
+
+    def _get_groups(self, names):
+        """The columns grouped by type"""
+        groups = {}
+        for name in names:
+            groups.setdefault(self.columns[name]["type"], []).append(name)
+        return groups
+
+    def _get_integrator(self, names, t_out, upstream_outlets=None):
+        """
+        Returns the casadi integrator of the columns ``names``, the initial states and
+        the slices of the states of each column in the differential and algebraic
+        states of the integrator. The outlet temperatures of the other columns are
+        interpolated in time from ``upstream_outlets``.
+        """
+        coupling = self._coupling
+        parameters = self._get_column_parameters()
+        index = {name: i for i, name in enumerate(self.columns)}
+        t = casadi.MX.sym("t")
+        T_source = self._get_time_function(self.inlet_temperature, t)
+        flow_rate = self._get_time_function(self.flow_rate, t)
+
+        # states, and outlet temperatures of the columns
+        T_out = [casadi.MX(0)] * len(self.columns)
+        if upstream_outlets is not None:
+            outlets = casadi.interpolant(
+                "outlets", "linear", [t_out], upstream_outlets.T.flatten()
+            )(t)
+            T_out = [outlets[i] for i in range(len(self.columns))]
+        xs, zs, x0, z0, states, slices = [], [], [], [], {}, {}
+        n_x = n_z = 0
+        for type_name, group in self._get_groups(names).items():
+            column_type = self.column_types[type_name]
+            n_rhs, n_alg, n_k = column_type.len_rhs, column_type.len_alg, len(group)
+            x = casadi.MX.sym(f"x_{len(xs)}", n_rhs * n_k)
+            z = casadi.MX.sym(f"z_{len(zs)}", n_alg * n_k)
+            xs.append(x)
+            zs.append(z)
+            Y = casadi.vertcat(
+                casadi.reshape(x, n_rhs, n_k), casadi.reshape(z, n_alg, n_k)
+            )
+            P = np.array([[0, 0, *parameters[name][0]] for name in group]).T
+            outlets = column_type.outlet.map(n_k)(t, Y, P)
+            for j, name in enumerate(group):
+                T_out[index[name]] = outlets[j]
+                slices[name] = (
+                    slice(n_x + j * n_rhs, n_x + (j + 1) * n_rhs),
+                    slice(n_z + j * n_alg, n_z + (j + 1) * n_alg),
+                )
+                inputs = dict(
+                    zip(column_type.simulation.input_names, P[:, j], strict=True)
+                )
+                y0_rhs, y0_alg = column_type.get_initial_state(inputs)
+                x0.append(y0_rhs)
+                z0.append(y0_alg)
+            states[type_name] = (Y, P)
+            n_x += n_rhs * n_k
+            n_z += n_alg * n_k
+
+        # inlet temperatures and velocities of the columns
+        A = coupling["A"].tocoo()
+        A = casadi.DM(casadi.Sparsity.triplet(*A.shape, A.row, A.col), A.data)
+        T_in = casadi.mtimes(A, casadi.vertcat(*T_out)) + coupling["a"] * T_source
+        odes, algs = [], []
+        for type_name, group in self._get_groups(names).items():
+            column_type = self.column_types[type_name]
+            Y, P = states[type_name]
+            rows = [index[name] for name in group]
+            u = np.array([parameters[name][1] for name in group]) * flow_rate
+            P = casadi.vertcat(T_in[rows].T, u.T, P[2:, :])
+            rhs, alg = column_type.dae.map(len(group))(t, Y, P)
+            odes.append(casadi.reshape(rhs, -1, 1))
+            algs.append(casadi.reshape(alg, -1, 1))
+
+        dae = {
+            "t": t,
+            "x": casadi.vertcat(*xs),
+            "z": casadi.vertcat(*zs),
+            "ode": casadi.vertcat(*odes),
+            "alg": casadi.vertcat(*algs),
+        }
+        t_start = t_out[0]
+        try:
+            # expanding the functions to scalar operations makes them much cheaper
+            integrator = casadi.integrator(
+                "network",
+                "idas",
+                dae,
+                t_start,
+                t_out,
+                {**self.solver_options, "expand": True},
+            )
+        except RuntimeError:
+            # functions which cannot be expanded, e.g. lookup tables
+            integrator = casadi.integrator(
+                "network", "idas", dae, t_start, t_out, self.solver_options
+            )
+        return integrator, np.concatenate(x0), np.concatenate(z0), slices
+
+    def _integrate(self, names, t_out, upstream_outlets=None):
+        """Returns the states of the columns ``names`` at the times ``t_out``"""
+        integrator, x0, z0, slices = self._get_integrator(
+            names, t_out, upstream_outlets
+        )
+        result = integrator(x0=x0, z0=z0)
+        x, z = np.array(result["xf"]), np.array(result["zf"])
+        return {
+            name: np.vstack([x[s_x], z[s_z]]) for name, (s_x, s_z) in slices.items()
+        }
+
+    def _get_outlets(self, states, t):
+        """The outlet temperatures of the solved columns, with shape (columns, times)"""
+        parameters = self._get_column_parameters()
+        T_out = np.zeros((len(self.columns), len(t)))
+        for i, name in enumerate(self.columns):
+            if name not in states:
+                continue
+            column_type = self.column_types[self.columns[name]["type"]]
+            p = np.array([0, 0, *parameters[name][0]])
+            function = column_type.outlet.map(len(t))
+            T_out[i] = np.array(function(t[None, :], states[name], np.c_[p])).flatten()
+        return T_out
+
+    def solve(self, t_eval, t_interp=None, method="coupled"):
+        """
+        Solve the network, starting from the initial conditions of the columns. Steps
+        of inlet profiles are not declared to the solver, which resolves them with its
+        step size control.
+
+        Parameters
+        ----------
+        t_eval : array-like
+            The start and end times of the simulation, in seconds
+        t_interp : array-like, optional
+            The times at which to return the outputs (default is 101 equally spaced
+            times). With the sweep, they should resolve the outlet temperatures of
+            the columns, which are interpolated between them.
+        method : str, optional
+            "coupled" (default) to solve all the columns together, or "sweep" to
+            solve them from upstream to downstream
+
+        Returns
+        -------
+        dict
+            The outputs: "Time [s]", the variables of the columns with shape
+            (columns, times), the columns being in the order of :attr:`columns`,
+            "Network outlet temperature [K]" and "Network stored energy [J]" (if the
+            stored energy is an output variable)
+        """
+        if method not in ["coupled", "sweep"]:
+            msg = f"Method must be 'coupled' or 'sweep', not '{method}'"
+            raise ValueError(msg)
+        t_start, t_end = t_eval[0], t_eval[-1]
+        if t_interp is None:
+            t_interp = np.linspace(t_start, t_end, 101)
+        t = np.union1d(np.asarray(t_interp, dtype=float), [t_start, t_end])
+        t = t[(t >= t_start) & (t <= t_end)]
+
+        self._coupling = self.get_coupling()
+        if method == "coupled":
+            states = self._integrate(list(self.columns), t)
+        else:
+            states = {}
+            for level in self.get_levels(self._coupling["A"]):
+                outlets = self._get_outlets(states, t) if states else None
+                states.update(self._integrate(level, t, outlets))
+        return self._get_outputs(states, t)
+
+    def _get_outputs(self, states, t):
+        """The output variables of the columns from their states"""
+        coupling = self._coupling
+        parameters = self._get_column_parameters()
+        T_source = self._evaluate_time_function(self.inlet_temperature, t)
+        flow_rate = self._evaluate_time_function(self.flow_rate, t)
+        T_out = self._get_outlets(states, t)
+        T_in = coupling["A"] @ T_out + np.outer(coupling["a"], T_source)
+
+        outputs = {
+            name: np.zeros((len(self.columns), len(t))) for name in self.variables
+        }
+        for i, (name, column) in enumerate(self.columns.items()):
+            column_type = self.column_types[column["type"]]
+            other, velocity = parameters[name]
+            P = np.vstack(
+                [
+                    T_in[i],
+                    velocity * flow_rate,
+                    np.tile(np.c_[other], len(t)) if other else np.zeros((0, len(t))),
+                ]
+            )
+            values = np.array(
+                column_type.outputs.map(len(t))(t[None, :], states[name], P)
+            )
+            for j, variable in enumerate(self.variables):
+                outputs[variable][i] = values[j]
+        outputs = {"Time [s]": t, **outputs}
+        outputs["Network outlet temperature [K]"] = (
+            coupling["b"] @ T_out + coupling["b_0"] * T_source
+        )
+        if STORED_ENERGY in self.variables:
+            areas = np.array([column["area"] for column in self.columns.values()])
+            outputs["Network stored energy [J]"] = areas @ outputs[STORED_ENERGY]
+        return outputs
@@ -0,0 +1,347 @@
+#
+# Surrogate-assisted design optimisation of the capsule radius, porosity and pipe
+# length
+#
+import numpy as np
+import pybamm
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from .models import FullModel
+from .simulation import LTESSimulation
+
+#: Design variables and their default bounds, relative to the reference parameter
+#: values
+DESIGN_VARIABLES = {
+    "Capsule radius [m]": (0.5, 2),
+    "Porosity": (0.5, 1.5),
+    "Pipe length [m]": (0.5, 2),
+}
+
+SOC = "X-averaged state of charge"
+OUTLET_TEMPERATURE = "Outlet temperature [K]"
+STORED_ENERGY = "Stored energy per unit area [J.m-2]"
+
+#: Outputs of each design, which can be used as objective or constraints
+OUTPUTS = [
+    "Charging time [s]",
+    "Final state of charge",
+    "Maximum outlet temperature [K]",
+    STORED_ENERGY,
+]
+
+
+class DesignOptimisation:
+    """
+    Optimisation of the design of a storage unit, i.e. the capsule radius, porosity
+    and pipe length, against outputs of the full model such as the charging time and
+    the stored energy.
+
+    The design variables are inputs of a single simulation (with symbolic meshes for
+    the radius and length), so the model is built once and batches of designs are
+    solved together by the IDAKLU solver. Each run stops when the state of charge
+    reaches its target, so there is no fixed time horizon, or as soon as it is
+    clearly infeasible: at the charging time limit, or when the outlet temperature
+    exceeds its upper limit. Evaluated designs are memoised.
+
+    The optimiser fits radial basis function surrogates of the objective and the
+    constrained outputs to the evaluated designs, and evaluates in each iteration the
+    batch of designs which minimise the surrogate objective penalised by the
+    surrogate constraint violations.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The reference parameter values (default is the model default parameter
+        values)
+    bounds : dict, optional
+        The lower and upper bounds of the design variables (default is 0.5 to 2 times
+        the reference capsule radius and pipe length, and 0.5 to 1.5 times the
+        reference porosity). Only the variables in ``bounds`` are optimised.
+    objective : str or callable, optional
+        The output to minimise, one of :data:`OUTPUTS` (default is "Charging time
+        [s]"), or a function of the dictionary of outputs of a design
+    maximise : bool, optional
+        Whether to maximise the objective instead (default is False)
+    constraints : dict, optional
+        The lower and upper limits of some outputs, with None for no limit, e.g.
+        ``{"Stored energy per unit area [J.m-2]": (5e7, None)}``. Runs stop at the
+        upper limits of the "Charging time [s]" and "Maximum outlet temperature
+        [K]".
+    soc_target : float, optional
+        The state of charge which defines the charging time (default is 0.95)
+    max_time : float, optional
+        The longest run, in seconds, if the charging time is not constrained (default
+        is 1e5)
+    options : dict, optional
+        Options of the full model (default is smooth closures, whose state of charge
+        is continuous)
+    n_threads : int, optional
+        The number of threads, and of parallel solvers, of the IDAKLU solver (default
+        is 1)
+    solver_options : dict, optional
+        Other options of :class:`pybamm.IDAKLUSolver`
+    **kwargs
+        Keyword arguments passed to :class:`encapsulated_ltes.LTESSimulation`, e.g.
+        ``var_pts``
+    """
+
+    def __init__(
+        self,
+        parameter_values=None,
+        bounds=None,
+        objective="Charging time [s]",
+        maximise=False,
+        constraints=None,
+        soc_target=0.95,
+        max_time=1e5,
+        options=None,
+        n_threads=1,
+        solver_options=None,
+        **kwargs,
+    ):
+        options = {"closures": "smooth", **(options or {})}
+        model = FullModel(options={**options, "output variables": "0D KPIs only"})
+        if parameter_values is None:
+            parameter_values = model.default_parameter_values
+        if bounds is None:
+            bounds = {
+                name: tuple(f * parameter_values[name] for f in factors)
+                for name, factors in DESIGN_VARIABLES.items()
+            }
+        unknown = set(bounds) - set(DESIGN_VARIABLES)
+        if unknown:
+            msg = f"Unknown design variables {sorted(unknown)}"
+            msg += f", must be in {list(DESIGN_VARIABLES)}"
+            raise ValueError(msg)
+        self.constraints = dict(constraints or {})
+        unknown = set(self.constraints) - set(OUTPUTS)
+        if isinstance(objective, str) and objective not in OUTPUTS:
+            unknown.add(objective)
+        if unknown:
+            msg = f"Unknown outputs {sorted(unknown)}, must be in {OUTPUTS}"
+            raise ValueError(msg)
+
+        self.bounds = {name: tuple(bound) for name, bound in bounds.items()}
+        self.design_variables = list(self.bounds)
+        self.objective = objective
+        self.maximise = maximise
+        self.soc_target = soc_target
+        # the charging time is always constrained by the length of the runs
+        t_max = self.constraints.get("Charging time [s]", (None, None))[1]
+        self.horizon = max_time if t_max is None else t_max
+        self.constraints["Charging time [s]"] = (
+            self.constraints.get("Charging time [s]", (None, None))[0],
+            self.horizon,
+        )
+
+        self._add_events(model)
+        solver_options = dict(solver_options or {})
+        solver_options["options"] = {
+            "num_threads": n_threads,
+            "num_solvers": n_threads,
+            **solver_options.get("options", {}),
+        }
+        solver = pybamm.IDAKLUSolver(
+            output_variables=[SOC, OUTLET_TEMPERATURE, STORED_ENERGY],
+            **solver_options,
+        )
+        self.simulation = LTESSimulation(
+            model,
+            parameter_values=parameter_values,
+            inputs=self.design_variables,
+            solver=solver,
+            **kwargs,
+        )
+        self.history = []
+        self._memo = {}
+
+    def _add_events(self, model):
+        """Add the events which stop the runs"""
+        model.add_termination_events(soc=self.soc_target)
+        T_max = self.constraints.get("Maximum outlet temperature [K]", (None, None))
+        if T_max[1] is not None:
+            T_out = model.variables[OUTLET_TEMPERATURE]
+            model.events.append(
+                pybamm.Event("Maximum outlet temperature", T_max[1] - T_out)
+            )
+
+    def _key(self, design):
+        """Key of a design in the memo, rounded relative to the bounds"""
+        lower, upper = np.array(list(self.bounds.values())).T
+        return tuple(np.round((np.asarray(design) - lower) / (upper - lower), 10))
+
+    def evaluate(self, designs):
+        """
+        Returns the outputs (see :data:`OUTPUTS`) of each design, solving the designs
+        which were not evaluated before in a single batch. If the state of charge
+        target is not reached, "Charging time [s]" is extrapolated linearly from the
+        final state of charge.
+
+        Parameters
+        ----------
+        designs : array-like
+            The designs, with shape (number of designs, number of design variables)
+            and the variables in the order of :attr:`design_variables`
+
+        Returns
+        -------
+        list of dict
+            The outputs of each design, with also "Charged" (whether the target was
+            reached) and "Termination" (the reason the run stopped)
+        """
+        designs = np.atleast_2d(np.asarray(designs, dtype=float))
+        new = {}
+        for design in designs:
+            key = self._key(design)
+            if key not in self._memo:
+                new.setdefault(key, design)
+        if new:
+            inputs = [dict(zip(self.design_variables, d)) for d in new.values()]
+            solutions = self.simulation.solve([0, self.horizon], inputs=inputs)
+            if not isinstance(solutions, list):
+                solutions = [solutions]
+            for (key, design), solution in zip(new.items(), solutions):
+                outputs = self._get_outputs(solution)
+                self._memo[key] = outputs
+                self.history.append(
+                    {**dict(zip(self.design_variables, design)), **outputs}
+                )
+        return [self._memo[self._key(design)] for design in designs]
+
+    def _get_outputs(self, solution):
+        soc = solution[SOC].entries[-1]
+        t_end = solution.t[-1]
+        charged = solution.termination == "event: State of charge target"
+        if charged:
+            charging_time = t_end
+        elif soc > 0:
+            charging_time = t_end * self.soc_target / soc
+        else:
+            charging_time = np.inf
+        return {
+            "Charging time [s]": charging_time,
+            "Final state of charge": soc,
+            "Maximum outlet temperature [K]": np.max(
+                solution[OUTLET_TEMPERATURE].entries
+            ),
+            STORED_ENERGY: solution[STORED_ENERGY].entries[-1],
+            "Charged": charged,
+            "Termination": solution.termination,
+        }
+
+    def get_objective(self, outputs):
+        """Returns the value of the objective to minimise for the outputs of a design"""
+        objective = self.objective
+        value = objective(outputs) if callable(objective) else outputs[objective]
+        return -value if self.maximise else value
+
+    def get_violation(self, outputs):
+        """
+        Returns the sum of the violations of the constraints by the outputs of a
+        design, relative to the limits, which is 0 for feasible designs. Runs
+        stopped before the state of charge target, e.g. at the outlet temperature
+        limit, are infeasible.
+        """
+        violation = 0
+        if not outputs.get("Charged", True):
+            soc = outputs["Final state of charge"]
+            violation += max(self.soc_target - soc, 0) / self.soc_target
+        for name, (lower, upper) in self.constraints.items():
+            value = outputs[name]
+            if lower is not None:
+                violation += max(lower - value, 0) / max(abs(lower), 1e-12)
+            if upper is not None:
+                violation += max(value - upper, 0) / max(abs(upper), 1e-12)
+        return violation
+
+    @property
+    def best(self):
+        """
+        The best design evaluated so far: the feasible design with the lowest
+        objective or, if no design is feasible, the design with the lowest violation
+        """
+        if not self.history:
+            return None
+        return min(
+            self.history,
+            key=lambda entry: (self.get_violation(entry), self.get_objective(entry)),
+        )
+
+    def optimise(
+        self, n_initial=8, n_iterations=10, batch_size=4, n_candidates=1024, seed=None
+    ):
+        """
+        Run the surrogate-assisted optimisation.
+
+        Parameters
+        ----------
+        n_initial : int, optional
+            The number of designs of the initial Sobol sample (default is 8)
+        n_iterations : int, optional
+            The number of iterations (default is 10)
+        batch_size : int, optional
+            The number of designs evaluated in each iteration (default is 4)
+        n_candidates : int, optional
+            The number of candidate designs on which the surrogates are minimised,
+            before a local refinement of the best ones (default is 1024)
+        seed : int, optional
+            The seed of the random number generator
+
+        Returns
+        -------
+        dict
+            The best design and its outputs (see :attr:`best`). All the evaluated
+            designs are stored in :attr:`history`.
+        """
+        d = len(self.design_variables)
+        lower, upper = np.array(list(self.bounds.values())).T
+        sobol = qmc.Sobol(d, seed=seed)
+        self.evaluate(lower + sobol.random(n_initial) * (upper - lower))
+        names = sorted(self.constraints)
+
+        for _ in range(n_iterations):
+            designs = [[e[n] for n in self.design_variables] for e in self.history]
+            u = (np.array(designs) - lower) / (upper - lower)
+            targets = np.array(
+                [
+                    [self.get_objective(e)] + [e[name] for name in names]
+                    for e in self.history
+                ]
+            )
+            # unreachable targets are replaced by a large finite value
+            finite = np.isfinite(targets)
+            largest = np.max(np.abs(np.where(finite, targets, 0)), axis=0)
+            targets = np.where(finite, targets, 10 * largest)
+            scale = np.std(targets, axis=0) + 1e-12
+            surrogate = RBFInterpolator(u, targets / scale, degree=1)
+
+            def penalised(x, surrogate=surrogate, scale=scale):
+                prediction = surrogate(np.atleast_2d(x)) * scale
+                violations = [
+                    self.get_violation(dict(zip(names, row[1:]))) for row in prediction
+                ]
+                return prediction[:, 0] / scale[0] + 1e3 * np.array(violations)
+
+            candidates = sobol.random(n_candidates)
+            order = np.argsort(penalised(candidates))
+            batch = []
+            for x0 in candidates[order[: 2 * batch_size]]:
+                result = minimize(
+                    lambda x, f=penalised: f(x)[0],
+                    x0,
+                    method="L-BFGS-B",
+                    bounds=[(0, 1)] * d,
+                )
+                x = result.x
+                distances = np.linalg.norm(np.array([*u, *batch]) - x, axis=1)
+                if np.min(distances) > 1e-3:
+                    batch.append(x)
+                if len(batch) == batch_size:
+                    break
+            if not batch:
+                # the surrogate has converged to evaluated designs
+                break
+            self.evaluate(lower + np.array(batch) * (upper - lower))
+        return self.best
@@ -7,9 +7,28 @@ import pybamm
 class EncapsulatedLTESParameters:
     """
     Standard parameters for encapsulated LTES models
+
+    Parameters
+    ----------
+    options : dict, optional
+        The model options. If ``options["closures"]`` is "smooth", the piecewise
+        closures (enthalpy-temperature relation, conductivity and phase indicator)
+        are replaced by smooth approximations, with a transition width of
+        ``smoothing`` times the latent heat per unit volume. If it is "tabulated",
+        they are functions of the enthalpy (and the enthalpy a function of the
+        temperature) given by tabulated curves, e.g. from DSC measurements (see
+        :func:`encapsulated_ltes.set_pcm_properties`), and the phase indicator is
+        the liquid fraction.
     """
 
-    def __init__(self):
+    #: Width of the smoothed transitions, relative to the latent heat per unit volume
+    smoothing = 0.02
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        self.smooth = self.options.get("closures") == "smooth"
+        self.tabulated = self.options.get("closures") == "tabulated"
+
         # Set parameters
         self._set_parameters()
 
@@ -26,7 +45,9 @@ class EncapsulatedLTESParameters:
             {"Time [s]": pybamm.t},
             diff_variable=pybamm.t,
         )
-        self.u = pybamm.Parameter("Inlet velocity [m.s-1]")
+        self.u = pybamm.FunctionParameter(
+            "Inlet velocity [m.s-1]", {"Time [s]": pybamm.t}
+        )
         self.rho_f = pybamm.Parameter("Heat transfer fluid density [kg.m-3]")
         self.c_p_f = pybamm.Parameter(
             "Heat transfer fluid specific heat capacity [J.kg-1.K-1]"
@@ -52,8 +73,38 @@ class EncapsulatedLTESParameters:
         self.epsilon = pybamm.Parameter("Porosity")
         self.a = 3 * (1 - self.epsilon) / self.R
 
+        # Enthalpies at the start and end of melting
+        self.H_s = self.rho_s * self.c_p_s * self.T_m
+        self.H_l = self.rho_s * (self.c_p_s * self.T_m + self.L)
+
+    def _min(self, left, right):
+        """Minimum of enthalpies, smoothed if the closures are smooth"""
+        if self.smooth:
+            k = 1 / (self.smoothing * self.rho_s * self.L)
+            return pybamm.smooth_min(left, right, k)
+        return pybamm.minimum(left, right)
+
+    def _max(self, left, right):
+        """Maximum of enthalpies, smoothed if the closures are smooth"""
+        if self.smooth:
+            k = 1 / (self.smoothing * self.rho_s * self.L)
+            return pybamm.smooth_max(left, right, k)
+        return pybamm.maximum(left, right)
+
     def H2T(self, H):
         """Convert enthalpy to temperature"""
+        if self.tabulated:
+            return pybamm.FunctionParameter(
+                "PCM temperature [K]", {"Enthalpy [J.m-3]": H}
+            )
+        if self.smooth:
+            zero = pybamm.Scalar(0)
+            return (
+                self.T_m
+                + self._min(H - self.H_s, zero) / (self.rho_s * self.c_p_s)
+                + self._max(H - self.H_l, zero) / (self.rho_l * self.c_p_l)
+            )
+
         solid = H / (self.rho_s * self.c_p_s)
         liquid = self.T_m + (H - self.rho_s * (self.c_p_s * self.T_m + self.L)) / (
             self.rho_l * self.c_p_l
@@ -66,6 +117,10 @@ class EncapsulatedLTESParameters:
 
     def T2H(self, T):
         """Convert temperature to enthalpy"""
+        if self.tabulated:
+            return pybamm.FunctionParameter(
+                "PCM enthalpy [J.m-3]", {"Temperature [K]": T}
+            )
         if self.T_m == T:
             msg = "Enthalpy is not uniquely defined at melting temperature"
             raise ValueError(msg)
@@ -77,9 +132,31 @@ class EncapsulatedLTESParameters:
 
     def k(self, H):
         """Effective conductivity as a function of the enthalpy"""
+        if self.tabulated:
+            return pybamm.FunctionParameter(
+                "PCM conductivity [W.m-1.K-1]", {"Enthalpy [J.m-3]": H}
+            )
+        if self.smooth:
+            H_clipped = self._min(self._max(H, self.H_s), self.H_l)
+            return self.k_s + (self.k_l - self.k_s) * (H_clipped - self.H_s) / (
+                self.rho_s * self.L
+            )
+
         H_s = self.rho_s * self.c_p_s * self.T_m
         H_l = self.rho_s * (self.c_p_s * self.T_m + self.L)
         k_m = (self.k_l - self.k_s) / (self.rho_s * self.L) * (H - H_s) + self.k_s
         return (
             self.k_s * (H_s >= H) + k_m * (H_s < H) * (H_l > H) + self.k_l * (H_l <= H)
         )
+
+    def phase(self, H):
+        """Phase indicator (1 if liquid, 0 if solid) as a function of the enthalpy"""
+        if self.tabulated:
+            return pybamm.FunctionParameter(
+                "PCM liquid fraction", {"Enthalpy [J.m-3]": H}
+            )
+        H_half = self.H_s + self.rho_s * self.L / 2
+        if self.smooth:
+            k = 1 / (self.smoothing * self.rho_s * self.L)
+            return pybamm.sigmoid(H_half, H, k)
+        return H_half <= H
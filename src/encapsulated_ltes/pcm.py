@@ -0,0 +1,255 @@
+#
+# Tabulated properties of the phase-change material, e.g. from DSC measurements
+#
+import numpy as np
+import pybamm
+from scipy.interpolate import PchipInterpolator
+
+
+class _PropertyTable:
+    """
+    A property tabulated on a uniform grid, as a function for the parameters. On a
+    uniform grid, the cell of a point in a pchip :class:`pybamm.Interpolant` is
+    computed rather than searched for, so each evaluation costs O(1).
+    """
+
+    def __init__(self, x, y, name):
+        self.x = x
+        self.y = y
+        self.name = name
+
+    def __call__(self, x):
+        return pybamm.Interpolant(
+            self.x, self.y, x, name=self.name, interpolator="pchip"
+        )
+
+
+class PCMProperties:
+    """
+    Properties of a phase-change material which melts over a range of temperatures,
+    given by a tabulated enthalpy-temperature curve (e.g. the integral of a DSC
+    measurement) and optionally a conductivity-temperature curve. They are used with
+    the "tabulated" closures of the models (see :func:`set_pcm_properties`).
+
+    The curves are interpolated with monotone (pchip) splines. The solid and liquid
+    baselines are the secant lines of the enthalpy below and above the melting range,
+    and the liquid fraction is the position of the enthalpy between them. The
+    enthalpy is extended linearly along the baselines beyond the measured range.
+
+    For the models, the temperature, conductivity and liquid fraction are tabulated
+    as functions of the enthalpy per unit volume on a uniform grid (the inverse
+    table of the temperature being precomputed), and the enthalpy as a function of
+    the temperature, so that each evaluation in the residual is an O(1) lookup,
+    with a continuous derivative. The coefficients of the tables are constants of
+    the residual, so ``n_points`` should stay moderate.
+
+    Parameters
+    ----------
+    temperature : array-like
+        The temperatures of the curves, in K, which must extend below and above the
+        melting range
+    enthalpy : array-like
+        The specific enthalpy at each temperature, in J.kg-1, increasing with the
+        temperature. Its reference is arbitrary.
+    conductivity : array-like, optional
+        The conductivity at each temperature, in W.m-1.K-1. By default, it is
+        interpolated between the solid and liquid phase conductivities of the
+        parameter values with the liquid fraction.
+    melting_range : tuple, optional
+        The temperatures at the start and end of melting, in K. By default, the
+        melting range is where the apparent heat capacity exceeds its baseline by
+        more than 1% of its peak excess.
+    n_points : int, optional
+        The number of nodes of the tables of the models (default is 1000)
+    """
+
+    def __init__(
+        self,
+        temperature,
+        enthalpy,
+        conductivity=None,
+        melting_range=None,
+        n_points=1000,
+    ):
+        T = np.asarray(temperature, dtype=float)
+        h = np.asarray(enthalpy, dtype=float)
+        k = None if conductivity is None else np.asarray(conductivity, dtype=float)
+        if T.shape != h.shape or T.ndim != 1 or (k is not None and k.shape != T.shape):
+            msg = "The temperatures, enthalpies and conductivities must be 1D arrays "
+            msg += "of the same length"
+            raise ValueError(msg)
+        order = np.argsort(T)
+        T, h = T[order], h[order]
+        if np.any(np.diff(T) <= 0) or np.any(np.diff(h) <= 0):
+            msg = "The enthalpy must increase strictly with the temperature"
+            raise ValueError(msg)
+        self.n_points = n_points
+        enthalpy = PchipInterpolator(T, h)
+
+        if melting_range is None:
+            melting_range = self._find_melting_range(T, enthalpy)
+        T_start, T_end = melting_range
+        if not T[0] < T_start < T_end < T[-1]:
+            msg = "The curves must extend below and above the melting range"
+            raise ValueError(msg)
+        self.melting_range = (T_start, T_end)
+        h_start, h_end = enthalpy([T_start, T_end])
+        self.c_p_s = (h_start - h[0]) / (T_start - T[0])
+        self.c_p_l = (h[-1] - h_end) / (T[-1] - T_end)
+
+        # extend the curves along the baselines, by twice the measured range
+        span = T[-1] - T[0]
+        below = T[0] - span * np.array([2, 1])
+        above = T[-1] + span * np.array([1, 2])
+        self.temperature = np.concatenate([below, T, above])
+        self.enthalpy = np.concatenate(
+            [
+                h[0] + self.c_p_s * (below - T[0]),
+                h,
+                h[-1] + self.c_p_l * (above - T[-1]),
+            ]
+        )
+        self._enthalpy = PchipInterpolator(self.temperature, self.enthalpy)
+        if k is not None:
+            k = k[order]
+            k = np.concatenate([[k[0]] * 2, k, [k[-1]] * 2])
+            self._conductivity = PchipInterpolator(self.temperature, k)
+            self.k_s, self.k_l = k[0], k[-1]
+        else:
+            self._conductivity = None
+            self.k_s = self.k_l = None
+
+        # melting temperature and latent heat, at half melting
+        T_fine = np.linspace(T_start, T_end, 10 * n_points)
+        fraction = self.get_liquid_fraction(T_fine)
+        self.T_m = np.interp(0.5, fraction, T_fine)
+        solid, liquid = self._get_baselines(self.T_m)
+        self.L = liquid - solid
+
+    @staticmethod
+    def _find_melting_range(T, enthalpy):
+        """The range where the apparent heat capacity exceeds the line between its
+        values at the ends of the curve by more than 1% of the peak excess"""
+        T_fine = np.linspace(T[0], T[-1], 10001)
+        c = enthalpy.derivative()(T_fine)
+        excess = c - np.interp(T_fine, [T[0], T[-1]], [c[0], c[-1]])
+        melting = np.nonzero(excess > 0.01 * np.max(excess))[0]
+        if len(melting) == 0:
+            msg = "No melting range found in the enthalpy curve"
+            raise ValueError(msg)
+        start = max(melting[0] - 1, 1)
+        end = min(melting[-1] + 1, len(T_fine) - 2)
+        return T_fine[start], T_fine[end]
+
+    def _get_baselines(self, T):
+        """The solid and liquid baselines of the specific enthalpy at temperatures T"""
+        T_start, T_end = self.melting_range
+        h_start, h_end = self._enthalpy([T_start, T_end])
+        solid = h_start + self.c_p_s * (np.asarray(T) - T_start)
+        liquid = h_end + self.c_p_l * (np.asarray(T) - T_end)
+        return solid, liquid
+
+    def get_enthalpy(self, T):
+        """The specific enthalpy at temperatures ``T``, in J.kg-1"""
+        return self._enthalpy(T)
+
+    def get_liquid_fraction(self, T):
+        """The liquid fraction at temperatures ``T``"""
+        T = np.asarray(T, dtype=float)
+        solid, liquid = self._get_baselines(T)
+        fraction = (self._enthalpy(T) - solid) / (liquid - solid)
+        T_start, T_end = self.melting_range
+        fraction = np.where(np.less_equal(T, T_start), 0, fraction.clip(0, 1))
+        return np.where(np.greater_equal(T, T_end), 1, fraction)
+
+    def get_functions(self, density, k_s=None, k_l=None):
+        """
+        Returns the tabulated functions of the parameter values, for a solid phase
+        density (which relates the specific enthalpy to the enthalpy per unit volume)
+
+        Parameters
+        ----------
+        density : float
+            The solid phase density, in kg.m-3
+        k_s, k_l : float, optional
+            The solid and liquid phase conductivities, in W.m-1.K-1, if no
+            conductivity curve is given
+
+        Returns
+        -------
+        dict
+            The functions "PCM temperature [K]", "PCM conductivity [W.m-1.K-1]" and
+            "PCM liquid fraction" of the enthalpy, and "PCM enthalpy [J.m-3]" of the
+            temperature
+        """
+        # fine inverse of the enthalpy, from which the uniform tables are sampled
+        T_fine = np.union1d(
+            self.temperature,
+            np.linspace(self.temperature[0], self.temperature[-1], 50 * self.n_points),
+        )
+        H_fine = density * self._enthalpy(T_fine)
+        H = np.linspace(H_fine[0], H_fine[-1], self.n_points)
+        T = PchipInterpolator(H_fine, T_fine)(H)
+        T[[0, -1]] = self.temperature[[0, -1]]
+        # the liquid fraction is made monotone, as the baselines are secants
+        fraction = np.maximum.accumulate(self.get_liquid_fraction(T))
+        if self._conductivity is not None:
+            k = self._conductivity(T)
+        elif k_s is None or k_l is None:
+            msg = "The solid and liquid phase conductivities are needed without a "
+            msg += "conductivity curve"
+            raise ValueError(msg)
+        else:
+            k = k_s + (k_l - k_s) * fraction
+
+        T_uniform = np.linspace(
+            self.temperature[0], self.temperature[-1], self.n_points
+        )
+        tables = {
+            "PCM temperature [K]": (H, T),
+            "PCM conductivity [W.m-1.K-1]": (H, k),
+            "PCM liquid fraction": (H, fraction),
+            "PCM enthalpy [J.m-3]": (
+                T_uniform,
+                density * self._enthalpy(T_uniform),
+            ),
+        }
+        return {name: _PropertyTable(x, y, name) for name, (x, y) in tables.items()}
+
+
+def set_pcm_properties(parameter_values, properties):
+    """
+    Returns a copy of the parameter values with tabulated properties of the
+    phase-change material, for models with ``options={"closures": "tabulated"}``.
+    The melting temperature, latent heat and specific heat capacities (and the
+    conductivities, if the conductivity is tabulated) are also set from the curves,
+    as they are used for scales and summaries. The enthalpy per unit volume is the
+    specific enthalpy times the solid phase density.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`
+        The parameter values
+    properties : :class:`PCMProperties`
+        The tabulated properties
+    """
+    parameter_values = parameter_values.copy()
+    functions = properties.get_functions(
+        parameter_values["Solid phase density [kg.m-3]"],
+        k_s=parameter_values["Solid phase conductivity [W.m-1.K-1]"],
+        k_l=parameter_values["Liquid phase conductivity [W.m-1.K-1]"],
+    )
+    parameter_values.update(
+        {
+            **functions,
+            "Melting temperature [K]": properties.T_m,
+            "Latent heat [J.kg-1]": properties.L,
+            "Solid phase specific heat capacity [J.kg-1.K-1]": properties.c_p_s,
+            "Liquid phase specific heat capacity [J.kg-1.K-1]": properties.c_p_l,
+        },
+        check_already_exists=False,
+    )
+    if properties.k_s is not None:
+        parameter_values["Solid phase conductivity [W.m-1.K-1]"] = properties.k_s
+        parameter_values["Liquid phase conductivity [W.m-1.K-1]"] = properties.k_l
+    return parameter_values
@@ -6,34 +6,39 @@ import math
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib import cm
 
+from .data import load_dataset
+from .evaluation import evaluate
 from .utils import set_plotting_format
 
 
-def plot_comparison_data(simulation, datasets, xs=None, plotting_format="paper"):
+def plot_comparison_data(simulation, dataset=None, r_probe=0.8, plotting_format="paper"):
     set_plotting_format(plotting_format)
 
-    if xs is None:
-        xs = [0.25, 0.5, 0.75, 1]
+    if dataset is None:
+        dataset = load_dataset()
     fig, axes = plt.subplots(2, 2, figsize=(5.5, 3.5), sharey=True, sharex=True)
 
     L = simulation.parameter_values["Pipe length [m]"]
     R = simulation.parameter_values["Capsule radius [m]"]
 
     solution = simulation.solution
+    time = solution.t
 
-    for data, x in zip(datasets["PCM"], xs):
-        time = solution["Time [s]"].entries
-        T_HTF = solution["Phase-change material temperature [degC]"](t=time, x=x*L, r=0.8*R)
-        axes[1, 0].plot(time, T_HTF)
-        axes[1, 1].plot(data["Time [min]"] * 60, data["PCM Temperature [degC]"], '.-', label=f"{x:.2f}L")
+    # Evaluate the model at all the probes at once
+    xs = dataset.positions["PCM"]
+    T_PCM = evaluate(
+        solution, "Phase-change material temperature [degC]", x=xs * L, r=r_probe * R
+    )
+    for i, x in enumerate(xs):
+        axes[1, 0].plot(time, T_PCM[i])
+        axes[1, 1].plot(*dataset.get_series("PCM", i), '.-', label=f"{x:.2f}L")
 
-    for data, x in zip(datasets["HTF"], xs):
-        time = solution["Time [s]"].entries
-        T_HTF = solution["Heat transfer fluid temperature [degC]"](t=time, x=x*L)
-        axes[0, 0].plot(time, T_HTF, label=f"{x:.2f}L")
-        axes[0, 1].plot(data["Time [min]"] * 60, data["HTF Temperature [degC]"], '.-', label=f"{x:.2f}L")
+    xs = dataset.positions["HTF"]
+    T_HTF = evaluate(solution, "Heat transfer fluid temperature [degC]", x=xs * L)
+    for i, x in enumerate(xs):
+        axes[0, 0].plot(time, T_HTF[i], label=f"{x:.2f}L")
+        axes[0, 1].plot(*dataset.get_series("HTF", i), '.-', label=f"{x:.2f}L")
 
     for ax in axes[1, :]:
         ax.set_xlabel("Time [s]")
@@ -49,6 +54,11 @@ def plot_comparison_data(simulation, datasets, xs=None, plotting_format="paper")
 
     return fig, axes
 
+def _get_nodes(solution, name):
+    """The mesh nodes of a spatial variable, such as x [m] or r [mm]"""
+    entries = solution[name].entries
+    return entries.reshape(entries.shape[0], -1)[:, 0]
+
 def compare_0D_variables(simulations, output_variables=None, variable_names=None, plotting_format="paper"):
     if output_variables is None:
         output_variables = [
@@ -74,18 +84,18 @@ def compare_0D_variables(simulations, output_variables=None, variable_names=None
     N_rows = math.ceil(len(output_variables)/ 2)
     fig, axes = plt.subplots(N_rows, 2, figsize=(5.5, 0.5 + 1.5 * N_rows), sharey=False, sharex=True)
 
+    values = [evaluate(sim.solution, output_variables) for sim in simulations[:2]]
+
     if len(simulations) > 1:
         for i, var_name in enumerate(output_variables):
             ax = axes.flat[i]
-            time = simulations[1].solution["Time [s]"].data
-            var = simulations[1].solution[var_name].data
-            ax.plot(time, var, "k--", label=simulations[1].model.name)
+            time = simulations[1].solution.t
+            ax.plot(time, values[1][var_name], "k--", label=simulations[1].model.name)
 
     for i, var_name in enumerate(output_variables):
         ax = axes.flat[i]
-        time = simulations[0].solution["Time [s]"].data
-        var = simulations[0].solution[var_name].data
-        ax.plot(time, var, label=simulations[0].model.name)
+        time = simulations[0].solution.t
+        ax.plot(time, values[0][var_name], label=simulations[0].model.name)
         ax.set_xlabel("Time [s]")
         ax.set_ylabel(variable_names[i])
 
@@ -112,7 +122,7 @@ def compare_1D_variables(simulations, output_variables=None, variable_names=None
 
     if not isinstance(times, list):
         if isinstance(times, int):
-            end_time = simulations[0].solution["Time [s]"].data[-1]
+            end_time = simulations[0].solution.t[-1]
             times = [end_time * i / (times - 1) for i in range(times)]
         else:
             raise ValueError("times must be an integer or a list")
@@ -122,30 +132,30 @@ def compare_1D_variables(simulations, output_variables=None, variable_names=None
     N_rows = math.ceil(len(output_variables)/ 2)
     fig, axes = plt.subplots(N_rows, 2, figsize=(5.5, 0.5 + 1.5 * N_rows), sharey=False, sharex=True)
 
-    viridis = cm.get_cmap('viridis')
-    colours = viridis(np.linspace(0, 0.9, len(times)))
+    colours = mpl.colormaps["viridis"](np.linspace(0, 0.9, len(times)))
+
+    # Evaluate each variable at all the times at once, at the mesh nodes
+    x = [_get_nodes(sim.solution, "x [m]") for sim in simulations[:2]]
+    values = [
+        evaluate(sim.solution, output_variables, t=times) for sim in simulations[:2]
+    ]
 
     if len(simulations) > 1:
         for i, var_name in enumerate(output_variables):
-            label = simulations[1].model.name
-            for t in times:
-                ax = axes.flat[i]
-                time = simulations[1].solution["x [m]"](t=t)
-                var = simulations[1].solution[var_name](t=t)
-                ax.plot(time, var, "k--", label=label)
-                label = None
+            ax = axes.flat[i]
+            var = values[1][var_name]
+            ax.plot(x[1], var, "k--")
+            ax.lines[-len(times)].set_label(simulations[1].model.name)
 
     for i, var_name in enumerate(output_variables):
+        ax = axes.flat[i]
         label = simulations[0].model.name
-        for t, c in zip(times, colours):
-            ax = axes.flat[i]
-            time = simulations[0].solution["x [m]"](t=t)
-            var = simulations[0].solution[var_name](t=t)
-            ax.plot(time, var, color=c, label=label)
+        for j, c in enumerate(colours):
+            ax.plot(x[0], values[0][var_name][:, j], color=c, label=label)
             label = None
 
-            ax.set_xlabel("z [m]")
-            ax.set_ylabel(variable_names[i])
+        ax.set_xlabel("z [m]")
+        ax.set_ylabel(variable_names[i])
 
     axes.flat[0].legend()
     fig.tight_layout()
@@ -161,14 +171,14 @@ def compare_2D_variables(simulations, output_variable=None, variable_name=None,
 
     if not isinstance(times, list):
         if isinstance(times, int):
-            end_time = simulations[0].solution["Time [s]"].data[-1]
+            end_time = simulations[0].solution.t[-1]
             times = [end_time * i / (times - 1) for i in range(times)]
         else:
             raise ValueError("times must be an integer or a list")
 
+    Z = simulations[0].parameter_values["Pipe length [m]"]
     if not isinstance(xs, list):
         if isinstance(xs, int):
-            Z = simulations[0].parameter_values["Pipe length [m]"]
             xs = [Z * i / (xs - 1) for i in range(xs)]
         else:
             raise ValueError("xs must be an integer or a list")
@@ -177,18 +187,18 @@ def compare_2D_variables(simulations, output_variable=None, variable_name=None,
     N_rows = math.ceil(len(times)/ 2)
     fig, axes = plt.subplots(N_rows, 2, figsize=(5.5, 0.5 + 1.5 * N_rows), sharey=True, sharex=True)
 
-    for t, ax in zip(times, axes.flat):
+    # Evaluate the variable at all the times and positions at once, at the mesh nodes
+    r = [_get_nodes(sim.solution, "r [mm]") for sim in simulations[:2]]
+    var = evaluate(simulations[0].solution, output_variable, t=times, x=Z / 2)
+    if len(simulations) > 1:
+        var_2 = evaluate(simulations[1].solution, output_variable, t=times, x=xs)
+
+    for j, (t, ax) in enumerate(zip(times, axes.flat)):
         if len(simulations) > 1:
-            label = simulations[1].model.name
-            for x in xs:
-                r = simulations[1].solution["r [mm]"](t=t, x=Z/2)
-                var = simulations[1].solution[output_variable](t=t, x=x)
-                ax.plot(r, var, "lightgray", label=label)
-                label = None
-
-        r = simulations[0].solution["r [mm]"](t=t, x=Z/2)
-        var = simulations[0].solution[output_variable](t=t, x=Z/2)
-        ax.plot(r, var, label=simulations[0].model.name)
+            ax.plot(r[1], var_2[:, :, j], "lightgray")
+            ax.lines[-len(xs)].set_label(simulations[1].model.name)
+
+        ax.plot(r[0], var[:, j], label=simulations[0].model.name)
         ax.set_title(f"t = {t:.0f} s")
 
         ax.set_xlabel("r [mm]")
@@ -0,0 +1,215 @@
+#
+# Stage-level profiling of the simulation workflow
+#
+import json
+import sys
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+#: Profile reports of the solutions, which can't hold extra attributes
+_reports = weakref.WeakKeyDictionary()
+
+
+def _max_rss():
+    """Returns the peak resident set size of the process in MB (or None)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS and in kB elsewhere
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+class ProfileReport:
+    """
+    Report of the stages of a simulation, as returned by :func:`get_profile`.
+
+    Parameters
+    ----------
+    stages : dict
+        The wall time, number of calls and peak memory of each stage, in the order
+        they were first run
+    statistics : dict
+        The size of the discretised model and the statistics of the solver
+    """
+
+    def __init__(self, stages, statistics):
+        self.stages = stages
+        self.statistics = statistics
+
+    def to_dict(self):
+        """Returns the report as a dictionary of plain Python types"""
+        return {
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "statistics": dict(self.statistics),
+        }
+
+    def to_json(self, path=None, **kwargs):
+        """
+        Returns the report as a JSON string, and writes it to ``path`` if given.
+        Keyword arguments are passed to :func:`json.dumps`.
+        """
+        kwargs.setdefault("indent", 2)
+        text = json.dumps(self.to_dict(), **kwargs)
+        if path is not None:
+            Path(path).write_text(text)
+        return text
+
+    def __str__(self):
+        lines = [f"{'Stage':<24}{'Calls':>6}{'Time [s]':>12}{'Peak [MB]':>12}"]
+        for name, stage in self.stages.items():
+            peak = stage["peak memory [MB]"]
+            peak = "" if peak is None else f"{peak:.1f}"
+            lines.append(
+                f"{name:<24}{stage['calls']:>6}{stage['wall time [s]']:>12.3f}"
+                f"{peak:>12}"
+            )
+        lines += [f"{name}: {value}" for name, value in self.statistics.items()]
+        return "\n".join(lines)
+
+
+class Profiler:
+    """
+    Records the wall time and peak memory of the stages of a simulation workflow,
+    such as building the model, setting up the solver, time stepping and
+    post-processing. Passing ``profiler=True`` to
+    :class:`encapsulated_ltes.LTESSimulation` records its stages, along with the size
+    of the discretised model and the solver statistics, and attaches a
+    :class:`ProfileReport` to each solution (see :func:`get_profile`). Other stages
+    can be recorded with :meth:`stage`, e.g.
+
+    >>> profiler = Profiler()
+    >>> with profiler.stage("model"):
+    ...     model = FullModel()
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Whether to record the peak memory allocated by Python in each stage with
+        :mod:`tracemalloc` (default is True). Tracing allocations slows down the
+        stages which run in Python, such as the discretisation, but not the
+        compiled solver.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+        self.statistics = {}
+        # start memory and running peak of the active stages
+        self._memory_stack = []
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager which records the stage ``name``"""
+        start_tracing = self.memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # the peak is reset for this stage, so keep the peak of the parent stage
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._memory_stack.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = None
+            if self.memory:
+                start_memory, peak = self._memory_stack.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self._memory_stack:
+                    self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+                peak_memory = (peak - start_memory) / 1024**2
+            if start_tracing:
+                tracemalloc.stop()
+            self.add_stage(name, wall_time, peak_memory)
+
+    def add_stage(self, name, wall_time, peak_memory=None):
+        """
+        Adds a call of the stage ``name``, e.g. a time measured by the solver. The
+        wall times of repeated calls are added up, and the peak memory is the largest
+        of all calls.
+        """
+        stage = self.stages.setdefault(
+            name,
+            {
+                "calls": 0,
+                "wall time [s]": 0.0,
+                "peak memory [MB]": None,
+                "max RSS [MB]": None,
+            },
+        )
+        stage["calls"] += 1
+        stage["wall time [s]"] += float(wall_time)
+        if peak_memory is not None:
+            stage["peak memory [MB]"] = max(stage["peak memory [MB]"] or 0, peak_memory)
+        stage["max RSS [MB]"] = _max_rss()
+
+    def record_model(self, model):
+        """Records the size of a discretised model and the sparsity of its Jacobian"""
+        self.statistics.update(
+            {
+                "number of states": int(model.len_rhs_and_alg),
+                "number of differential states": int(model.len_rhs),
+                "number of algebraic states": int(model.len_alg),
+            }
+        )
+        # the Jacobian is only available once the solver is set up
+        jacobian = getattr(model, "jac_rhs_algebraic_eval", None)
+        if hasattr(jacobian, "sparsity_out"):
+            self.statistics["Jacobian nnz"] = int(jacobian.sparsity_out(0).nnz())
+
+    def report(self, solution=None):
+        """
+        Returns a :class:`ProfileReport` of the stages recorded so far, including
+        the statistics of the solver for ``solution`` if given
+        """
+        statistics = dict(self.statistics)
+        if solution is not None:
+            statistics.update(_get_solver_statistics(solution))
+        stages = {name: dict(stage) for name, stage in self.stages.items()}
+        return ProfileReport(stages, statistics)
+
+
+def _get_solver_statistics(solution):
+    """Returns the timings and statistics reported by the solver"""
+    statistics = {"number of time points": len(solution.t)}
+    for name in ["set_up_time", "solve_time", "integration_time"]:
+        value = getattr(solution, name, None)
+        if value is not None:
+            statistics[f"{name.replace('_', ' ')} [s]"] = float(
+                getattr(value, "value", value)
+            )
+    solver_statistics = getattr(solution, "solver_statistics", None)
+    if is_dataclass(solver_statistics):
+        statistics.update(
+            {
+                name.replace("_", " "): int(value)
+                for name, value in asdict(solver_statistics).items()
+            }
+        )
+    return statistics
+
+
+def attach_profile(solution, report):
+    """Attaches a :class:`ProfileReport` to a solution"""
+    _reports[solution] = report
+
+
+def get_profile(solution):
+    """
+    Returns the :class:`ProfileReport` of a solution of a profiled
+    :class:`encapsulated_ltes.LTESSimulation` (or None if it wasn't profiled)
+    """
+    return _reports.get(solution)
@@ -0,0 +1,241 @@
+#
+# Persistent cache of solved runs, keyed by their full configuration
+#
+import hashlib
+import inspect
+import json
+import os
+import types
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pybamm
+
+from .compact import CompactSolution
+from .utils import cache_dir
+
+
+class _UnfingerprintableError(Exception):
+    """Raised for values which can't be identified by their content"""
+
+
+def _fingerprint(value):
+    """JSON-serialisable representation of a value for the cache key"""
+    if isinstance(value, (bool, int, str)) or value is None:
+        result = value
+    elif isinstance(value, float):
+        result = repr(value)
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest = hashlib.sha256(value.tobytes()).hexdigest()
+        result = [str(value.dtype), value.shape, digest]
+    elif isinstance(value, dict):
+        result = {str(k): _fingerprint(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        result = [_fingerprint(v) for v in value]
+    elif isinstance(value, pybamm.SpatialVariable):
+        result = value.name
+    elif isinstance(value, pybamm.Symbol):
+        result = str(value)
+    elif isinstance(value, type):
+        result = f"{value.__module__}.{value.__qualname__}"
+    elif isinstance(value, pybamm.MeshGenerator):
+        result = [_fingerprint(value.submesh_type), _fingerprint(value.submesh_params)]
+    elif callable(value):
+        result = _fingerprint_callable(value)
+    else:
+        result = _fingerprint_object(value)
+    return result
+
+
+def _fingerprint_object(value):
+    """Modules are identified by their name, and other objects by their repr"""
+    if isinstance(value, types.ModuleType):
+        return value.__name__
+    if type(value).__repr__ is object.__repr__:
+        # the default representation is the address of the object
+        raise _UnfingerprintableError(type(value).__qualname__)
+    return f"{type(value).__qualname__}:{value!r}"
+
+
+#: Functions being fingerprinted, so recursive functions are only fingerprinted once
+_functions = set()
+
+
+def _fingerprint_callable(value):
+    """
+    Functions are identified by their source code, along with the values of their
+    closure, their defaults and the globals they read, and callable objects, e.g.
+    measured profiles, by their public attributes (private ones are caches)
+    """
+    if not inspect.isroutine(value) and getattr(value, "__dict__", None):
+        attributes = {k: v for k, v in vars(value).items() if not k.startswith("_")}
+        return [_fingerprint(type(value)), _fingerprint(attributes)]
+    name = getattr(value, "__qualname__", type(value).__qualname__)
+    code = getattr(value, "__code__", None)
+    if code is None:
+        # built-in functions are identified by their name
+        return [getattr(value, "__module__", None), name]
+    if id(value) in _functions:
+        return name
+    try:
+        source = inspect.getsource(value)
+    except (OSError, TypeError) as error:
+        raise _UnfingerprintableError(name) from error
+    try:
+        closure = [cell.cell_contents for cell in value.__closure__ or []]
+    except ValueError as error:  # empty cell
+        raise _UnfingerprintableError(name) from error
+    namespace = value.__globals__
+    global_names = sorted(n for n in _get_names(code) if n in namespace)
+    _functions.add(id(value))
+    try:
+        return [
+            name,
+            hashlib.sha256(source.encode()).hexdigest(),
+            _fingerprint(closure),
+            _fingerprint(value.__defaults__),
+            _fingerprint(value.__kwdefaults__),
+            _fingerprint({n: namespace[n] for n in global_names}),
+        ]
+    finally:
+        _functions.discard(id(value))
+
+
+def _get_names(code):
+    """The global names read by a code object and the code objects nested in it"""
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= _get_names(constant)
+    return names
+
+
+def get_cache_key(simulation, t_eval, inputs=None, storage_policy=None, **kwargs):
+    """
+    Returns the key of a solve of a simulation in the result cache: a hash of the
+    model (class, name, options, probes, events and breakpoints), the parameter
+    values, the inputs, the mesh, the solver settings, the time grid and other
+    keyword arguments of the solve, the stored variables and the package versions.
+
+    If the configuration contains a value which can't be identified by its content,
+    e.g. a function without source code or an object without a representation, the
+    key is unique, so the solve is never found in the cache.
+    """
+    from . import __version__
+
+    model = simulation.model
+    solver = simulation.solver
+    configuration = {
+        "model": [
+            _fingerprint(type(model)),
+            model.name,
+            getattr(model, "options", None),
+            getattr(model, "probes", None),
+            [[event.name, event.expression] for event in model.events],
+            getattr(model, "breakpoints", None),
+        ],
+        "parameter values": dict(sorted(simulation.parameter_values.items())),
+        "inputs": [
+            getattr(simulation, "default_inputs", None),
+            inputs,
+            getattr(simulation, "initial_state_input", False),
+        ],
+        "var_pts": simulation.var_pts,
+        "submesh types": simulation.submesh_types,
+        "spatial methods": {
+            domain: type(method).__qualname__
+            for domain, method in simulation.spatial_methods.items()
+        },
+        "solver": [
+            _fingerprint(type(solver)),
+            solver.rtol,
+            solver.atol,
+            getattr(solver, "options", None),
+            getattr(solver, "output_variables", None),
+        ],
+        "time": np.asarray(t_eval, dtype=float),
+        "solve options": kwargs,
+        "stored variables": getattr(storage_policy, "variables", None),
+        "versions": [__version__, pybamm.__version__],
+    }
+    try:
+        serialised = json.dumps(_fingerprint(configuration), sort_keys=True)
+    except _UnfingerprintableError:
+        return uuid.uuid4().hex
+    return hashlib.sha256(serialised.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of solved runs, stored as compressed
+    :class:`encapsulated_ltes.CompactSolution` files. When the cache exceeds its
+    maximum size, the least recently used results are deleted.
+
+    Caching can be disabled with ``enabled=False`` or, globally, by setting the
+    environment variable ``ENCAPSULATED_LTES_NO_CACHE=1``.
+
+    Parameters
+    ----------
+    path : str or Path, optional
+        The directory of the cache (default is the ``results`` directory of
+        :func:`encapsulated_ltes.utils.cache_dir`)
+    max_size : float, optional
+        The maximum size of the cache, in bytes (default is 1 GB)
+    enabled : bool, optional
+        Whether to use the cache (default is True)
+    """
+
+    def __init__(self, path=None, max_size=1e9, enabled=True):
+        self.path = Path(path) if path is not None else cache_dir() / "results"
+        self.max_size = max_size
+        self.enabled = enabled and os.environ.get("ENCAPSULATED_LTES_NO_CACHE") != "1"
+        if self.enabled:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _filename(self, key):
+        return self.path / f"{key}.npz"
+
+    def get(self, key):
+        """Returns the cached solution for a key, or None if it is not cached"""
+        if not self.enabled:
+            return None
+        filename = self._filename(key)
+        try:
+            solution = CompactSolution.load(filename)
+        except (OSError, ValueError, KeyError):
+            return None
+        # Mark as recently used
+        filename.touch()
+        return solution
+
+    def put(self, key, solution):
+        """Store a :class:`encapsulated_ltes.CompactSolution` in the cache"""
+        if not self.enabled:
+            return
+        filename = self._filename(key)
+        temporary = filename.with_suffix(".tmp.npz")
+        solution.save(temporary)
+        temporary.replace(filename)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used results until the cache fits its size"""
+        files = sorted(self.path.glob("*.npz"), key=lambda f: f.stat().st_mtime)
+        size = sum(f.stat().st_size for f in files)
+        for filename in files:
+            if size <= self.max_size:
+                break
+            size -= filename.stat().st_size
+            filename.unlink()
+
+    @property
+    def size(self):
+        """The size of the cache, in bytes"""
+        return sum(f.stat().st_size for f in self.path.glob("*.npz"))
+
+    def clear(self):
+        """Delete all the cached results"""
+        for filename in self.path.glob("*.npz"):
+            filename.unlink()
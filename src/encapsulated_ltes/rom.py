@@ -0,0 +1,487 @@
+#
+# Reduced-order model of the full model, by proper orthogonal decomposition (POD) of
+# snapshots of the state and the discrete empirical interpolation method (DEIM)
+#
+import time
+
+import casadi
+import numpy as np
+import pybamm
+
+from .models import FullModel
+
+#: Differential state variables of the full model, each with its own POD basis
+STATE_VARIABLES = [
+    "Heat transfer fluid temperature [K]",
+    "Phase-change material enthalpy [J.m-3]",
+    "Stored energy per unit area [J.m-2]",
+]
+
+
+def randomized_svd(X, rank, n_oversamples=10, n_iter=2, seed=None):
+    """
+    Truncated singular value decomposition by the randomised range finder of Halko,
+    Martinsson and Tropp (2011), with power iterations.
+
+    Parameters
+    ----------
+    X : array_like
+        The matrix to decompose, of shape (m, n)
+    rank : int
+        The number of singular values and vectors to compute
+    n_oversamples : int, optional
+        The number of extra random vectors of the range finder (default is 10)
+    n_iter : int, optional
+        The number of power iterations, which improve the accuracy when the singular
+        values decay slowly (default is 2)
+    seed : int or :class:`numpy.random.Generator`, optional
+        The seed of the random number generator
+
+    Returns
+    -------
+    U : :class:`numpy.ndarray`
+        The left singular vectors, of shape (m, rank)
+    S : :class:`numpy.ndarray`
+        The singular values, in decreasing order
+    """
+    X = np.asarray(X, dtype=float)
+    rng = np.random.default_rng(seed)
+    rank = min(rank, *X.shape)
+    n_samples = min(rank + n_oversamples, *X.shape)
+    Q, _ = np.linalg.qr(X @ rng.standard_normal((X.shape[1], n_samples)))
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(X.T @ Q)
+        Q, _ = np.linalg.qr(X @ Q)
+    U, S, _ = np.linalg.svd(Q.T @ X, full_matrices=False)
+    return (Q @ U)[:, :rank], S[:rank]
+
+
+def pod_basis(snapshots, tol=1e-6, max_rank=None, seed=None):
+    """
+    Returns the POD basis of the snapshots (the columns of ``snapshots``), with the
+    fewest modes whose relative energy error (the fraction of the sum of the squared
+    singular values left out) is below ``tol``, up to ``max_rank`` modes
+    """
+    snapshots = np.asarray(snapshots, dtype=float)
+    max_rank = min(max_rank or min(snapshots.shape), *snapshots.shape)
+    U, S = randomized_svd(snapshots, max_rank, seed=seed)
+    total = np.sum(snapshots**2)
+    if total == 0:
+        return U[:, :1]
+    error = 1 - np.cumsum(S**2) / total
+    rank = min(int(np.searchsorted(-error, -tol)) + 1, len(S))
+    return U[:, :rank]
+
+
+def deim_indices(U):
+    """
+    Returns the interpolation indices of the discrete empirical interpolation method
+    (Chaturantabut and Sorensen, 2010) for the basis ``U``, one per column
+    """
+    U = np.asarray(U, dtype=float)
+    indices = [int(np.argmax(np.abs(U[:, 0])))]
+    for j in range(1, U.shape[1]):
+        c = np.linalg.solve(U[indices, :j], U[indices, j])
+        residual = U[:, j] - U[:, :j] @ c
+        indices.append(int(np.argmax(np.abs(residual))))
+    return np.array(indices)
+
+
+def _best_time(function, n_repeats=3):
+    """Returns the result of ``function()`` and its best wall-clock time"""
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+class ReducedOrderModel:
+    """
+    Reduced-order model of a :class:`encapsulated_ltes.FullModel`, built from snapshots
+    of full solves over a training set of inputs.
+
+    The state of each differential variable (the heat transfer fluid temperature, the
+    enthalpy of the phase-change material and the stored energy) is approximated in
+    the span of its POD basis, computed with a randomised SVD of the snapshots. The
+    temperature of the phase-change material is eliminated through its algebraic
+    equation, so the right-hand side is a function of the reduced state only, and
+    the right-hand side (which contains the nonlinear closures ``H2T`` and ``k(H)``)
+    is approximated by DEIM: it is only evaluated at a few interpolation points, which
+    only need the reduced state at the neighbouring nodes of the mesh.
+
+    Reconstructing the full state costs about as much as solving the full model, so
+    the reduced model is only faster when it returns a few output variables (e.g.
+    the outlet temperature), which are evaluated directly from the reduced state
+    (see :meth:`solve`).
+
+    Linear bases approximate moving melting fronts poorly, so the accuracy of the
+    reduced model must be checked with :meth:`validate` for each application.
+
+    Parameters
+    ----------
+    simulation : :class:`encapsulated_ltes.LTESSimulation`
+        A simulation of the full model, whose inputs are the parameters varied in the
+        training set (e.g. the inlet temperature and velocity). It must not have the
+        initial state as an input.
+    tol : float, optional
+        The relative energy error of the POD and DEIM bases (default is 1e-6)
+    max_rank : int, optional
+        The maximum number of POD modes of each state variable (default is None, for
+        no limit). The DEIM bases have up to twice as many modes. The enthalpy needs
+        many modes to resolve the melting fronts, and reduced models with too few
+        modes can be unstable.
+    solver_options : dict, optional
+        Options of the casadi "cvodes" integrator of the reduced model (default is
+        relative and absolute tolerances of 1e-6)
+    seed : int, optional
+        The seed of the randomised SVD
+    """
+
+    def __init__(
+        self, simulation, tol=1e-6, max_rank=None, solver_options=None, seed=None
+    ):
+        if not isinstance(simulation.model, FullModel):
+            msg = "Reduced-order models can only be built for the full model"
+            raise TypeError(msg)
+        if simulation.initial_state_input:
+            msg = "The initial state of the simulation must not be an input"
+            raise ValueError(msg)
+        self.simulation = simulation
+        self.tol = tol
+        self.max_rank = max_rank
+        self.solver_options = solver_options or {"abstol": 1e-6, "reltol": 1e-6}
+        self.seed = seed
+        self.bases = None
+
+        simulation.build()
+        model = simulation.built_model
+        self._n_states = model.len_rhs_and_alg
+        self._n_differential = model.len_rhs
+        self._rhs = self._get_rhs_function()
+
+    def _get_rhs_function(self):
+        """
+        Returns the casadi function ``F(t, d, p)`` of the right-hand side of the
+        differential states ``d``, for the input values ``p``, with the algebraic
+        states eliminated
+        """
+        model = self.simulation.built_model
+        names = self.simulation.input_names
+        t = casadi.MX.sym("t")
+        y = casadi.MX.sym("y", self._n_states)
+        p = casadi.MX.sym("p", len(names))
+        inputs = {name: p[i] for i, name in enumerate(names)}
+        rhs = model.concatenated_rhs.to_casadi(t, y, inputs=inputs)
+        algebraic = model.concatenated_algebraic.to_casadi(t, y, inputs=inputs)
+        function = casadi.Function("full", [t, y, p], [rhs, algebraic]).expand()
+
+        # The algebraic equation T_c - H2T(H) is linear in T_c, with unit Jacobian
+        t = casadi.SX.sym("t")
+        d = casadi.SX.sym("d", self._n_differential)
+        p = casadi.SX.sym("p", len(names))
+        n_algebraic = self._n_states - self._n_differential
+        _, residual = function(t, casadi.vertcat(d, casadi.SX.zeros(n_algebraic)), p)
+        rhs, _ = function(t, casadi.vertcat(d, -residual), p)
+        self._algebraic = casadi.Function("algebraic", [t, d, p], [-residual])
+        return casadi.Function("rhs", [t, d, p], [rhs])
+
+    def _get_parameters(self, inputs):
+        inputs = self.simulation.get_inputs(inputs)
+        return np.array([inputs[name] for name in self.simulation.input_names])
+
+    def train(self, inputs, t_eval, **kwargs):
+        """
+        Solve the full model for each of the training inputs (in a single batched
+        solve), and compute the POD bases of the states and the DEIM bases and
+        interpolation points of the right-hand side from the snapshots.
+
+        Parameters
+        ----------
+        inputs : list of dict
+            The values of the inputs of the training set
+        t_eval : array_like
+            The times of the snapshots, in s
+        **kwargs
+            Keyword arguments passed to
+            :meth:`encapsulated_ltes.LTESSimulation.solve`
+        """
+        t_eval = np.asarray(t_eval, dtype=float)
+        solutions = self.simulation.solve(
+            [t_eval[0], t_eval[-1]], inputs=list(inputs), t_interp=t_eval, **kwargs
+        )
+        states = []
+        derivatives = []
+        for solution, training_inputs in zip(solutions, inputs):
+            d = solution.y[: self._n_differential]
+            p = self._get_parameters(training_inputs)
+            y0 = self.simulation.get_initial_state(training_inputs)
+            states.append(d - y0[: self._n_differential, None])
+            rhs = self._rhs.map(len(solution.t))
+            derivatives.append(
+                np.asarray(
+                    rhs(solution.t[None, :], d, np.tile(p[:, None], len(solution.t)))
+                )
+            )
+        states = np.hstack(states)
+        derivatives = np.hstack(derivatives)
+
+        self.bases = {}
+        for name in STATE_VARIABLES:
+            state_slice = self.simulation.state_slices[name]
+            if state_slice.stop - state_slice.start == 1:
+                V = U = np.ones((1, 1))
+            else:
+                V = pod_basis(states[state_slice], self.tol, self.max_rank, self.seed)
+                max_rank = self.max_rank and 2 * self.max_rank
+                U = pod_basis(derivatives[state_slice], self.tol, max_rank, self.seed)
+            self.bases[name] = (state_slice, V, U, deim_indices(U))
+        self._build_reduced_rhs()
+        return self
+
+    def _build_reduced_rhs(self):
+        """
+        Build the casadi function of the reduced right-hand side
+        ``M @ F_P(t, d0 + V @ a, p)``, where ``F_P`` are the rows of the right-hand side
+        at the interpolation points, which only depend on the states in their stencil
+        """
+        V = self.basis
+        rows = []
+        blocks = []
+        for state_slice, V_block, U, indices in self.bases.values():
+            rows.append(state_slice.start + indices)
+            # Galerkin projection of the DEIM approximation U (P^T U)^-1 F_P
+            blocks.append(V_block.T @ U @ np.linalg.inv(U[indices]))
+        rows = np.concatenate(rows)
+        M = np.zeros((V.shape[1], len(rows)))
+        i = j = 0
+        for block in blocks:
+            M[i : i + block.shape[0], j : j + block.shape[1]] = block
+            i += block.shape[0]
+            j += block.shape[1]
+
+        t = casadi.SX.sym("t")
+        d = casadi.SX.sym("d", self._n_differential)
+        p = casadi.SX.sym("p", len(self.simulation.input_names))
+        sampled = casadi.Function(
+            "sampled", [t, d, p], [self._rhs(t, d, p)[rows.tolist()]]
+        )
+        stencil = np.unique(sampled.sparsity_jac(1, 0).get_col())
+        d_stencil = casadi.SX.sym("d", len(stencil))
+        d_full = casadi.SX(self._n_differential, 1)
+        for i, row in enumerate(stencil):
+            d_full[int(row)] = d_stencil[i]
+
+        sampled = casadi.Function("sampled", [t, d_stencil, p], [sampled(t, d_full, p)])
+
+        a = casadi.SX.sym("a", V.shape[1])
+        d0 = casadi.SX.sym("d0", len(stencil))
+        reduced = casadi.mtimes(
+            casadi.DM(M), sampled(t, d0 + casadi.mtimes(casadi.DM(V[stencil]), a), p)
+        )
+        self._stencil = stencil
+        self._reduced_rhs = {"t": t, "x": a, "p": casadi.vertcat(p, d0), "ode": reduced}
+        self._integrators = {}
+        self._outputs = {}
+        self.interpolation_points = rows
+
+    @property
+    def basis(self):
+        """The block-diagonal POD basis of the differential states"""
+        if self.bases is None:
+            msg = "The reduced-order model must be trained first"
+            raise ValueError(msg)
+        rank = sum(V.shape[1] for _, V, _, _ in self.bases.values())
+        basis = np.zeros((self._n_differential, rank))
+        column = 0
+        for state_slice, V, _, _ in self.bases.values():
+            basis[state_slice, column : column + V.shape[1]] = V
+            column += V.shape[1]
+        return basis
+
+    @property
+    def rank(self):
+        """The number of POD modes of each state variable"""
+        if self.bases is None:
+            return None
+        return {name: V.shape[1] for name, (_, V, _, _) in self.bases.items()}
+
+    def solve(self, t_eval, inputs=None, variables=None):
+        """
+        Solve the reduced-order model at the times ``t_eval``, in s.
+
+        Parameters
+        ----------
+        t_eval : array_like
+            The output times, in s
+        inputs : dict, optional
+            The values of the inputs
+        variables : list of str, optional
+            Variables of the full model to evaluate from the reduced state. By
+            default, the full state is reconstructed instead.
+
+        Returns
+        -------
+        :class:`pybamm.Solution` or dict
+            The :class:`pybamm.Solution` of the discretised full model with the
+            reconstructed state, so any of its variables can be evaluated, or the
+            values of ``variables`` (with shape (number of points, number of times),
+            or (number of times,) for scalar variables) and "Time [s]"
+        """
+        if self.bases is None:
+            msg = "The reduced-order model must be trained first"
+            raise ValueError(msg)
+        t_eval = np.asarray(t_eval, dtype=float)
+        inputs = self.simulation.get_inputs(inputs)
+        d0 = self.simulation.get_initial_state(inputs)[: self._n_differential]
+        p = self._get_parameters(inputs)
+        integrator = self._get_integrator(t_eval)
+        a0 = np.zeros(self.basis.shape[1])
+        a = integrator(x0=a0, p=np.concatenate([p, d0[self._stencil]]))["xf"]
+        a = np.column_stack([a0, np.asarray(a)])
+        if variables is None:
+            return self.reconstruct(t_eval, a, inputs)
+        outputs = {"Time [s]": t_eval}
+        for name in variables:
+            function = self._get_output_function(name, len(t_eval))
+            values = np.asarray(
+                function(t_eval[None, :], a, np.tile(p[:, None], len(t_eval)), d0)
+            )
+            outputs[name] = values[0] if values.shape[0] == 1 else values
+        return outputs
+
+    def _get_output_function(self, variable, n_times):
+        """
+        Returns the casadi function ``f(t, a, p, d0)`` of a variable of the full model
+        for the reduced states ``a`` at ``n_times`` times, created once per variable
+        and number of times. Only the rows of the basis (and the algebraic states)
+        which the variable depends on are evaluated.
+        """
+        key = (variable, n_times)
+        if key in self._outputs:
+            return self._outputs[key]
+        if variable not in self._outputs:
+            model = self.simulation.built_model
+            names = self.simulation.input_names
+            t = casadi.MX.sym("t")
+            y = casadi.MX.sym("y", self._n_states)
+            p = casadi.MX.sym("p", len(names))
+            inputs = {name: p[i] for i, name in enumerate(names)}
+            expression = model.get_processed_variable(variable).to_casadi(
+                t, y, inputs=inputs
+            )
+            function = casadi.Function("variable", [t, y, p], [expression])
+
+            t = casadi.SX.sym("t")
+            a = casadi.SX.sym("a", self.basis.shape[1])
+            p = casadi.SX.sym("p", len(names))
+            d0 = casadi.SX.sym("d0", self._n_differential)
+            d = d0 + casadi.mtimes(casadi.DM(self.basis), a)
+            y = casadi.vertcat(d, self._algebraic(t, d, p))
+            self._outputs[variable] = casadi.Function(
+                "output", [t, a, p, d0], [function(t, y, p)]
+            )
+        self._outputs[key] = self._outputs[variable].map(n_times)
+        return self._outputs[key]
+
+    def _get_integrator(self, t_eval):
+        """The integrator of the reduced model for the output times, created once"""
+        key = tuple(t_eval)
+        if key not in self._integrators:
+            self._integrators[key] = casadi.integrator(
+                "reduced",
+                "cvodes",
+                self._reduced_rhs,
+                t_eval[0],
+                t_eval[1:],
+                self.solver_options,
+            )
+        return self._integrators[key]
+
+    def reconstruct(self, t, a, inputs=None):
+        """
+        Returns the :class:`pybamm.Solution` of the full model with the states
+        reconstructed from the reduced states ``a`` (of shape ``(rank, len(t))``)
+        """
+        inputs = self.simulation.get_inputs(inputs)
+        t = np.asarray(t, dtype=float)
+        d0 = self.simulation.get_initial_state(inputs)[: self._n_differential]
+        d = d0[:, None] + self.basis @ a
+        p = np.tile(self._get_parameters(inputs)[:, None], len(t))
+        algebraic = np.asarray(self._algebraic.map(len(t))(t[None, :], d, p))
+        return pybamm.Solution(
+            t, np.vstack([d, algebraic]), self.simulation.built_model, inputs
+        )
+
+    def project(self, solution, inputs=None):
+        """
+        Returns the best approximation of a solution of the full model in the span of
+        the POD bases, as a :class:`pybamm.Solution`
+        """
+        inputs = self.simulation.get_inputs(inputs)
+        d0 = self.simulation.get_initial_state(inputs)[: self._n_differential]
+        d = solution.y[: self._n_differential] - d0[:, None]
+        return self.reconstruct(solution.t, self.basis.T @ d, inputs)
+
+    def validate(self, t_eval, inputs=None, variables=None):
+        """
+        Compare the reduced-order model against the full model for the given inputs.
+        The errors of the states are the maximum absolute errors relative to the
+        maximum change of each state variable. The solve times are the best
+        wall-clock times of 3 solves, without the set-up of the solvers, of the full
+        simulation and of the reduced model returning ``variables`` (default is the
+        outlet temperature).
+
+        Returns
+        -------
+        dict
+            The projection error (the error of the best approximation in the span of
+            the POD bases) and the error of the reduced-order model of each state
+            variable, the maximum error of the outlet temperature, the maximum
+            relative error in energy conservation of both models, their solve times
+            and the speed-up of the reduced-order model
+        """
+        t_eval = np.asarray(t_eval, dtype=float)
+        variables = variables or ["Outlet temperature [K]"]
+        # the set-up of the solvers is excluded
+        for name in variables:
+            self._get_output_function(name, len(t_eval))
+        self._get_integrator(t_eval)
+        self.simulation.solve([t_eval[0], t_eval[-1]], inputs=inputs, t_interp=t_eval)
+        full, full_time = _best_time(
+            lambda: self.simulation.solve(
+                [t_eval[0], t_eval[-1]], inputs=inputs, t_interp=t_eval
+            )
+        )
+        _, reduced_time = _best_time(
+            lambda: self.solve(t_eval, inputs, variables=variables)
+        )
+        reduced = self.solve(t_eval, inputs)
+        projected = self.project(full, inputs)
+
+        report = {"Projection error": {}, "Reduced-order model error": {}}
+        y0 = self.simulation.get_initial_state(inputs)
+        for name in STATE_VARIABLES:
+            state_slice = self.simulation.state_slices[name]
+            y = full.y[state_slice]
+            scale = np.max(np.abs(y - y0[state_slice, None])) or 1
+            for key, approximation in [
+                ("Projection error", projected),
+                ("Reduced-order model error", reduced),
+            ]:
+                error = np.max(np.abs(approximation.y[state_slice] - y))
+                report[key][name] = error / scale
+        outlet = "Outlet temperature [K]"
+        energy = "Relative error in energy conservation [%]"
+        report["Outlet temperature error [K]"] = np.max(
+            np.abs(reduced[outlet].entries - full[outlet].entries)
+        )
+        report[energy] = {
+            "Full model": np.max(np.abs(full[energy].entries)),
+            "Reduced-order model": np.max(np.abs(reduced[energy].entries)),
+        }
+        report["Full model time [s]"] = full_time
+        report["Reduced-order model time [s]"] = reduced_time
+        report["Speed-up"] = full_time / reduced_time
+        return report
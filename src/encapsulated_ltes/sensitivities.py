@@ -0,0 +1,117 @@
+#
+# Forward sensitivities of the model outputs with respect to the parameters
+#
+import numpy as np
+
+SENSITIVITY_PARAMETERS = [
+    "Heat transfer coefficient [W.m-2.K-1]",
+    "Inlet velocity [m.s-1]",
+    "Porosity",
+    "Capsule radius [m]",
+    "Solid phase conductivity [W.m-1.K-1]",
+    "Liquid phase conductivity [W.m-1.K-1]",
+]
+
+SENSITIVITY_VARIABLES = [
+    "Outlet temperature [K]",
+    "Stored energy per unit area [J.m-2]",
+    "X-averaged state of charge",
+]
+
+
+def get_sensitivities(solution, variables=None, parameters=None):
+    """
+    Returns the forward sensitivities of the variables of a solution computed with
+    ``calculate_sensitivities=True`` (e.g. by :class:`encapsulated_ltes.LTESSimulation`
+    with the parameters as inputs).
+
+    Parameters
+    ----------
+    solution : :class:`pybamm.Solution`
+        The solution, with sensitivities
+    variables : list of str, optional
+        The variables (default is the outlet temperature, the stored energy and the
+        state of charge)
+    parameters : list of str, optional
+        The parameters (default is all the input parameters of the solution)
+
+    Returns
+    -------
+    dict
+        The sensitivities, as ``{variable: {parameter: array}}``, with each array
+        of the same shape as ``solution[variable].entries``
+    """
+    variables = variables or SENSITIVITY_VARIABLES
+    sensitivities = {}
+    for name in variables:
+        variable = solution[name]
+        entries = variable.entries
+        if parameters is None:
+            parameters = [p for p in variable.sensitivities if p != "all"]
+        # Sensitivities are stacked in time, each time with the state ordering
+        sensitivities[name] = {
+            p: np.asarray(variable.sensitivities[p])
+            .reshape(entries.shape[-1], *entries.shape[-2::-1])
+            .T
+            for p in parameters
+        }
+    return sensitivities
+
+
+def check_sensitivities(
+    simulation,
+    t_eval,
+    t_interp=None,
+    variables=None,
+    parameters=None,
+    inputs=None,
+    step=1e-3,
+):
+    """
+    Compare the forward sensitivities against central finite differences.
+
+    Parameters
+    ----------
+    simulation : :class:`encapsulated_ltes.LTESSimulation`
+        The simulation, with the parameters to check as inputs. Models with smooth
+        closures (``options={"closures": "smooth"}``) are recommended, as well as
+        tight solver tolerances so the finite differences are accurate.
+    t_eval : array-like
+        The start and end times of the simulation
+    t_interp : array-like, optional
+        The times at which to compare the sensitivities
+    variables : list of str, optional
+        The variables to check (default is the outlet temperature, the stored energy
+        and the state of charge)
+    parameters : list of str, optional
+        The parameters to check (default is all the inputs of the simulation)
+    inputs : dict, optional
+        The values of the inputs (default is the simulation default inputs)
+    step : float, optional
+        The relative step of the finite differences (default is 1e-3)
+
+    Returns
+    -------
+    dict
+        The error of the sensitivities relative to the largest finite difference
+        derivative, as ``{variable: {parameter: error}}``
+    """
+    variables = variables or SENSITIVITY_VARIABLES
+    parameters = parameters or simulation.input_names
+    inputs = {**simulation.default_inputs, **(inputs or {})}
+
+    solution = simulation.solve(
+        t_eval, inputs=inputs, t_interp=t_interp, calculate_sensitivities=True
+    )
+    sensitivities = get_sensitivities(solution, variables, parameters)
+
+    errors = {name: {} for name in variables}
+    for p in parameters:
+        h = step * abs(inputs[p])
+        perturbed = [{**inputs, p: inputs[p] + h}, {**inputs, p: inputs[p] - h}]
+        plus, minus = simulation.solve(t_eval, inputs=perturbed, t_interp=t_interp)
+        for name in variables:
+            fd = (plus[name].entries - minus[name].entries) / (2 * h)
+            scale = np.max(np.abs(fd)) or 1
+            errors[name][p] = np.max(np.abs(sensitivities[name][p] - fd)) / scale
+    return errors
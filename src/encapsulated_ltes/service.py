@@ -0,0 +1,393 @@
+#
+# Local asyncio prediction service for encapsulated LTES models
+#
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .models import FullModel, ReducedModel
+from .parameter_values import get_parameter_values
+from .simulation import LTESSimulation
+
+DEFAULT_INPUTS = [
+    "Inlet temperature [K]",
+    "Initial temperature [K]",
+    "Inlet velocity [m.s-1]",
+    "Heat transfer coefficient [W.m-2.K-1]",
+]
+
+DEFAULT_VARIABLES = [
+    "Outlet temperature [K]",
+    "X-averaged state of charge",
+]
+
+
+class PredictionService:
+    """
+    Local service that solves encapsulated LTES models on request. It keeps a pool of
+    warm (built and discretised) simulations per model, and coalesces concurrent
+    requests with the same time grid into batched solves.
+
+    A request is a dictionary with the keys
+
+    - ``"model"``: the model name, one of ``"Full model"`` or ``"Reduced model"``
+    - ``"t_eval"``: the start and end times of the simulation, in seconds
+    - ``"t_interp"`` (optional): the times at which to return the outputs (default
+      is 101 equally spaced times)
+    - ``"inputs"`` (optional): dictionary of parameter overrides, which must be
+      among the service inputs
+    - ``"inlet temperature"`` (optional): piecewise-constant inlet temperature
+      profile, as a list of ``[time, temperature]`` pairs
+    - ``"variables"`` (optional): list of variables to return (default is the outlet
+      temperature and the state of charge)
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the "Nallusamy2007" parameter set)
+    inputs : list of str, optional
+        The parameters that requests can override
+    var_pts : dict, optional
+        The number of points of the mesh, keyed by "r" and "x"
+    pool_size : int, optional
+        The number of warm simulations per model (default is 1)
+    max_batch_size : int, optional
+        The maximum number of requests solved in a single batch (default is 16)
+    max_wait : float, optional
+        The time, in seconds, to wait for more requests before solving a batch
+        (default is 0.01)
+    max_queue_size : int, optional
+        The maximum number of pending requests. Clients wait when the queue is full
+        (default is 64).
+    """
+
+    def __init__(
+        self,
+        parameter_values=None,
+        inputs=None,
+        var_pts=None,
+        pool_size=1,
+        max_batch_size=16,
+        max_wait=0.01,
+        max_queue_size=64,
+    ):
+        self.parameter_values = parameter_values or get_parameter_values(
+            "Nallusamy2007"
+        )
+        self.inputs = DEFAULT_INPUTS if inputs is None else inputs
+        self.var_pts = var_pts
+        self.pool_size = pool_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+
+        self.model_classes = {"Full model": FullModel, "Reduced model": ReducedModel}
+        self.latencies = deque(maxlen=1000)
+        self.counts = defaultdict(int)
+
+        self._queue = None
+        self._pools = {}
+        self._executor = None
+        self._batcher = None
+        self._tasks = set()
+
+    def _new_simulation(self, model_class):
+        model = model_class()
+        var_pts = None
+        if self.var_pts is not None:
+            var_pts = {
+                model.variables["r [m]"]: self.var_pts["r"],
+                model.variables["x [m]"]: self.var_pts["x"],
+            }
+        sim = LTESSimulation(
+            model,
+            parameter_values=self.parameter_values,
+            inputs=self.inputs,
+            initial_state_input=True,
+            var_pts=var_pts,
+        )
+        # Solve once so the solver is set up before the first request
+        sim.solve([0, 1])
+        return sim
+
+    async def start(self):
+        """Build the pool of simulations and start batching requests"""
+        loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.pool_size * len(self.model_classes)
+        )
+        for name, model_class in self.model_classes.items():
+            pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                sim = await loop.run_in_executor(
+                    self._executor, self._new_simulation, model_class
+                )
+                pool.put_nowait(sim)
+            self._pools[name] = pool
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batcher = asyncio.create_task(self._batch_requests())
+
+    async def stop(self):
+        """Stop batching requests and release the simulations"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._batcher = None
+
+    async def predict(self, request):
+        """Solve the model for a request and return the outputs and latency metrics"""
+        future = await self.submit(request)
+        return await future
+
+    async def submit(self, request):
+        """
+        Queue a request, waiting if the queue is full, and return a future for its
+        response
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            item = self._parse_request(request)
+        except (KeyError, TypeError, ValueError) as error:
+            future.set_result({"id": request.get("id"), "error": str(error)})
+            return future
+        item.update({"future": future, "queued": time.perf_counter()})
+        await self._queue.put(item)
+        return future
+
+    def _parse_request(self, request):
+        model = request.get("model", "Full model")
+        if model not in self.model_classes:
+            msg = f"Unknown model '{model}'"
+            raise KeyError(msg)
+        t_start, t_end = (float(t) for t in request["t_eval"])
+        t_interp = request.get("t_interp")
+        if t_interp is None:
+            t_interp = np.linspace(t_start, t_end, 101)
+        t_interp = np.asarray(t_interp, dtype=float)
+        inputs = dict(request.get("inputs", {}))
+        unknown = set(inputs) - set(self.inputs)
+        if unknown:
+            msg = f"Parameters {sorted(unknown)} are not inputs of this service"
+            raise KeyError(msg)
+
+        # Split the time interval at the changes of inlet temperature
+        profile = request.get("inlet temperature")
+        if profile is None:
+            profile = [[t_start, inputs.get("Inlet temperature [K]")]]
+        breakpoints = [t_start] + [float(t) for t, _ in profile[1:]] + [t_end]
+        if np.any(np.diff(breakpoints) <= 0):
+            msg = "Inlet temperature times must be increasing and within t_eval"
+            raise ValueError(msg)
+        segments = []
+        for (_, T_in), t_0, t_1 in zip(profile, breakpoints[:-1], breakpoints[1:]):
+            segment_inputs = dict(inputs)
+            if T_in is not None:
+                segment_inputs["Inlet temperature [K]"] = float(T_in)
+            segments.append((t_0, t_1, segment_inputs))
+
+        return {
+            "id": request.get("id"),
+            "model": model,
+            "key": (model, tuple(breakpoints), tuple(t_interp)),
+            "segments": segments,
+            "t_interp": t_interp,
+            "variables": request.get("variables", DEFAULT_VARIABLES),
+        }
+
+    async def _batch_requests(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = defaultdict(list)
+            for item in batch:
+                groups[item["key"]].append(item)
+            for group in groups.values():
+                task = asyncio.create_task(self._solve_group(group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _solve_group(self, group):
+        loop = asyncio.get_running_loop()
+        pool = self._pools[group[0]["model"]]
+        sim = await pool.get()
+        started = time.perf_counter()
+        try:
+            responses = await loop.run_in_executor(
+                self._executor, self._solve, sim, group
+            )
+        except Exception as error:
+            responses = [{"error": str(error)} for _ in group]
+        finally:
+            pool.put_nowait(sim)
+        finished = time.perf_counter()
+
+        for item, response in zip(group, responses):
+            metrics = {
+                "queue time [s]": started - item["queued"],
+                "solve time [s]": finished - started,
+                "total time [s]": finished - item["queued"],
+                "batch size": len(group),
+            }
+            self.latencies.append(metrics["total time [s]"])
+            self.counts["requests"] += 1
+            self.counts["errors"] += "error" in response
+            response.update({"id": item["id"], "metrics": metrics})
+            if not item["future"].done():
+                item["future"].set_result(response)
+        self.counts["batches"] += 1
+
+    @staticmethod
+    def _solve(sim, group):
+        """Solve a group of requests sharing the same time grid, segment by segment"""
+        t_interp = group[0]["t_interp"]
+        n_segments = len(group[0]["segments"])
+        initial_states = None
+        outputs = [defaultdict(list) for _ in group]
+        for k in range(n_segments):
+            t_0, t_1, _ = group[0]["segments"][k]
+            interior = t_interp[(t_interp > t_0) & (t_interp < t_1)]
+            t_segment = np.concatenate([[t_0], interior, [t_1]])
+            keep = np.isin(t_segment, t_interp)
+            if k > 0:
+                keep[0] = False
+
+            inputs = [item["segments"][k][2] for item in group]
+            solutions = sim.solve(
+                [t_0, t_1],
+                inputs=inputs,
+                initial_state=initial_states,
+                t_interp=t_segment,
+            )
+            initial_states = [sim.get_final_state(sol) for sol in solutions]
+
+            for item, sol, output in zip(group, solutions, outputs):
+                output["Time [s]"].append(sol["Time [s]"].entries[..., keep])
+                for var in item["variables"]:
+                    output[var].append(sol[var].entries[..., keep])
+
+        return [
+            {
+                "variables": {
+                    var: np.concatenate(values, axis=-1).tolist()
+                    for var, values in output.items()
+                }
+            }
+            for output in outputs
+        ]
+
+    def metrics(self):
+        """Returns summary metrics of the requests served so far"""
+        latencies = np.array(self.latencies)
+        metrics = dict(self.counts)
+        metrics["pending requests"] = self._queue.qsize() if self._queue else 0
+        if latencies.size:
+            metrics.update(
+                {
+                    "mean latency [s]": latencies.mean(),
+                    "median latency [s]": np.median(latencies),
+                    "95th percentile latency [s]": np.percentile(latencies, 95),
+                }
+            )
+        return metrics
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve the requests of a client. Each line received is a JSON request, and
+        each line sent back is the JSON response to one of them. Responses may be
+        sent out of order, so requests should carry an ``"id"``. Sending
+        ``{"command": "metrics"}`` returns the service metrics.
+        """
+        lock = asyncio.Lock()
+
+        async def respond(future):
+            response = await future
+            async with lock:
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+
+        pending = []
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as error:
+                future = asyncio.get_running_loop().create_future()
+                future.set_result({"error": f"Invalid JSON: {error}"})
+            else:
+                if request.get("command") == "metrics":
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result(self.metrics())
+                else:
+                    # Waits if the queue is full, which stops reading from the client
+                    future = await self.submit(request)
+            pending.append(asyncio.create_task(respond(future)))
+
+        await asyncio.gather(*pending)
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve(path=None, host="127.0.0.1", port=8765, **kwargs):
+    """
+    Run a prediction service until cancelled, listening on a Unix socket if ``path``
+    is given or on a TCP port otherwise. Keyword arguments are passed to
+    :class:`PredictionService`.
+    """
+    service = PredictionService(**kwargs)
+    await service.start()
+    if path is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encapsulated LTES prediction service")
+    parser.add_argument("--socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--parameter-set", default="Nallusamy2007")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    asyncio.run(
+        serve(
+            path=args.socket,
+            host=args.host,
+            port=args.port,
+            parameter_values=get_parameter_values(args.parameter_set),
+            pool_size=args.pool_size,
+            max_batch_size=args.max_batch_size,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
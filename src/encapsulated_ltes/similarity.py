@@ -0,0 +1,454 @@
+#
+# Dimensionless groups of the encapsulated LTES models, and a library of precomputed
+# dimensionless responses over a grid of groups
+#
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+from .models import FullModel
+from .parameter_values import get_parameter_values
+from .simulation import LTESSimulation
+
+#: Dimensionless groups which, together with the dimensionless time
+#: t * k_s / (rho_s * c_p_s * R^2), fully determine the dimensionless temperatures
+#: (T - T_m) / (T_in - T_m) and the state of charge of the models
+GROUPS = [
+    # h R / k_s
+    "Biot number",
+    # c_p_s (T_in - T_m) / L
+    "Stefan number",
+    # Conduction time in the capsules over residence time in the pipe
+    "Peclet number",
+    "Porosity",
+    # rho_f c_p_f / (rho_s c_p_s)
+    "Heat capacity ratio",
+    # k_l / k_s
+    "Conductivity ratio",
+    # rho_l c_p_l / (rho_s c_p_s)
+    "Liquid heat capacity ratio",
+    # (T_0 - T_m) / (T_in - T_m)
+    "Initial temperature ratio",
+]
+
+#: Parameters changed by :func:`set_dimensionless_groups`, which leaves the time
+#: and temperature scales unchanged
+GROUP_PARAMETERS = {
+    "Biot number": "Heat transfer coefficient [W.m-2.K-1]",
+    "Stefan number": "Inlet temperature [K]",
+    "Peclet number": "Inlet velocity [m.s-1]",
+    "Porosity": "Porosity",
+    "Heat capacity ratio": "Heat transfer fluid specific heat capacity [J.kg-1.K-1]",
+    "Conductivity ratio": "Liquid phase conductivity [W.m-1.K-1]",
+    "Liquid heat capacity ratio": "Liquid phase specific heat capacity [J.kg-1.K-1]",
+    "Initial temperature ratio": "Initial temperature [K]",
+}
+
+#: Variables of the library, with the outlet temperature stored as
+#: (T_out - T_m) / (T_in - T_m)
+LIBRARY_VARIABLES = ["Outlet temperature [K]", "X-averaged state of charge"]
+
+
+def _get(parameter_values, name):
+    value = parameter_values[name]
+    if not isinstance(value, (int, float, np.number)):
+        msg = f"'{name}' must be a constant for the dimensionless groups, not {value}"
+        raise TypeError(msg)
+    return float(value)
+
+
+def get_scales(parameter_values):
+    """
+    Returns the time scale (the conduction time in the capsules) and the temperature
+    scales of a parameter set, with which the dimensionless responses are turned back
+    into dimensional quantities.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`
+        The parameter values, with a constant inlet temperature
+
+    Returns
+    -------
+    dict
+        The "Time scale [s]", "Melting temperature [K]" and "Temperature difference
+        [K]" (inlet minus melting temperature)
+    """
+    k_s = _get(parameter_values, "Solid phase conductivity [W.m-1.K-1]")
+    rho_c_s = _get(parameter_values, "Solid phase density [kg.m-3]") * _get(
+        parameter_values, "Solid phase specific heat capacity [J.kg-1.K-1]"
+    )
+    R = _get(parameter_values, "Capsule radius [m]")
+    T_m = _get(parameter_values, "Melting temperature [K]")
+    return {
+        "Time scale [s]": rho_c_s * R**2 / k_s,
+        "Melting temperature [K]": T_m,
+        "Temperature difference [K]": _get(parameter_values, "Inlet temperature [K]")
+        - T_m,
+    }
+
+
+def get_dimensionless_groups(parameter_values):
+    """
+    Returns the dimensionless groups (see :data:`GROUPS`) of a parameter set.
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues`
+        The parameter values, with a constant inlet temperature
+
+    Returns
+    -------
+    dict
+        The value of each group
+    """
+
+    def get(name):
+        return _get(parameter_values, name)
+
+    scales = get_scales(parameter_values)
+    k_s = get("Solid phase conductivity [W.m-1.K-1]")
+    rho_c_s = get("Solid phase density [kg.m-3]") * get(
+        "Solid phase specific heat capacity [J.kg-1.K-1]"
+    )
+    delta_T = scales["Temperature difference [K]"]
+    return {
+        "Biot number": get("Heat transfer coefficient [W.m-2.K-1]")
+        * get("Capsule radius [m]")
+        / k_s,
+        "Stefan number": get("Solid phase specific heat capacity [J.kg-1.K-1]")
+        * delta_T
+        / get("Latent heat [J.kg-1]"),
+        "Peclet number": get("Inlet velocity [m.s-1]")
+        * scales["Time scale [s]"]
+        / get("Pipe length [m]"),
+        "Porosity": get("Porosity"),
+        "Heat capacity ratio": get("Heat transfer fluid density [kg.m-3]")
+        * get("Heat transfer fluid specific heat capacity [J.kg-1.K-1]")
+        / rho_c_s,
+        "Conductivity ratio": get("Liquid phase conductivity [W.m-1.K-1]") / k_s,
+        "Liquid heat capacity ratio": get("Liquid phase density [kg.m-3]")
+        * get("Liquid phase specific heat capacity [J.kg-1.K-1]")
+        / rho_c_s,
+        "Initial temperature ratio": (
+            get("Initial temperature [K]") - scales["Melting temperature [K]"]
+        )
+        / delta_T,
+    }
+
+
+def set_dimensionless_groups(groups, parameter_values):
+    """
+    Returns a copy of the parameter values with the given dimensionless groups, and
+    the other groups unchanged. Only the parameters in :data:`GROUP_PARAMETERS` are
+    changed, so the time scale and the melting temperature are those of
+    ``parameter_values``.
+
+    Parameters
+    ----------
+    groups : dict
+        The values of some or all of the groups
+    parameter_values : :class:`pybamm.ParameterValues`
+        The reference parameter values
+    """
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        msg = f"Unknown dimensionless groups {sorted(unknown)}, must be in {GROUPS}"
+        raise ValueError(msg)
+
+    def get(name):
+        return _get(parameter_values, name)
+
+    groups = {**get_dimensionless_groups(parameter_values), **groups}
+    scales = get_scales(parameter_values)
+    k_s = get("Solid phase conductivity [W.m-1.K-1]")
+    c_p_s = get("Solid phase specific heat capacity [J.kg-1.K-1]")
+    rho_c_s = get("Solid phase density [kg.m-3]") * c_p_s
+    T_m = scales["Melting temperature [K]"]
+    delta_T = groups["Stefan number"] * get("Latent heat [J.kg-1]") / c_p_s
+    values = {
+        "Biot number": groups["Biot number"] * k_s / get("Capsule radius [m]"),
+        "Stefan number": T_m + delta_T,
+        "Peclet number": groups["Peclet number"]
+        * get("Pipe length [m]")
+        / scales["Time scale [s]"],
+        "Porosity": groups["Porosity"],
+        "Heat capacity ratio": groups["Heat capacity ratio"]
+        * rho_c_s
+        / get("Heat transfer fluid density [kg.m-3]"),
+        "Conductivity ratio": groups["Conductivity ratio"] * k_s,
+        "Liquid heat capacity ratio": groups["Liquid heat capacity ratio"]
+        * rho_c_s
+        / get("Liquid phase density [kg.m-3]"),
+        "Initial temperature ratio": T_m
+        + groups["Initial temperature ratio"] * delta_T,
+    }
+    parameter_values = parameter_values.copy()
+    parameter_values.update(
+        {GROUP_PARAMETERS[name]: value for name, value in values.items()}
+    )
+    return parameter_values
+
+
+class SimilarityLibrary:
+    """
+    Library of the dimensionless outlet temperature ``(T_out - T_m) / (T_in - T_m)``
+    and X-averaged state of charge, as functions of the dimensionless time, over a
+    grid of dimensionless groups. The library is built offline (see :meth:`build`)
+    and queried by multilinear interpolation, which is orders of magnitude faster
+    than solving, e.g. to screen many designs.
+
+    The groups which are not part of the grid are fixed to their reference values,
+    and designs with different values of those groups can't be queried.
+
+    Parameters
+    ----------
+    grid : dict
+        The values of each group of the grid (at least two each, increasing)
+    fixed : dict
+        The values of the other groups
+    t : array-like
+        The dimensionless times of the responses
+    responses : dict
+        The responses of each variable in :data:`LIBRARY_VARIABLES`, with shape
+        ``(*grid_shape, len(t))``
+    """
+
+    def __init__(self, grid, fixed, t, responses):
+        self.grid = {
+            name: np.asarray(values, dtype=float) for name, values in grid.items()
+        }
+        self.fixed = dict(fixed)
+        self.t = np.asarray(t, dtype=float)
+        self.responses = {
+            name: np.asarray(r, dtype=float) for name, r in responses.items()
+        }
+        points = list(self.grid.values())
+        self._interpolants = {
+            name: RegularGridInterpolator(points, values)
+            for name, values in self.responses.items()
+        }
+        # Estimate of the interpolation error from the second differences of the
+        # responses along each group
+        self._error_interpolants = {
+            name: RegularGridInterpolator(points, _interpolation_error(values))
+            for name, values in self.responses.items()
+        }
+
+    @classmethod
+    def build(
+        cls,
+        grid,
+        t_max,
+        n_t=201,
+        parameter_values=None,
+        model=None,
+        var_pts=None,
+        solver=None,
+    ):
+        """
+        Builds the library by solving the model at every node of the grid, in a
+        single batched solve.
+
+        Parameters
+        ----------
+        grid : dict
+            The values of each group of the grid (at least two each)
+        t_max : float
+            The final dimensionless time
+        n_t : int, optional
+            The number of dimensionless times (default is 201)
+        parameter_values : :class:`pybamm.ParameterValues`, optional
+            The reference parameter values, which give the value of the groups not in
+            the grid (default is "Nallusamy2007")
+        model : :class:`encapsulated_ltes.BaseLTESModel`, optional
+            The model (default is :class:`encapsulated_ltes.FullModel`)
+        var_pts : dict, optional
+            The number of points of the mesh
+        solver : :class:`pybamm.BaseSolver`, optional
+            The solver
+        """
+        if parameter_values is None:
+            parameter_values = get_parameter_values("Nallusamy2007")
+        model = model or FullModel()
+        grid = {
+            name: np.sort(np.asarray(values, dtype=float))
+            for name, values in grid.items()
+        }
+        reference = get_dimensionless_groups(parameter_values)
+        fixed = {name: value for name, value in reference.items() if name not in grid}
+
+        # Every node of the grid only differs in the parameters of the groups, which
+        # are inputs of a simulation built once
+        names = list(grid)
+        nodes = np.stack(np.meshgrid(*grid.values(), indexing="ij"), axis=-1)
+        nodes = nodes.reshape(-1, len(names))
+        parameters = list(GROUP_PARAMETERS.values())
+        inputs = []
+        for node in nodes:
+            values = set_dimensionless_groups(dict(zip(names, node)), parameter_values)
+            inputs.append({name: values[name] for name in parameters})
+        sim = LTESSimulation(
+            model,
+            parameter_values=parameter_values,
+            inputs=parameters,
+            var_pts=var_pts,
+            solver=solver,
+        )
+        scales = get_scales(parameter_values)
+        t = np.linspace(0, t_max, n_t)
+        t_dim = t * scales["Time scale [s]"]
+        solutions = sim.solve([0, t_dim[-1]], inputs=inputs, t_interp=t_dim)
+
+        T_m = scales["Melting temperature [K]"]
+        temperature = []
+        soc = []
+        for solution, node_inputs in zip(solutions, inputs):
+            delta_T = node_inputs["Inlet temperature [K]"] - T_m
+            T_out = solution["Outlet temperature [K]"].entries
+            temperature.append((T_out - T_m) / delta_T)
+            soc.append(solution["X-averaged state of charge"].entries)
+        shape = (*[len(values) for values in grid.values()], n_t)
+        responses = {
+            "Outlet temperature [K]": np.reshape(temperature, shape),
+            "X-averaged state of charge": np.reshape(soc, shape),
+        }
+        return cls(grid, fixed, t, responses)
+
+    def __call__(self, groups, t=None):
+        """
+        Returns the dimensionless responses for the given groups.
+
+        Parameters
+        ----------
+        groups : dict
+            The values of the groups, as scalars or arrays (broadcast against each
+            other). The groups not in the grid must match the fixed values if given.
+        t : array-like, optional
+            The dimensionless times (default is the times of the library)
+
+        Returns
+        -------
+        dict
+            The responses, with shape ``(*groups_shape, len(t))``, and the estimate
+            of their maximum interpolation error over time (named "... error") with
+            shape ``groups_shape``
+        """
+        for name, value in self.fixed.items():
+            if name in groups and not np.allclose(groups[name], value, rtol=1e-6):
+                msg = f"'{name}' is fixed to {value} in the library"
+                raise ValueError(msg)
+        missing = set(self.grid) - set(groups)
+        if missing:
+            msg = f"Missing dimensionless groups {sorted(missing)}"
+            raise KeyError(msg)
+        values = np.broadcast_arrays(
+            *[np.asarray(groups[name], dtype=float) for name in self.grid]
+        )
+        shape = values[0].shape
+        points = np.column_stack([v.flatten() for v in values])
+        for (name, nodes), column in zip(self.grid.items(), points.T):
+            if np.any(column < nodes[0]) or np.any(column > nodes[-1]):
+                msg = (
+                    f"'{name}' is outside the range of the library "
+                    f"[{nodes[0]}, {nodes[-1]}]"
+                )
+                raise ValueError(msg)
+
+        results = {}
+        for name, interpolant in self._interpolants.items():
+            response = interpolant(points)
+            error = self._error_interpolants[name](points).max(axis=1)
+            if t is not None:
+                response = np.array([np.interp(t, self.t, r) for r in response])
+            results[name] = response.reshape(*shape, -1)
+            results[f"{name} error"] = error.reshape(shape)
+        return results
+
+    def predict(self, parameter_values, t=None):
+        """
+        Returns the outlet temperature and state of charge of a design, from the
+        dimensionless responses of the library.
+
+        Parameters
+        ----------
+        parameter_values : :class:`pybamm.ParameterValues`
+            The parameter values of the design
+        t : array-like, optional
+            The times, in seconds (default is the times of the library, in the time
+            scale of the design)
+
+        Returns
+        -------
+        dict
+            The "Time [s]", "Outlet temperature [K]" and "X-averaged state of
+            charge", and the estimate of the maximum interpolation error of the
+            outlet temperature (in K) and state of charge
+        """
+        scales = get_scales(parameter_values)
+        groups = get_dimensionless_groups(parameter_values)
+        if t is None:
+            t = self.t * scales["Time scale [s]"]
+        t = np.asarray(t, dtype=float)
+        results = self(groups, t / scales["Time scale [s]"])
+
+        T_m = scales["Melting temperature [K]"]
+        delta_T = scales["Temperature difference [K]"]
+        temperature = "Outlet temperature [K]"
+        soc = "X-averaged state of charge"
+        return {
+            "Time [s]": t,
+            temperature: T_m + delta_T * results[temperature],
+            soc: results[soc],
+            f"{temperature} error": abs(delta_T) * results[f"{temperature} error"],
+            f"{soc} error": results[f"{soc} error"],
+        }
+
+    def save(self, path):
+        """Saves the library to a compressed ``.npz`` file"""
+        arrays = {
+            "t": self.t,
+            "grid_names": np.array(list(self.grid)),
+            "fixed_names": np.array(list(self.fixed), dtype=str),
+            "fixed_values": np.array(list(self.fixed.values()), dtype=float),
+            "variables": np.array(list(self.responses)),
+        }
+        for k, values in enumerate(self.grid.values()):
+            arrays[f"grid_{k}"] = values
+        for k, values in enumerate(self.responses.values()):
+            arrays[f"response_{k}"] = values
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a library saved with :meth:`save`"""
+        with np.load(path) as data:
+            grid = {
+                str(name): data[f"grid_{k}"]
+                for k, name in enumerate(data["grid_names"])
+            }
+            fixed = dict(zip(map(str, data["fixed_names"]), data["fixed_values"]))
+            responses = {
+                str(name): data[f"response_{k}"]
+                for k, name in enumerate(data["variables"])
+            }
+            return cls(grid, fixed, data["t"], responses)
+
+
+def _interpolation_error(values):
+    """
+    Returns the estimate of the error of multilinear interpolation at each node,
+    from the second differences along each axis of the grid (excluding the last,
+    time, axis), which are extended to the boundary nodes. The error of linear
+    interpolation is at most one eighth of the second difference for a quadratic,
+    which is doubled as the responses have moving fronts (e.g. the breakthrough of
+    the outlet temperature).
+    """
+    error = np.zeros_like(values)
+    for axis in range(values.ndim - 1):
+        if values.shape[axis] < 3:
+            continue
+        second = np.abs(np.diff(values, n=2, axis=axis)) / 4
+        first = np.take(second, [0], axis=axis)
+        last = np.take(second, [-1], axis=axis)
+        error += np.concatenate([first, second, last], axis=axis)
+    return error
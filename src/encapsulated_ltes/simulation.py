@@ -0,0 +1,391 @@
+#
+# Simulation class for repeated solves of encapsulated LTES models
+#
+from contextlib import nullcontext
+
+import numpy as np
+import pybamm
+
+from .compact import StoragePolicy
+from .interpolation import interpolation_matrix, interpolation_matrix_2D
+from .profiling import Profiler, attach_profile
+from .result_cache import ResultCache, get_cache_key
+
+#: Parameters that set the size of each domain of the geometry
+GEOMETRIC_PARAMETERS = {
+    "Capsule radius [m]": "capsule",
+    "Pipe length [m]": "pipe",
+}
+
+
+class LTESSimulation(pybamm.Simulation):
+    """
+    Simulation of an encapsulated LTES model which is built once and solved many times.
+
+    The parameters listed in ``inputs`` are replaced by input parameters, so they can
+    be changed between solves (and batched in a single solve) without rebuilding or
+    rediscretising the model. The probes of the model (see
+    :meth:`encapsulated_ltes.BaseLTESModel.add_probe`) are added as output variables
+    of the discretised model.
+
+    Parameters
+    ----------
+    model : :class:`encapsulated_ltes.BaseLTESModel`
+        The model to simulate
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the model default parameter values)
+    inputs : list of str, optional
+        The names of the parameters to turn into input parameters. Their values in
+        ``parameter_values`` are used as defaults.
+    initial_state_input : bool, optional
+        Whether the initial state vector of the discretised model is an input too
+        (default is False). This allows solves to start from any state, for example
+        the final state of a previous solve.
+    profiler : bool or :class:`encapsulated_ltes.Profiler`, optional
+        Whether to profile the stages of the build and the solves (default is False).
+        The report of each solve can be retrieved with
+        :func:`encapsulated_ltes.get_profile`.
+    **kwargs
+        Keyword arguments passed to :class:`pybamm.Simulation`
+    """
+
+    def __init__(
+        self,
+        model,
+        parameter_values=None,
+        inputs=None,
+        initial_state_input=False,
+        profiler=None,
+        **kwargs,
+    ):
+        if parameter_values is None:
+            parameter_values = model.default_parameter_values
+        parameter_values = parameter_values.copy()
+        self.input_names = list(inputs or [])
+        self.default_inputs = {
+            name: parameter_values[name] for name in self.input_names
+        }
+        parameter_values.update({name: "[input]" for name in self.input_names})
+        self.initial_state_input = initial_state_input
+        self._initial_conditions = None
+        if profiler is True:
+            profiler = Profiler()
+        self.profiler = profiler or None
+
+        # The capsule radius and pipe length can only be inputs with symbolic meshes
+        submesh_types = kwargs.pop("submesh_types", None)
+        submesh_types = dict(submesh_types or model.default_submesh_types)
+        for name, domain in GEOMETRIC_PARAMETERS.items():
+            if name in self.input_names:
+                submesh_types[domain] = pybamm.SymbolicUniform1DSubMesh
+
+        super().__init__(
+            model,
+            parameter_values=parameter_values,
+            submesh_types=submesh_types,
+            **kwargs,
+        )
+
+    def build(self, initial_soc=None, direction=None, inputs=None):
+        """Build the model, replacing the initial conditions by an input if needed"""
+        is_built = self.built_model is not None
+        with nullcontext() if is_built else self._stage("build"):
+            super().build(initial_soc=initial_soc, direction=direction, inputs=inputs)
+        if is_built:
+            return
+
+        model = self.built_model
+        self._initial_conditions = model.concatenated_initial_conditions
+
+        # Probes are interpolated from the discretised variables
+        with self._stage("probes"):
+            probes = {}
+            for name, (variable, x, r) in getattr(self.model, "probes", {}).items():
+                W = self.get_interpolation_matrix(x, r)
+                expression = model.get_processed_variable(variable)
+                probes[name] = pybamm.Matrix(W) @ expression
+            model.update_processed_variables(probes)
+        if self.initial_state_input:
+            y0 = pybamm.InputParameter(
+                "Initial state", expected_size=self._initial_conditions.shape[0]
+            )
+            model.concatenated_initial_conditions = y0
+            # the list of input parameters is cached by the model, so it needs to be
+            # updated by hand for the solver to pick up the new input
+            model._input_parameters = [*model.input_parameters, y0]
+
+    def _stage(self, name):
+        """Context manager which profiles a stage, if the simulation is profiled"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
+
+    @property
+    def state_slices(self):
+        """Dictionary of the slices of the state vector for each model variable"""
+        self.build()
+        return {
+            var.name: slices[0] for var, slices in self.built_model.y_slices.items()
+        }
+
+    def get_variable_map(self, variable):
+        """
+        Returns the matrix ``J`` and vector ``c`` such that ``J @ y + c`` are the
+        values of ``variable`` for the state vector ``y``. The variable must depend
+        linearly on the state, as the temperatures and enthalpies do.
+        """
+        self.build()
+        expression = self.built_model.get_processed_variable(variable)
+        n_states = self._initial_conditions.shape[0]
+        y = pybamm.StateVector(slice(0, n_states))
+        zeros = np.zeros(n_states)
+        J = expression.jac(y).evaluate(y=zeros, inputs=self.get_inputs())
+        c = expression.evaluate(y=zeros, inputs=self.get_inputs())
+        return J.tocsr(), np.asarray(c, dtype=float).flatten()
+
+    def get_probe_map(self, variable, x, r=None):
+        """
+        Returns the matrix ``W`` and vector ``c`` such that ``W @ y + c`` are the
+        values of ``variable`` interpolated at the points ``(x, r)`` for the state
+        vector ``y``. ``r`` is only needed for variables in the capsule.
+        """
+        J, c = self.get_variable_map(variable)
+        W = self.get_interpolation_matrix(x, r)
+        return W @ J, W @ c
+
+    def get_interpolation_matrix(self, x, r=None):
+        """
+        Returns the matrix that interpolates a variable in the pipe (if ``r`` is None)
+        or in the capsule from the mesh nodes to the points ``(x, r)``. For symbolic
+        meshes, the nodes are scaled with the default inputs.
+        """
+        x_nodes = self.get_nodes("pipe")
+        if r is None:
+            return interpolation_matrix(x_nodes, x)
+        return interpolation_matrix_2D(self.get_nodes("capsule"), x_nodes, r, x)
+
+    def get_nodes(self, domain, inputs=None):
+        """
+        Returns the coordinates of the mesh nodes of a domain. Symbolic meshes, whose
+        nodes are scaled to [0, 1], are scaled back using the value of the inputs.
+        """
+        self.build()
+        submesh = self.mesh[domain]
+        if not hasattr(submesh, "length"):
+            return submesh.nodes
+        inputs = {**self.default_inputs, **(inputs or {})}
+        length = self.parameter_values.process_symbol(submesh.length)
+        x_min = self.parameter_values.process_symbol(submesh.min)
+        return x_min.evaluate(inputs=inputs) + submesh.nodes * length.evaluate(
+            inputs=inputs
+        )
+
+    def get_initial_state(self, inputs=None):
+        """Returns the initial state vector given by the model initial conditions"""
+        self.build()
+        inputs = {**self.default_inputs, **(inputs or {})}
+        y0 = self._initial_conditions.evaluate(inputs=inputs)
+        return np.asarray(y0, dtype=float).flatten()
+
+    def get_state_vector(self, values, inputs=None):
+        """
+        Returns the state vector with the given values of the state variables, e.g. a
+        saved or measured partial-charge state, and the initial conditions elsewhere.
+        Algebraic variables (such as the phase-change material temperature of the full
+        model) are made consistent by the solver.
+
+        Parameters
+        ----------
+        values : dict
+            The values of the state variables (see :attr:`state_slices`), as scalars
+            or arrays at the mesh nodes, with shape (r, x) for the variables in the
+            capsules
+        inputs : dict, optional
+            The values of the inputs, for the initial conditions
+        """
+        y = self.get_initial_state(inputs)
+        slices = self.state_slices
+        for name, value in values.items():
+            if name not in slices:
+                msg = f"'{name}' is not a state variable, must be one of {list(slices)}"
+                raise KeyError(msg)
+            state_slice = slices[name]
+            J, c = self.get_variable_map(name)
+            field = np.asarray(value, dtype=float).flatten(order="F")
+            field = np.broadcast_to(field, c.shape)
+            y[state_slice] = (field - c) / J[:, state_slice].diagonal()
+        return y
+
+    def get_inputs(self, inputs=None, initial_state=None):
+        """
+        Returns the full dictionary of inputs for a solve, filling in the default
+        values of the input parameters and the initial state (if it is an input).
+        """
+        inputs = {**self.default_inputs, **(inputs or {})}
+        unknown = set(inputs) - set(self.default_inputs)
+        if unknown:
+            msg = f"Parameters {sorted(unknown)} are not inputs of this simulation"
+            raise KeyError(msg)
+        if self.initial_state_input:
+            if initial_state is None:
+                initial_state = self.get_initial_state(inputs)
+            inputs["Initial state"] = np.asarray(initial_state, dtype=float).flatten()
+        elif initial_state is not None:
+            msg = "The initial state is only an input if `initial_state_input=True`"
+            raise ValueError(msg)
+        return inputs
+
+    def solve(
+        self,
+        t_eval=None,
+        inputs=None,
+        initial_state=None,
+        storage_policy=None,
+        cache=None,
+        **kwargs,
+    ):
+        """
+        Solve the model. ``inputs`` can be a dictionary or a list of dictionaries, in
+        which case all of them are solved in a single batched call to the solver, and
+        ``initial_state`` can be an array or a list of arrays (one per input). If a
+        :class:`encapsulated_ltes.StoragePolicy` is given, the solutions are returned
+        as :class:`encapsulated_ltes.CompactSolution` objects.
+
+        If ``cache`` is True or a :class:`encapsulated_ltes.ResultCache`, the result
+        is looked up in the cache (keyed by the full configuration of the solve) and
+        only solved, and then stored, if it is not found. The result is a
+        :class:`encapsulated_ltes.CompactSolution` of the given storage policy
+        (default is all the output variables in double precision). Each input of a
+        batch is cached separately, and the inputs which are not found are solved in
+        a single batched call.
+
+        The breakpoints of the model (see
+        :meth:`encapsulated_ltes.BaseLTESModel.add_breakpoints`) within the time span
+        are added to ``t_eval``, just before and at each of them, and the IDAKLU
+        solver restarts at the times of ``t_eval``.
+        """
+        if cache is True:
+            cache = ResultCache()
+        if cache:
+            return self._cached_solve(
+                cache, t_eval, inputs, initial_state, storage_policy, **kwargs
+            )
+
+        self.build()
+        t_eval = self._add_breakpoints(t_eval)
+        is_batch = isinstance(inputs, list)
+        if not is_batch:
+            inputs = self.get_inputs(inputs, initial_state)
+        else:
+            if initial_state is None or isinstance(initial_state, np.ndarray):
+                initial_state = [initial_state] * len(inputs)
+            inputs = [self.get_inputs(i, y0) for i, y0 in zip(inputs, initial_state)]
+        solutions = self._profiled_solve(t_eval=t_eval, inputs=inputs, **kwargs)
+        # a batch of one input returns a single solution
+        if not isinstance(solutions, list):
+            solutions = [solutions]
+        if storage_policy is not None:
+            with self._stage("post-processing"):
+                compact = [storage_policy.apply(solution) for solution in solutions]
+            if self.profiler is not None:
+                for solution, compact_solution in zip(solutions, compact):
+                    attach_profile(compact_solution, self.profiler.report(solution))
+            solutions = compact
+        return solutions if is_batch else solutions[0]
+
+    def _cached_solve(
+        self, cache, t_eval, inputs, initial_state, storage_policy, **kwargs
+    ):
+        """Solve with the result cache, looking up each input of a batch separately"""
+        if storage_policy is None:
+            variables = self._get_stored_variables()
+            storage_policy = StoragePolicy(variables, dtype="float64")
+        is_batch = isinstance(inputs, list)
+        batch = inputs if is_batch else [inputs]
+        if isinstance(initial_state, list):
+            initial_states = initial_state
+        else:
+            initial_states = [initial_state] * len(batch)
+        keys = [
+            get_cache_key(
+                self,
+                t_eval,
+                self._get_cache_inputs(batch_inputs, y0),
+                storage_policy,
+                **kwargs,
+            )
+            for batch_inputs, y0 in zip(batch, initial_states)
+        ]
+        solutions = [cache.get(key) for key in keys]
+        missing = [i for i, solution in enumerate(solutions) if solution is None]
+        if missing:
+            solved = self.solve(
+                t_eval,
+                [batch[i] for i in missing],
+                [initial_states[i] for i in missing],
+                storage_policy=storage_policy,
+                **kwargs,
+            )
+            for i, solution in zip(missing, solved):
+                cache.put(keys[i], solution)
+                solutions[i] = solution
+        self._solution = solutions if is_batch else solutions[0]
+        return self._solution
+
+    def _add_breakpoints(self, t_eval):
+        """Returns ``t_eval`` with the breakpoints of the model within its span"""
+        breakpoints = np.asarray(getattr(self.model, "breakpoints", []), dtype=float)
+        if t_eval is None or len(breakpoints) == 0:
+            return t_eval
+        t_eval = np.asarray(t_eval, dtype=float)
+        t_start, t_end = t_eval[0], t_eval[-1]
+        breakpoints = breakpoints[(breakpoints > t_start) & (breakpoints < t_end)]
+        if len(breakpoints) == 0:
+            return t_eval
+        before = np.maximum(np.nextafter(breakpoints, -np.inf), t_start)
+        return np.union1d(t_eval, np.concatenate([before, breakpoints]))
+
+    def _profiled_solve(self, **kwargs):
+        """
+        Solve with :meth:`pybamm.Simulation.solve`, recording the set-up of the solver
+        and the time stepping, as reported by the solver, if the simulation is
+        profiled
+        """
+        if self.profiler is None:
+            return super().solve(**kwargs)
+
+        profiler = self.profiler
+        with profiler.stage("solve"):
+            solutions = super().solve(**kwargs)
+        first = solutions[0] if isinstance(solutions, list) else solutions
+        # the set-up time includes the conversion to casadi on the first solve, and
+        # the consistent initial conditions on every solve
+        if first.set_up_time is not None:
+            profiler.add_stage("solver set-up", first.set_up_time.value)
+        if first.integration_time is not None:
+            profiler.add_stage("time stepping", first.integration_time.value)
+        profiler.record_model(self.built_model)
+        for solution in solutions if isinstance(solutions, list) else [solutions]:
+            attach_profile(solution, profiler.report(solution))
+        return solutions
+
+    def _get_cache_inputs(self, inputs, initial_state):
+        """The inputs of a solve that identify it in the result cache"""
+        inputs = {**self.default_inputs, **(inputs or {})}
+        if initial_state is not None:
+            inputs["Initial state"] = np.asarray(initial_state, dtype=float)
+        return inputs
+
+    def _get_stored_variables(self):
+        """The variables stored by default in the result cache"""
+        output_variables = getattr(self.solver, "output_variables", None)
+        if output_variables:
+            return list(output_variables)
+        coordinates = ["r [m]", "r [mm]", "x [m]", "x [mm]"]
+        names = [name for name in self.model.variables if name not in coordinates]
+        return names + list(getattr(self.model, "probes", {}))
+
+    @staticmethod
+    def get_final_state(solution):
+        """Returns the state vector at the final time of a solution"""
+        return np.asarray(solution.last_state.y, dtype=float).flatten()
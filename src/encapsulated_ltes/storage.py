@@ -0,0 +1,320 @@
+#
+# Chunked on-disk storage of solutions with lazy access to the variables
+#
+import casadi
+import numpy as np
+import pybamm
+
+from .interpolation import interpolation_matrix, interpolation_matrix_2D
+
+
+def _import_h5py():
+    return pybamm.util.import_optional_dependency("h5py")
+
+
+class SolutionWriter:
+    """
+    Writes the state of a solution to a chunked, compressed HDF5 file, which can be
+    read back with :class:`StoredSolution` without rebuilding the model. The variables
+    are stored as serialised CasADi functions of the time and the state, together
+    with the mesh nodes, so only the state snapshots take space on disk.
+
+    Snapshots can be appended as they become available (e.g. after each chunk of a
+    solve, see :func:`solve_to_file`), so the whole solution need not be in memory.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the file
+    simulation : :class:`pybamm.Simulation`
+        The (built) simulation, e.g. an :class:`encapsulated_ltes.LTESSimulation`
+    variables : list of str, optional
+        The variables that can be read from the file (default is all the output
+        variables of the model)
+    inputs : dict, optional
+        The values of the input parameters of the simulation
+    chunk_size : int, optional
+        The number of snapshots per chunk of the file (default is 64)
+    compression : int, optional
+        The gzip compression level (default is 4)
+    """
+
+    def __init__(
+        self, path, simulation, variables=None, inputs=None, chunk_size=64, compression=4
+    ):
+        h5py = _import_h5py()
+        simulation.build()
+        model = simulation.built_model
+        if variables is None:
+            variables = [
+                name
+                for name in model.variables
+                if name not in ["r [m]", "r [mm]", "x [m]", "x [mm]"]
+            ]
+        inputs = {**getattr(simulation, "default_inputs", {}), **(inputs or {})}
+        if getattr(simulation, "initial_state_input", False):
+            inputs = simulation.get_inputs(inputs)
+
+        self.file = h5py.File(path, "w")
+        n_states = model.concatenated_initial_conditions.shape[0]
+        chunk_size = int(chunk_size)
+        self.file.create_dataset("t", shape=(0,), maxshape=(None,), dtype=float)
+        self.file.create_dataset(
+            "y",
+            shape=(n_states, 0),
+            maxshape=(n_states, None),
+            chunks=(n_states, chunk_size),
+            compression="gzip",
+            compression_opts=compression,
+            shuffle=True,
+            dtype=float,
+        )
+
+        # Mesh nodes, scaled with the inputs for symbolic meshes
+        mesh = self.file.create_group("mesh")
+        for domain in ["capsule", "pipe"]:
+            if hasattr(simulation, "get_nodes"):
+                nodes = simulation.get_nodes(domain, inputs)
+            else:
+                nodes = simulation.mesh[domain].nodes
+            mesh[domain] = np.asarray(nodes, dtype=float).flatten()
+
+        # Variables as functions of (t, y)
+        t = casadi.MX.sym("t")
+        y = casadi.MX.sym("y", n_states)
+        casadi_inputs = {
+            name: casadi.DM(np.asarray(value, dtype=float).flatten())
+            for name, value in inputs.items()
+        }
+        group = self.file.create_group("variables")
+        for name in variables:
+            expression = model.get_processed_variable(name)
+            function = casadi.Function(
+                "variable", [t, y], [expression.to_casadi(t, y, inputs=casadi_inputs)]
+            )
+            dataset = group.create_dataset(
+                name.replace("/", "|"), data=np.void(function.serialize().encode())
+            )
+            dataset.attrs["name"] = name
+            dataset.attrs["domain"] = ",".join(_get_domains(expression))
+
+    def append(self, t, y):
+        """
+        Append snapshots of the state ``y`` (of shape ``(n_states, len(t))``) at the
+        times ``t``. Snapshots at times already stored are skipped.
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        y = np.asarray(y, dtype=float).reshape(-1, len(t))
+        t_stored = self.file["t"]
+        if t_stored.shape[0] > 0:
+            new = t > t_stored[-1]
+            t, y = t[new], y[:, new]
+        n_old = t_stored.shape[0]
+        n_new = n_old + len(t)
+        t_stored.resize((n_new,))
+        t_stored[n_old:] = t
+        self.file["y"].resize((self.file["y"].shape[0], n_new))
+        self.file["y"][:, n_old:] = y
+
+    def write(self, solution):
+        """Append the snapshots of a solution"""
+        self.append(solution.t, solution.y)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _get_domains(expression):
+    """Returns the primary and secondary domains of a variable"""
+    domains = []
+    for level in ["primary", "secondary"]:
+        domains.extend(expression.domains[level])
+    return domains
+
+
+def write_solution(path, simulation, solution=None, variables=None, **kwargs):
+    """
+    Write a solution (default is the last solution of the simulation) to a HDF5 file,
+    see :class:`SolutionWriter`.
+    """
+    solution = solution or simulation.solution
+    inputs = kwargs.pop("inputs", solution.all_inputs[0])
+    inputs = {name: value for name, value in inputs.items() if name != "Initial state"}
+    with SolutionWriter(path, simulation, variables, inputs, **kwargs) as writer:
+        writer.write(solution)
+
+
+def solve_to_file(simulation, path, t_eval, t_interp, inputs=None, n_chunks=10, **kwargs):
+    """
+    Solve a simulation in chunks, streaming the state at the times ``t_interp`` to a
+    HDF5 file, so at most one chunk of the solution is in memory.
+
+    Parameters
+    ----------
+    simulation : :class:`encapsulated_ltes.LTESSimulation`
+        The simulation, with ``initial_state_input=True`` if ``n_chunks > 1``
+    path : str or Path
+        The path of the file
+    t_eval : array-like
+        The start and end times of the simulation, in seconds
+    t_interp : array-like
+        The times at which to store the state
+    inputs : dict, optional
+        The values of the inputs of the simulation
+    n_chunks : int, optional
+        The number of chunks (default is 10)
+    **kwargs
+        Keyword arguments passed to :class:`SolutionWriter`
+
+    Returns
+    -------
+    :class:`StoredSolution`
+        The stored solution
+    """
+    if n_chunks > 1 and not simulation.initial_state_input:
+        msg = "Solving in chunks needs a simulation with `initial_state_input=True`"
+        raise ValueError(msg)
+    t_interp = np.asarray(t_interp, dtype=float)
+    bounds = np.linspace(0, len(t_interp) - 1, n_chunks + 1).round().astype(int)
+    initial_state = None
+    with SolutionWriter(path, simulation, inputs=inputs, **kwargs) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            t_chunk = t_interp[start : end + 1]
+            solution = simulation.solve(
+                [t_chunk[0], t_chunk[-1]],
+                inputs=inputs,
+                initial_state=initial_state,
+                t_interp=t_chunk,
+            )
+            writer.write(solution)
+            if n_chunks > 1:
+                initial_state = simulation.get_final_state(solution)
+            del solution
+    return StoredSolution(path)
+
+
+class StoredSolution:
+    """
+    Solution stored in a HDF5 file by :class:`SolutionWriter`. Variables are
+    evaluated lazily, only reading the snapshots they need, with the same interface as
+    the variables of a :class:`pybamm.Solution`, e.g. ``stored[name](t=t, x=x)``.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the file
+    """
+
+    def __init__(self, path):
+        h5py = _import_h5py()
+        self.file = h5py.File(path, "r")
+        self.t = self.file["t"][:]
+        self.y = self.file["y"]
+        self.nodes = {
+            domain: self.file["mesh"][domain][:] for domain in ["capsule", "pipe"]
+        }
+        self._variables = {}
+
+    @property
+    def variable_names(self):
+        return [
+            dataset.attrs["name"] for dataset in self.file["variables"].values()
+        ]
+
+    def __getitem__(self, name):
+        if name not in self._variables:
+            dataset = self.file["variables"][name.replace("/", "|")]
+            function = casadi.Function.deserialize(dataset[()].tobytes().decode())
+            domain = dataset.attrs["domain"]
+            domain = domain.split(",") if domain else []
+            self._variables[name] = StoredVariable(self, function, domain)
+        return self._variables[name]
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StoredVariable:
+    """
+    Variable of a :class:`StoredSolution`, evaluated from the stored snapshots of the
+    state when accessed.
+    """
+
+    def __init__(self, solution, function, domain):
+        self.solution = solution
+        self.function = function
+        self.domain = domain
+        self.shape = tuple(len(solution.nodes[d]) for d in domain)
+
+    def _evaluate(self, indices):
+        """Values at the snapshots ``indices`` (increasing), as (nodes, times)"""
+        if len(indices) == 0:
+            return np.zeros((int(np.prod(self.shape)), 0))
+        t = self.solution.t[indices]
+        y = self.solution.y[:, indices]
+        values = self.function.map(len(indices))(t, y)
+        return np.asarray(values, dtype=float).reshape(-1, len(indices))
+
+    @property
+    def entries(self):
+        """The values at all the stored times, with the same shape as in pybamm"""
+        chunk = self.solution.y.chunks[1] if self.solution.y.chunks else 64
+        n_t = len(self.solution.t)
+        values = np.hstack(
+            [
+                self._evaluate(np.arange(start, min(start + chunk, n_t)))
+                for start in range(0, n_t, chunk)
+            ]
+        )
+        if not self.shape:
+            return values[0]
+        return values.reshape(*self.shape, n_t, order="F")
+
+    def __call__(self, t=None, x=None, r=None):
+        """
+        Evaluate the variable at the times ``t`` (default is the stored times) and,
+        for variables in the pipe and the capsule, the positions ``x`` and ``r``
+        (default is all the mesh nodes), interpolating linearly.
+        """
+        t_stored = self.solution.t
+        if t is None:
+            t = t_stored
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+
+        # Read only the snapshots on either side of the requested times
+        index = np.clip(np.searchsorted(t_stored, t) - 1, 0, max(len(t_stored) - 2, 0))
+        index = np.column_stack([index, np.minimum(index + 1, len(t_stored) - 1)])
+        indices, inverse = np.unique(index, return_inverse=True)
+        values = self._evaluate(indices)
+        inverse = inverse.reshape(index.shape)
+        t_0, t_1 = t_stored[index[:, 0]], t_stored[index[:, 1]]
+        weight = np.divide(t - t_0, t_1 - t_0, out=np.zeros_like(t), where=t_1 > t_0)
+        values = values[:, inverse[:, 0]] * (1 - weight) + values[:, inverse[:, 1]] * weight
+
+        nodes = self.solution.nodes
+        if self.domain == ["pipe"] and x is not None:
+            values = interpolation_matrix(nodes["pipe"], x) @ values
+        elif self.domain == ["capsule"] and r is not None:
+            values = interpolation_matrix(nodes["capsule"], r) @ values
+        elif self.domain == ["capsule", "pipe"]:
+            if x is not None and r is not None:
+                W = interpolation_matrix_2D(nodes["capsule"], nodes["pipe"], r, x)
+                values = W @ values
+            elif x is not None or r is not None:
+                msg = "Both x and r are needed for variables in the capsule and pipe"
+                raise ValueError(msg)
+            else:
+                values = values.reshape(*self.shape, len(t), order="F")
+        return np.squeeze(values)
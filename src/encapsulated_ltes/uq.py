@@ -0,0 +1,392 @@
+#
+# Uncertainty quantification by quasi-random sampling of uncertain parameters, with
+# streaming statistics and Sobol indices of the output time series
+#
+import numpy as np
+import pybamm
+from scipy.stats import qmc
+
+from .models import FullModel
+from .simulation import LTESSimulation
+
+#: Time series whose statistics are accumulated by default
+UQ_VARIABLES = ["Outlet temperature [K]", "X-averaged state of charge"]
+
+#: Quantiles of the default bands (median and 90% band)
+QUANTILES = [0.05, 0.5, 0.95]
+
+
+def sample(distributions, n_samples, method="sobol", seed=None):
+    """
+    Draws samples of the parameters from their distributions.
+
+    Parameters
+    ----------
+    distributions : dict
+        The distribution of each parameter, as a frozen :mod:`scipy.stats`
+        distribution (e.g. ``scipy.stats.norm(100, 10)``)
+    n_samples : int
+        The number of samples, which must be a power of 2 for Sobol sequences, as
+        they are only balanced for those
+    method : str, optional
+        The sampling method, "sobol" (scrambled Sobol sequence, the default), "lhs"
+        (Latin hypercube) or "random" (Monte Carlo)
+    seed : int, optional
+        The seed of the random number generator
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        The samples, with shape (n_samples, number of parameters) and the parameters
+        in the order of ``distributions``
+    """
+    d = len(distributions)
+    if method == "sobol":
+        if n_samples < 1 or n_samples & (n_samples - 1):
+            msg = (
+                "The number of samples of a Sobol sequence must be a power of 2, "
+                f"not {n_samples}"
+            )
+            raise ValueError(msg)
+        u = qmc.Sobol(d, seed=seed).random(n_samples)
+    elif method == "lhs":
+        u = qmc.LatinHypercube(d, seed=seed).random(n_samples)
+    elif method == "random":
+        u = np.random.default_rng(seed).random((n_samples, d))
+    else:
+        msg = f"Sampling method must be 'sobol', 'lhs' or 'random', not '{method}'"
+        raise ValueError(msg)
+    return np.column_stack(
+        [dist.ppf(u[:, i]) for i, dist in enumerate(distributions.values())]
+    )
+
+
+class StreamingStatistics:
+    """
+    Mean, variance and quantiles of a time series over samples which arrive in
+    batches, without storing the samples. The mean and variance are merged batch by
+    batch (Chan et al.), and each quantile is tracked at each time with the P²
+    algorithm (Jain and Chlamtac, 1985), which keeps five markers per quantile.
+
+    Parameters
+    ----------
+    quantiles : list of float, optional
+        The quantiles to track (default is 0.05, 0.5 and 0.95)
+    """
+
+    def __init__(self, quantiles=None):
+        self.quantile_levels = list(QUANTILES if quantiles is None else quantiles)
+        self.count = 0
+        self.mean = None
+        self._m2 = None
+        self._first = []
+        self._markers = None
+
+    def update(self, values):
+        """Update the statistics with a batch of samples, of shape (batch, n_t)"""
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        n = values.shape[0]
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        if self.count == 0:
+            self.mean, self._m2 = mean, m2
+        else:
+            delta = mean - self.mean
+            total = self.count + n
+            self.mean = self.mean + delta * n / total
+            self._m2 = self._m2 + m2 + delta**2 * self.count * n / total
+        self.count += n
+
+        for row in values:
+            if self._markers is None:
+                self._first.append(row)
+                if len(self._first) == 5:
+                    self._initialise_markers()
+            else:
+                for markers in self._markers:
+                    markers.update(row)
+
+    def _initialise_markers(self):
+        first = np.sort(np.array(self._first), axis=0)
+        self._markers = [_P2Quantile(p, first) for p in self.quantile_levels]
+        self._first = []
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else np.sqrt(variance)
+
+    @property
+    def quantiles(self):
+        """The estimated quantiles, as ``{level: array}``"""
+        if self._markers is None:
+            # fewer than five samples so far
+            first = np.array(self._first)
+            return {p: np.quantile(first, p, axis=0) for p in self.quantile_levels}
+        return {
+            p: markers.heights[2].copy()
+            for p, markers in zip(self.quantile_levels, self._markers)
+        }
+
+
+class StreamingSobolIndices:
+    """
+    First-order and total Sobol indices of a time series, accumulated from batches
+    of the Saltelli design without storing the samples. For base samples ``A`` and
+    ``B`` of the parameters, and ``AB_i`` equal to ``A`` with the i-th parameter taken
+    from ``B``, the first-order indices are estimated as
+    ``mean(f(B) (f(AB_i) - f(A))) / Var(f)`` (Saltelli et al., 2010) and the total
+    indices as ``mean((f(A) - f(AB_i))^2) / 2 / Var(f)`` (Jansen, 1999), with the
+    variance of ``f`` over the samples ``A`` and ``B``.
+
+    Parameters
+    ----------
+    n_parameters : int
+        The number of parameters
+    """
+
+    def __init__(self, n_parameters):
+        self.n_parameters = n_parameters
+        self.count = 0
+        self.statistics = StreamingStatistics(quantiles=[])
+        self._first_order = 0
+        self._total = 0
+
+    def update(self, f_A, f_B, f_AB):
+        """
+        Update the indices with a batch of the Saltelli design, with ``f_A`` and
+        ``f_B`` of shape (batch, n_t) and ``f_AB`` of shape (n_parameters, batch, n_t)
+        """
+        f_A, f_B, f_AB = (np.asarray(f, dtype=float) for f in (f_A, f_B, f_AB))
+        self.count += f_A.shape[0]
+        self.statistics.update(np.concatenate([f_A, f_B]))
+        self._first_order = self._first_order + np.sum(f_B * (f_AB - f_A), axis=1)
+        self._total = self._total + np.sum((f_A - f_AB) ** 2, axis=1)
+
+    def _normalise(self, value):
+        variance = self.statistics.variance
+        out = np.full(np.shape(value), np.nan)
+        return np.divide(value / self.count, variance, out=out, where=variance > 0)
+
+    @property
+    def first_order(self):
+        """The first-order indices, with shape (n_parameters, n_t)"""
+        return self._normalise(self._first_order)
+
+    @property
+    def total(self):
+        """The total indices, with shape (n_parameters, n_t)"""
+        return self._normalise(self._total / 2)
+
+
+class _P2Quantile:
+    """P² estimate of a quantile, vectorised over the times of a series"""
+
+    def __init__(self, p, first):
+        self.heights = first.copy()
+        n_t = first.shape[1]
+        self.positions = np.tile(np.arange(5.0)[:, None], (1, n_t))
+        self.desired = np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4])
+        self.increments = np.array([0, p / 2, p, (1 + p) / 2, 1])
+
+    def update(self, x):
+        q, n = self.heights, self.positions
+        columns = np.arange(q.shape[1])
+        # extend the extreme markers and find the cell of each observation
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        k = np.clip(np.sum(x[None, :] >= q[1:4], axis=0), 0, 3)
+        n += np.arange(5)[:, None] > k[None, :]
+        self.desired = self.desired + self.increments
+
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | (
+                (d <= -1) & (n[i - 1] - n[i] < -1)
+            )
+            if not move.any():
+                continue
+            # the markers which do not move take a dummy step, so that the positions
+            # of the neighbours differ
+            s = np.where(move, np.sign(d), 1)
+            parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            neighbour = (i + s).astype(int)
+            linear = q[i] + s * (q[neighbour, columns] - q[i]) / (
+                n[neighbour, columns] - n[i]
+            )
+            inside = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(inside, parabolic, linear), q[i])
+            n[i] = np.where(move, n[i] + s, n[i])
+
+
+class UncertaintyStudy:
+    """
+    Propagates the uncertainty of some parameters to the time series of scalar
+    variables, e.g. the outlet temperature and the state of charge. The parameters
+    are inputs of a single simulation, so the model is built and compiled once, and
+    the samples are solved in batches by the IDAKLU solver, which can solve a batch in
+    parallel. Only streaming statistics of the outputs are kept, so the memory does
+    not grow with the number of samples.
+
+    Parameters
+    ----------
+    distributions : dict
+        The distribution of each uncertain parameter, as a frozen :mod:`scipy.stats`
+        distribution
+    model : :class:`encapsulated_ltes.BaseLTESModel`, optional
+        The model. Its output variables must include ``variables`` (default is the
+        full model with the "0D KPIs only" output variables option).
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameter values (default is the model default parameter values)
+    variables : list of str, optional
+        The scalar variables whose statistics are accumulated (default is the outlet
+        temperature and the X-averaged state of charge)
+    quantiles : list of float, optional
+        The quantiles of the bands (default is 0.05, 0.5 and 0.95)
+    n_threads : int, optional
+        The number of threads, and of parallel solvers, of the IDAKLU solver (default
+        is 1). It should match the cores of the node for large studies.
+    solver_options : dict, optional
+        Other options of :class:`pybamm.IDAKLUSolver`
+    **kwargs
+        Keyword arguments passed to :class:`encapsulated_ltes.LTESSimulation`, e.g.
+        ``var_pts``
+    """
+
+    def __init__(
+        self,
+        distributions,
+        model=None,
+        parameter_values=None,
+        variables=None,
+        quantiles=None,
+        n_threads=1,
+        solver_options=None,
+        **kwargs,
+    ):
+        self.distributions = dict(distributions)
+        self.variables = list(variables or UQ_VARIABLES)
+        self.quantile_levels = quantiles
+        if model is None:
+            model = FullModel(options={"output variables": "0D KPIs only"})
+        solver_options = dict(solver_options or {})
+        options = {"num_threads": n_threads, "num_solvers": n_threads}
+        options.update(solver_options.pop("options", {}))
+        solver = pybamm.IDAKLUSolver(
+            output_variables=self.variables, options=options, **solver_options
+        )
+        self.simulation = LTESSimulation(
+            model,
+            parameter_values=parameter_values,
+            inputs=list(self.distributions),
+            solver=solver,
+            **kwargs,
+        )
+        self.statistics = None
+        self.sobol_indices = None
+        self.t_interp = None
+
+    def evaluate(self, samples, t_eval, t_interp):
+        """
+        Solve the simulation for a batch of samples, with shape (batch, number of
+        parameters), and return the variables as ``{name: array}`` of shape
+        (batch, n_t)
+        """
+        inputs = [dict(zip(self.distributions, row)) for row in samples]
+        solutions = self.simulation.solve(t_eval, inputs=inputs, t_interp=t_interp)
+        if not isinstance(solutions, list):
+            solutions = [solutions]
+        return {
+            name: np.array([solution[name].entries for solution in solutions])
+            for name in self.variables
+        }
+
+    def run(
+        self,
+        n_samples,
+        t_eval,
+        t_interp=None,
+        method="sobol",
+        sobol_indices=False,
+        batch_size=64,
+        seed=None,
+    ):
+        """
+        Run the study.
+
+        Parameters
+        ----------
+        n_samples : int
+            The number of samples, a power of 2 for the "sobol" method. With
+            ``sobol_indices``, it is the number of base samples and the model is
+            solved ``n_samples * (number of parameters + 2)`` times.
+        t_eval : array-like
+            The start and end times of the simulation, in seconds
+        t_interp : array-like, optional
+            The times of the time series (default is 101 equally spaced times)
+        method : str, optional
+            The sampling method, "sobol" (default), "lhs" or "random" (see
+            :func:`sample`)
+        sobol_indices : bool, optional
+            Whether to estimate the Sobol indices with the Saltelli design (default is
+            False)
+        batch_size : int, optional
+            The number of samples solved together (default is 64)
+        seed : int, optional
+            The seed of the random number generator
+
+        Returns
+        -------
+        dict
+            The statistics of each variable, as :class:`StreamingStatistics`, also
+            stored in :attr:`statistics`. The Sobol indices are stored in
+            :attr:`sobol_indices`, as :class:`StreamingSobolIndices`.
+        """
+        if t_interp is None:
+            t_interp = np.linspace(t_eval[0], t_eval[-1], 101)
+        self.t_interp = np.asarray(t_interp, dtype=float)
+        d = len(self.distributions)
+        self.statistics = {
+            name: StreamingStatistics(self.quantile_levels) for name in self.variables
+        }
+        self.sobol_indices = None
+
+        if not sobol_indices:
+            samples = sample(self.distributions, n_samples, method, seed)
+            for start in range(0, n_samples, batch_size):
+                batch = samples[start : start + batch_size]
+                values = self.evaluate(batch, t_eval, self.t_interp)
+                for name in self.variables:
+                    self.statistics[name].update(values[name])
+            return self.statistics
+
+        # Saltelli design: A and B are the two halves of a sample in 2d dimensions
+        design = {f"{name} (B)": dist for name, dist in self.distributions.items()}
+        samples = sample({**self.distributions, **design}, n_samples, method, seed)
+        self.sobol_indices = {name: StreamingSobolIndices(d) for name in self.variables}
+        base_size = max(batch_size // (d + 2), 1)
+        for start in range(0, n_samples, base_size):
+            A = samples[start : start + base_size, :d]
+            B = samples[start : start + base_size, d:]
+            AB = np.tile(A, (d, 1, 1))
+            for i in range(d):
+                AB[i, :, i] = B[:, i]
+            n = len(A)
+            values = self.evaluate(
+                np.concatenate([A, B, AB.reshape(-1, d)]), t_eval, self.t_interp
+            )
+            for name in self.variables:
+                f = values[name]
+                self.statistics[name].update(f[: 2 * n])
+                f_AB = f[2 * n :].reshape(d, n, -1)
+                self.sobol_indices[name].update(f[:n], f[n : 2 * n], f_AB)
+        return self.statistics
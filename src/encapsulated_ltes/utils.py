@@ -1,21 +1,36 @@
 #
 # Auxiliary functions for the project
 #
+import os
 from pathlib import Path
 
-import matplotlib as mpl
-import scienceplots  # noqa: F401
-
 
 def root_dir():
     return Path(__file__).resolve().parents[2]
 
 
+def cache_dir():
+    """
+    Directory for cached files, set by the ``ENCAPSULATED_LTES_CACHE`` environment
+    variable (default is ``~/.cache/encapsulated_ltes``)
+    """
+    path = os.environ.get("ENCAPSULATED_LTES_CACHE")
+    if path is None:
+        path = Path.home() / ".cache" / "encapsulated_ltes"
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def get_interface_position(solution):
     pass
 
 
 def set_plotting_format(mode="presentation"):
+    # The plotting stack is only imported when needed, as it is slow to import
+    import matplotlib as mpl
+    import scienceplots  # noqa: F401
+
     mpl.style.use(["science", "vibrant"])
 
     if mode == "presentation":
@@ -0,0 +1,56 @@
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+
+
+def test_calibration_recovers_parameters():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    h = "Heat transfer coefficient [W.m-2.K-1]"
+
+    # Synthetic measurements with a known heat transfer coefficient
+    true_param = param.copy()
+    true_param[h] = 300
+    model = ltes.ReducedModel(options={"closures": "smooth"})
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 6000, 31)
+    solution = pybamm.Simulation(
+        model, parameter_values=true_param, var_pts=var_pts
+    ).solve([0, 6000], t_interp=t)
+    sensors = [
+        {
+            "variable": "Heat transfer fluid temperature [degC]",
+            "x": x,
+            "r": None,
+            "t": t,
+            "values": solution["Heat transfer fluid temperature [degC]"](t=t, x=x),
+        }
+        for x in [0.5 * L, L]
+    ] + [
+        {
+            "variable": "Phase-change material temperature [degC]",
+            "x": 0.5 * L,
+            "r": 0.8 * R,
+            "t": t,
+            "values": solution["Phase-change material temperature [degC]"](
+                t=t, x=0.5 * L, r=0.8 * R
+            ),
+        }
+    ]
+
+    for use_sensitivities in [True, False]:
+        calibration = ltes.Calibration(
+            model,
+            [h],
+            sensors,
+            parameter_values=param,
+            var_pts=var_pts,
+            use_sensitivities=use_sensitivities,
+            solver=pybamm.IDAKLUSolver(rtol=1e-8, atol=1e-8),
+        )
+        result = calibration.fit()
+        assert result["success"]
+        assert result["RMSE"] < result["initial RMSE"]
+        np.testing.assert_allclose(result["parameters"][h], 300, rtol=1e-2)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def test_checkpoint_and_resume(tmp_path, monkeypatch):
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, initial_state_input=True)
+    t = np.linspace(0, 10000, 101)
+    results = ltes.solve_with_checkpoints(sim, tmp_path, [0, 10000], 2500, t_interp=t)
+    np.testing.assert_array_equal(results["Time [s]"], t)
+
+    # Interrupt the run after two segments
+    solve = sim.solve
+    calls = []
+
+    def failing_solve(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 2:
+            raise MemoryError
+        return solve(*args, **kwargs)
+
+    monkeypatch.setattr(sim, "solve", failing_solve)
+    with pytest.raises(MemoryError):
+        ltes.solve_with_checkpoints(sim, tmp_path, [0, 10000], 2500, t_interp=t)
+    checkpoint = ltes.Checkpoint.load(tmp_path / "checkpoint.npz")
+    assert checkpoint.t == 5000
+    assert checkpoint.segment == 2
+
+    # Resume with a new simulation of the same configuration
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, initial_state_input=True)
+    resumed = ltes.resume(tmp_path, sim)
+    for name, values in results.items():
+        np.testing.assert_array_equal(resumed[name], values)
+
+    other = ltes.LTESSimulation(
+        model, var_pts={**var_pts, model.variables["x [m]"]: 10}, initial_state_input=True
+    )
+    with pytest.raises(ValueError, match="does not match"):
+        ltes.resume(tmp_path, other)
+
+
+def test_start_from_partial_charge_state():
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, initial_state_input=True)
+    solution = sim.solve([0, 3000], t_interp=[0, 3000])
+    y = sim.get_final_state(solution)
+    checkpoint = ltes.Checkpoint.from_simulation(sim, 3000, y)
+
+    # Only the differential states are needed
+    states = {
+        name: value
+        for name, value in checkpoint.states.items()
+        if "material temperature" not in name
+    }
+    y0 = sim.get_state_vector(states)
+    restarted = sim.solve([3000, 3001], initial_state=y0, t_interp=[3000, 3001])
+    np.testing.assert_allclose(
+        restarted["X-averaged state of charge"].entries[0],
+        solution["X-averaged state of charge"].entries[-1],
+    )
+
+    with pytest.raises(KeyError, match="not a state variable"):
+        sim.get_state_vector({"Phase": 1})
+
+
+def test_checkpoint_array_inputs(tmp_path):
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    name = "Heat transfer coefficient [W.m-2.K-1]"
+    sim = ltes.LTESSimulation(
+        model, var_pts=var_pts, inputs=[name], initial_state_input=True
+    )
+    inputs = {name: np.array([500.0])}
+    results = ltes.solve_with_checkpoints(sim, tmp_path, [0, 4000], 2000, inputs=inputs)
+    checkpoint = ltes.Checkpoint.load(tmp_path / "checkpoint.npz")
+    assert checkpoint.metadata["inputs"] == {name: [500.0]}
+
+    sim = ltes.LTESSimulation(
+        model, var_pts=var_pts, inputs=[name], initial_state_input=True
+    )
+    resumed = ltes.resume(tmp_path, sim)
+    for key, values in results.items():
+        np.testing.assert_array_equal(resumed[key], values)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.compact import _interpolation_error, _select_times
+
+
+def test_storage_policy(tmp_path):
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts)
+    t = np.linspace(0, 10000, 201)
+    solution = sim.solve([0, 10000], t_interp=t)
+    compact = sim.solve([0, 10000], t_interp=t, storage_policy=ltes.StoragePolicy())
+
+    for name, options in ltes.compact.DEFAULT_STORAGE_POLICY.items():
+        error = compact.report[name]["max absolute error"]
+        if "tolerance" in options:
+            # float32 rounding on top of the decimation error
+            assert error <= options["tolerance"] * 1.01
+        entries = compact.get_entries(name)
+        assert entries.shape == solution[name].entries.shape
+        np.testing.assert_allclose(
+            np.max(np.abs(entries - solution[name].entries)), error, rtol=1e-6
+        )
+    assert compact.report["Phase"]["max absolute error"] == 0
+    original = sum(report["original bytes"] for report in compact.report.values())
+    assert compact.nbytes < original / 4
+
+    compact.save(tmp_path / "solution.npz")
+    loaded = ltes.CompactSolution.load(tmp_path / "solution.npz")
+    name = "Phase-change material temperature [K]"
+    np.testing.assert_array_equal(loaded.get_entries(name), compact.get_entries(name))
+
+    # Spatial subsampling and decimation
+    policy = ltes.StoragePolicy([name], subsample=2, decimation=10)
+    compact = policy.apply(solution)
+    assert compact[name].entries.shape == (6, 11, 21)
+
+    with pytest.raises(ValueError, match="Unknown storage options"):
+        ltes.StoragePolicy(precision=3)
+
+
+def test_select_times():
+    # a thermocline moving along the pipe, on a fine grid of times
+    t = np.linspace(0, 10000, 1000)
+    x = np.linspace(0, 1, 800)[:, None]
+    field = 305 + 38 / (1 + np.exp(-20 * (1.5e-4 * t - x)))
+    for tolerance in [0.1, 10]:
+        times = _select_times(field, t, tolerance)
+        assert times[0] == 0
+        assert times[-1] == len(t) - 1
+        for start, end in zip(times[:-1], times[1:]):
+            assert _interpolation_error(field, t, start, end) <= tolerance
+    # a linear field only needs its end points
+    np.testing.assert_array_equal(_select_times(np.outer(x, t), t, 1e-6), [0, 999])
@@ -0,0 +1,61 @@
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.data import _datasets, load_dataset
+
+
+def test_load_dataset_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("ENCAPSULATED_LTES_CACHE", str(tmp_path))
+    _datasets.clear()
+    dataset = load_dataset("Nallusamy2007")
+    assert (tmp_path / "Nallusamy2007.npz").exists()
+    # loaded once per session
+    assert load_dataset("Nallusamy2007") is dataset
+
+    # the binary cache gives the same arrays as the CSV files
+    _datasets.clear()
+    cached = load_dataset("Nallusamy2007")
+    for family in ["HTF", "PCM"]:
+        np.testing.assert_array_equal(cached.positions[family], [0.25, 0.5, 0.75, 1])
+        np.testing.assert_array_equal(cached.time[family], dataset.time[family])
+        data = np.loadtxt(
+            ltes.root_dir() / "data" / f"Nallusamy2007_{family}_0.5L.csv",
+            delimiter=",",
+            skiprows=1,
+        )
+        time, values = cached.get_series(family, 1)
+        np.testing.assert_array_equal(time, data[:, 0] * 60)
+        np.testing.assert_array_equal(values, data[:, 1])
+
+
+def test_sensor_matrix(monkeypatch, tmp_path):
+    monkeypatch.setenv("ENCAPSULATED_LTES_CACHE", str(tmp_path))
+    dataset = load_dataset("Nallusamy2007")
+    param = ltes.get_parameter_values("Nallusamy2007")
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = pybamm.Simulation(model, parameter_values=param, var_pts=var_pts)
+    t = np.linspace(0, 6000, 61)
+    solution = sim.solve([0, 6000], t_interp=t)
+    x_nodes = sim.mesh["pipe"].nodes
+    r_nodes = sim.mesh["capsule"].nodes
+
+    for family, name, r_nodes_family in [
+        ("HTF", "Heat transfer fluid temperature [degC]", None),
+        ("PCM", "Phase-change material temperature [degC]", r_nodes),
+    ]:
+        S = dataset.get_sensor_matrix(family, t, x_nodes, r_nodes_family, L=L, R=R)
+        values = S @ solution[name].entries.flatten(order="F")
+        assert values.shape == dataset.get_measurements(family).shape
+
+        time, _ = dataset.get_series(family, 1)
+        time = time[time <= 6000]
+        kwargs = {"x": 0.5 * L} if family == "HTF" else {"x": 0.5 * L, "r": 0.8 * R}
+        expected = solution[name](t=time, **kwargs).flatten()
+        offset = np.sum(~np.isnan(dataset.time[family][0]))
+        np.testing.assert_allclose(
+            values[offset : offset + len(time)], expected, rtol=1e-3
+        )
@@ -0,0 +1,45 @@
+import numpy as np
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.estimation import EnsembleKalmanFilter
+
+
+def test_ensemble_kalman_filter():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    sensors = [
+        ("Heat transfer fluid temperature [K]", 0.5 * L),
+        ("Heat transfer fluid temperature [K]", L),
+        ("Phase-change material temperature [K]", 0.5 * L, 0.8 * R),
+    ]
+    times = np.linspace(0, 2000, 11)
+
+    # Synthetic measurements from a bed with a better heat transfer
+    truth_param = param.copy()
+    truth_param["Heat transfer coefficient [W.m-2.K-1]"] = 1000
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+    truth = ltes.LTESSimulation(model, parameter_values=truth_param, var_pts=var_pts)
+    W = np.vstack([truth.get_probe_map(*sensor)[0].toarray() for sensor in sensors])
+    c = np.concatenate([truth.get_probe_map(*sensor)[1] for sensor in sensors])
+    solution = truth.solve([0, 2000], t_interp=times)
+    measurements = (W @ solution.y + c[:, None]).T
+
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+    enkf = EnsembleKalmanFilter(
+        model, sensors, parameter_values=param, var_pts=var_pts, seed=0
+    )
+    open_loop = ltes.LTESSimulation(model, parameter_values=param, var_pts=var_pts)
+    open_loop_solution = open_loop.solve([0, 2000], t_interp=times)
+    open_loop_measurements = (W @ open_loop_solution.y + c[:, None]).T
+
+    for t, measurement in zip(times[1:], measurements[1:]):
+        soc, soc_std = enkf.step(t, measurement)
+        assert 0 <= soc <= 1
+        assert soc_std >= 0
+
+    error = np.abs(enkf.measurements - measurements[-1]).max()
+    open_loop_error = np.abs(open_loop_measurements[-1] - measurements[-1]).max()
+    assert error < open_loop_error
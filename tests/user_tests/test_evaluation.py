@@ -0,0 +1,79 @@
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+
+
+def test_evaluate_matches_processed_variables():
+    model = ltes.FullModel()
+    param = model.default_parameter_values
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    solution = pybamm.Simulation(model, var_pts=var_pts).solve(
+        [0, 6000], t_interp=np.linspace(0, 6000, 101)
+    )
+    t = np.linspace(0, 6000, 37)
+    x = np.linspace(0.05, 0.95, 7) * L
+    r = np.linspace(0.1, 0.9, 5) * R
+
+    names = [
+        "Phase-change material temperature [K]",
+        "Heat transfer fluid temperature [K]",
+        "X-averaged phase-change material temperature [K]",
+        "X-averaged state of charge",
+    ]
+    values = ltes.evaluate(solution, names, t=t, x=x, r=r)
+    coordinates = [{"x": x, "r": r}, {"x": x}, {"r": r}, {}]
+    for name, kwargs in zip(names, coordinates):
+        expected = solution[name](t=t, **kwargs)
+        assert values[name].shape == expected.shape
+        np.testing.assert_allclose(values[name], expected, rtol=1e-10)
+
+    # Scalar coordinates are squeezed
+    name = "Phase-change material temperature [K]"
+    np.testing.assert_allclose(
+        ltes.evaluate(solution, name, t=t, x=0.5 * L, r=0.8 * R),
+        solution[name](t=t, x=0.5 * L, r=0.8 * R),
+        rtol=1e-10,
+    )
+
+    # Scattered points
+    rng = np.random.default_rng(0)
+    t, x, r = rng.uniform([0, 0.05 * L, 0.1 * R], [6000, 0.95 * L, 0.9 * R], (20, 3)).T
+    values = ltes.evaluate(solution, names[:2], t=t, x=x, r=r, points=True)
+    np.testing.assert_allclose(
+        values[names[0]],
+        [solution[names[0]](t=t_i, x=x_i, r=r_i) for t_i, x_i, r_i in zip(t, x, r)],
+        rtol=1e-10,
+    )
+    np.testing.assert_allclose(
+        values[names[1]],
+        [solution[names[1]](t=t_i, x=x_i) for t_i, x_i in zip(t, x)],
+        rtol=1e-10,
+    )
+
+
+def test_comparison_plots_at_mesh_nodes():
+    simulations = []
+    for model, n in [(ltes.FullModel(), 10), (ltes.ReducedModel(), 5)]:
+        var_pts = {model.variables["r [m]"]: n, model.variables["x [m]"]: 2 * n}
+        sim = pybamm.Simulation(model, var_pts=var_pts)
+        sim.solve([0, 6000], t_interp=np.linspace(0, 6000, 61))
+        simulations.append(sim)
+
+    # each simulation is plotted at its own mesh nodes
+    name = "Heat transfer fluid temperature [degC]"
+    _, axes = ltes.compare_1D_variables(simulations, [name], times=[3000])
+    for sim, line in zip(simulations[::-1], axes.flat[0].lines):
+        np.testing.assert_array_equal(line.get_xdata(), sim.mesh["pipe"].nodes)
+        np.testing.assert_allclose(line.get_ydata(), sim.solution[name].entries[:, 30])
+
+    name = "Phase-change material temperature [degC]"
+    _, axes = ltes.compare_2D_variables(simulations, name, times=[0, 3000], xs=[0.5])
+    line = axes.flat[1].lines[-1]
+    sim = simulations[0]
+    np.testing.assert_allclose(line.get_xdata(), sim.mesh["capsule"].nodes * 1000)
+    # the pipe has an even number of nodes, so its middle is between two of them
+    entries = sim.solution[name].entries[:, 9:11, 30]
+    np.testing.assert_allclose(line.get_ydata(), entries.mean(axis=1))
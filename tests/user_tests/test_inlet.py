@@ -0,0 +1,81 @@
+import gc
+import weakref
+
+import casadi
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+
+
+def test_inlet_profile():
+    # two samples at t = 10 are a step, the jump at t = 30 is found from the
+    # threshold, the breakpoint at t = 45 is between samples, and NaNs are dropped
+    profile = ltes.InletProfile(
+        [0, 10, 10, 20, 30, 40, 50, 60],
+        [1, 2, 5, 6, 16, 17, np.nan, 19],
+        breakpoints=[45],
+        jump_threshold=5,
+    )
+    np.testing.assert_array_equal(profile.breakpoints, [10, 30, 45])
+    np.testing.assert_allclose(
+        profile.evaluate([5, 9.999, 10, 15, 29.999, 30, 44.999, 45, 60]),
+        [1.5, 2, 5, 5.5, 6, 16, 17, 19, 19],
+        atol=1e-2,
+    )
+
+    # the interpolant and its derivative, in python and casadi
+    interpolant = profile(pybamm.t)
+    derivative = interpolant.diff(pybamm.t)
+    t = casadi.MX.sym("t")
+    function = casadi.Function(
+        "f", [t], [interpolant.to_casadi(t=t), derivative.to_casadi(t=t)]
+    )
+    for time, value, slope in [(5, 1.5, 0.1), (15, 5.5, 0.1), (35, 16.5, 0.1)]:
+        np.testing.assert_allclose(interpolant.evaluate(t=time), value)
+        np.testing.assert_allclose(derivative.evaluate(t=time), slope)
+        np.testing.assert_allclose(np.array(function(time)).flatten(), [value, slope])
+
+
+def test_inlet_profiles_in_simulation(tmp_path):
+    path = tmp_path / "inlet.csv"
+    t = np.linspace(0, 3600, 3601)
+    T_in = np.where(t < 1800, 343.15, 333.15)
+    timestamps = np.datetime64("2024-03-01T12:00:00") + t.astype("timedelta64[s]")
+    rows = [f"{stamp},{T:.2f}" for stamp, T in zip(timestamps, T_in)]
+    path.write_text("\n".join(["timestamp, T_in", *rows]))
+    temperature = ltes.load_inlet_profile(path, "timestamp", "T_in", jump_threshold=1)
+    np.testing.assert_array_equal(temperature.breakpoints, [1800])
+    # the velocity doubles at t = 900
+    velocity = ltes.InletProfile([0, 900, 900, 3600], [1, 1, 2, 2], scale=6.5e-4)
+
+    T_out = {}
+    for name, profile in [("constant", None), ("step", temperature)]:
+        model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+        param = ltes.set_inlet_profiles(
+            ltes.get_parameter_values("Nallusamy2007"),
+            temperature=profile,
+            velocity=velocity,
+            model=model,
+        )
+        var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+        simulation = ltes.LTESSimulation(model, parameter_values=param, var_pts=var_pts)
+        solution = simulation.solve([0, 3600], t_interp=[0, 1799, 1801, 3600])
+        T_out[name] = solution["Outlet temperature [K]"].entries
+    assert model.breakpoints == [900, 1800]
+    # the outlet temperature is the same until the step, and lower after it
+    np.testing.assert_allclose(T_out["step"][:2], T_out["constant"][:2], rtol=1e-6)
+    assert T_out["step"][-1] < T_out["constant"][-1] - 1
+
+
+def test_inlet_profile_lookup_table():
+    # the interpolants of a profile and their copies share its lookup table, which
+    # is freed with the profile
+    profile = ltes.InletProfile(np.arange(1000), np.sin(np.arange(1000)))
+    interpolant = profile(pybamm.t)
+    copies = [interpolant.create_copy(), interpolant.diff(pybamm.t), profile(pybamm.t)]
+    assert all(copy.lookup_table is interpolant.lookup_table for copy in copies)
+    reference = weakref.ref(interpolant.lookup_table)
+    del profile, interpolant, copies
+    gc.collect()
+    assert reference() is None
@@ -0,0 +1,79 @@
+import numpy as np
+import pybamm
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.kpis import KPI_VARIABLES
+
+
+def test_solve_kpis():
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 10000, 201)
+    solution = pybamm.Simulation(model, var_pts=var_pts).solve([0, 10000], t_interp=t)
+
+    for n_chunks in [1, 3]:
+        kpis, summary = ltes.solve_kpis(
+            model, [0, 10000], t, var_pts=var_pts, n_chunks=n_chunks
+        )
+        np.testing.assert_array_equal(kpis["Time [s]"], t)
+        for name in KPI_VARIABLES:
+            np.testing.assert_allclose(
+                kpis[name], solution[name].entries, rtol=1e-4, atol=1e-4
+            )
+
+        soc = solution["X-averaged state of charge"].entries
+        i = np.argmax(soc >= 0.9)
+        assert t[i - 1] <= summary["Time to 90% state of charge [s]"] <= t[i]
+        T_out = solution["Outlet temperature [K]"].entries
+        np.testing.assert_allclose(
+            summary["Peak outlet temperature [K]"], T_out.max(), rtol=1e-6
+        )
+
+
+def test_kpi_summary_across_chunks():
+    summary = ltes.KPISummary(soc_threshold=0.5)
+    summary.update([0, 1], {"X-averaged state of charge": np.array([0, 0.4])})
+    summary.update([2, 3], {"X-averaged state of charge": np.array([0.6, 1])})
+    assert summary.summary["Time to 50% state of charge [s]"] == 1.5
+
+
+def test_termination_events():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    t_eval = [0, 40000]
+    # the first time at which the outlet temperature is within 0.5 K of the inlet
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 40000, 4001)
+    simulation = ltes.LTESSimulation(model, parameter_values=param, var_pts=var_pts)
+    T_out = simulation.solve(t_eval, t_interp=t)["Outlet temperature [K]"].entries
+    i = np.argmax(T_out >= param["Inlet temperature [K]"] - 0.5)
+
+    for n_chunks in [1, 2]:
+        model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+        var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+        model.add_termination_events(outlet_temperature_difference=0.5)
+        kpis, summary = ltes.solve_kpis(
+            model, t_eval, parameter_values=param, var_pts=var_pts, n_chunks=n_chunks
+        )
+        assert summary["Termination"] == "event: Outlet temperature"
+        assert t[i - 1] <= kpis["Time [s]"][-1] <= t[i]
+
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    model.add_termination_events(soc=0.9, energy_error=5, stored_energy_rate=1)
+    assert len(model.events) == 3
+    kpis, summary = ltes.solve_kpis(
+        model, t_eval, parameter_values=param, var_pts=var_pts, adaptive=True
+    )
+    assert summary["Termination"] == "event: State of charge target"
+    assert kpis["X-averaged state of charge"][-1] >= 0.9
+    assert len(kpis["Time [s]"]) == 101
+
+
+def test_adaptive_times():
+    t = np.linspace(0, 100, 1001)
+    values = {"step": np.tanh(t - 20)}
+    t_adaptive = ltes.get_adaptive_times(t, values, 21)
+    assert t_adaptive[0] == 0
+    assert t_adaptive[-1] == 100
+    # most points are around the step
+    assert np.sum(np.abs(t_adaptive - 20) < 5) > 10
@@ -0,0 +1,65 @@
+import numpy as np
+import pybamm
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def test_output_variable_presets():
+    t = np.linspace(0, 6000, 11)
+    full = ltes.FullModel()
+    var_pts = {full.variables["r [m]"]: 10, full.variables["x [m]"]: 20}
+    solution = pybamm.Simulation(full, var_pts=var_pts).solve([0, 6000], t_interp=t)
+    for preset in ["0D KPIs only", "sensors"]:
+        for model_class in [ltes.FullModel, ltes.ReducedModel]:
+            model = model_class(options={"output variables": preset})
+            names = set(model.variables) - {
+                "Time [s]", "Time [min]", "Time [h]", "r [m]", "r [mm]", "x [m]", "x [mm]"
+            }
+            assert names == set(ltes.OUTPUT_VARIABLE_PRESETS[preset])
+
+        model = ltes.FullModel(options={"output variables": preset})
+        var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+        sim = pybamm.Simulation(model, var_pts=var_pts)
+        restricted = sim.solve([0, 6000], t_interp=t)
+        np.testing.assert_allclose(
+            restricted["Outlet temperature [K]"].entries,
+            solution["Outlet temperature [K]"].entries,
+        )
+
+
+def test_probes():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    model = ltes.FullModel(options={"output variables": "sensors"})
+    names = model.add_probes([(0.5 * L, 0.8 * R), (L, None)])
+    assert names == [
+        "Heat transfer fluid temperature [degC] at probe 0",
+        "Phase-change material temperature [degC] at probe 0",
+        "Heat transfer fluid temperature [degC] at probe 1",
+    ]
+    with pytest.raises(ValueError, match="position in the capsule"):
+        model.add_probe("probe", "Phase-change material temperature [K]", L)
+
+    # Only the probes are stored by the solver
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 6000, 11)
+    sim = ltes.LTESSimulation(
+        model,
+        parameter_values=param,
+        var_pts=var_pts,
+        solver=pybamm.IDAKLUSolver(output_variables=names),
+    )
+    solution = sim.solve([0, 6000], t_interp=t)
+    full = pybamm.Simulation(model, parameter_values=param, var_pts=var_pts).solve(
+        [0, 6000], t_interp=t
+    )
+    np.testing.assert_allclose(
+        solution[names[1]].entries,
+        full["Phase-change material temperature [degC]"](t=t, x=0.5 * L, r=0.8 * R),
+        rtol=1e-6,
+    )
+    np.testing.assert_allclose(
+        solution[names[2]].entries, full["Outlet temperature [degC]"].entries, rtol=1e-6
+    )
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def test_multifidelity_simulation():
+    parameter_values = ltes.get_parameter_values("Nallusamy2007")
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.MultiFidelitySimulation(parameter_values, var_pts=var_pts)
+    t = np.linspace(0, 40000, 201)
+    results = sim.solve([0, 40000], t_interp=t)
+    np.testing.assert_array_equal(results["Time [s]"], t)
+
+    # The thermocline needs the full model until the bed is charged
+    assert [name for _, name in sim.switches] == ["Full model", "Reduced model"]
+    t_switch = sim.switches[-1][0]
+    np.testing.assert_array_equal(results["Full model"], (t > 0) & (t <= t_switch))
+    # the thresholds are relative to the inlet to bed temperature difference, so the
+    # reduced model takes over again well before the end of the run
+    assert t_switch < 30000
+    assert np.mean(~results["Full model"]) > 0.25
+
+    full = ltes.LTESSimulation(
+        ltes.FullModel(), parameter_values=parameter_values, var_pts=var_pts
+    )
+    solution = full.solve([0, 40000], t_interp=t)
+    for name in ["Outlet temperature [K]", "X-averaged state of charge"]:
+        np.testing.assert_allclose(results[name], solution[name].entries, atol=0.02)
+
+    # Averaging a lifted state gives back the state of the reduced model
+    y = sim.reduced.get_state_vector(
+        {"X-averaged phase-change material enthalpy [J.m-3]": 3e8}
+    )
+    np.testing.assert_allclose(sim.average(0, sim.lift(0, y)), y)
+
+    with pytest.raises(ValueError, match="Indicator"):
+        ltes.MultiFidelitySimulation(indicator="energy")
+    with pytest.raises(ValueError, match="lower than the threshold"):
+        ltes.MultiFidelitySimulation(threshold=0.01, uniform_threshold=0.05)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def get_network(parameter_values, area, **kwargs):
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+    flow_rate = (
+        parameter_values["Inlet velocity [m.s-1]"] * parameter_values["Porosity"] * area
+    )
+    network = ltes.StorageNetwork(
+        flow_rate, parameter_values["Inlet temperature [K]"], **kwargs
+    )
+    network.add_column_type(
+        "column",
+        model,
+        parameter_values,
+        inputs=["Capsule radius [m]"],
+        var_pts=var_pts,
+    )
+    return network
+
+
+def test_parallel_columns():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    u = param["Inlet velocity [m.s-1]"]
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+    t = np.linspace(0, 10000, 21)
+    simulation = ltes.LTESSimulation(
+        model,
+        parameter_values=param,
+        inputs=["Inlet velocity [m.s-1]"],
+        var_pts=var_pts,
+    )
+    solution = simulation.solve(
+        [0, 10000], t_interp=t, inputs={"Inlet velocity [m.s-1]": u / 2}
+    )
+
+    # half of the flow goes through a column, and the other half is split between
+    # two columns of half the area through manifolds, so all have half the velocity
+    network = get_network(param, 0.1)
+    network.add_column("single", "column", 0.1)
+    network.add_manifold("split")
+    network.add_manifold("mix")
+    network.connect("inlet", "single", 0.5)
+    network.connect("inlet", "split", 0.5)
+    network.connect("single", "outlet")
+    network.connect("mix", "outlet")
+    for name in ["left", "right"]:
+        network.add_column(name, "column", 0.05)
+        network.connect("split", name, 0.5)
+        network.connect(name, "mix")
+    coupling = network.get_coupling()
+    np.testing.assert_allclose(coupling["Flow fractions"], [0.5, 0.25, 0.25])
+    np.testing.assert_allclose(coupling["b"], [0.5, 0.25, 0.25])
+    assert coupling["A"].nnz == 0
+
+    outputs = network.solve([0, 10000], t_interp=t)
+    np.testing.assert_array_equal(outputs["Time [s]"], t)
+    assert outputs["X-averaged state of charge"].shape == (3, len(t))
+    T_out = solution["Outlet temperature [K]"].entries
+    for i in range(3):
+        np.testing.assert_allclose(
+            outputs["Outlet temperature [K]"][i], T_out, atol=1e-2
+        )
+    np.testing.assert_allclose(
+        outputs["Network outlet temperature [K]"], T_out, atol=1e-2
+    )
+    energy = solution["Stored energy per unit area [J.m-2]"].entries
+    np.testing.assert_allclose(
+        outputs["Network stored energy [J]"], 0.2 * energy, rtol=1e-3
+    )
+
+    # the flow out of each node must be split fully
+    network.connect("split", "right", 0.25)
+    with pytest.raises(ValueError, match="out of 'split' sum to 0.75"):
+        network.solve([0, 10000])
+
+
+def test_series_columns():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    network = get_network(param, 0.1)
+    radii = [0.04, 0.055, 0.07]
+    for i, radius in enumerate(radii):
+        network.add_column(f"stage {i}", "column", 0.1, {"Capsule radius [m]": radius})
+        network.connect("inlet" if i == 0 else f"stage {i - 1}", f"stage {i}")
+    network.connect("stage 2", "outlet")
+    assert network.get_levels() == [["stage 0"], ["stage 1"], ["stage 2"]]
+
+    t = np.linspace(0, 20000, 201)
+    coupled = network.solve([0, 20000], t_interp=t)
+    sweep = network.solve([0, 20000], t_interp=t, method="sweep")
+    T_out = coupled["Outlet temperature [K]"]
+    # the heat front goes through the stages in turn
+    assert T_out[0, -1] > T_out[1, -1] > T_out[2, -1]
+    np.testing.assert_allclose(
+        coupled["Network outlet temperature [K]"], T_out[2], rtol=1e-12
+    )
+    np.testing.assert_allclose(sweep["Outlet temperature [K]"], T_out, atol=0.1)
+
+    # recirculation can only be solved as a whole
+    network.connections[("stage 2", "outlet")] = 0.5
+    network.connect("stage 2", "stage 0", 0.5)
+    with pytest.raises(ValueError, match="recirculation"):
+        network.solve([0, 20000], method="sweep")
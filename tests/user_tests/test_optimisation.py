@@ -0,0 +1,45 @@
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def test_design_optimisation():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 6, model.variables["x [m]"]: 10}
+    optimisation = ltes.DesignOptimisation(
+        param,
+        constraints={
+            "Stored energy per unit area [J.m-2]": (6e7, None),
+            "Maximum outlet temperature [K]": (None, 343),
+        },
+        var_pts=var_pts,
+    )
+
+    # The runs stop at the state of charge target or at the outlet temperature limit
+    designs = [[0.0275, 0.5, 0.46], [0.05, 0.7, 0.5]]
+    charged, stopped = optimisation.evaluate(designs)
+    assert charged["Charged"]
+    assert charged["Final state of charge"] == pytest.approx(0.95)
+    assert charged["Charging time [s]"] < 1e5
+    assert not stopped["Charged"]
+    assert stopped["Termination"] == "event: Maximum outlet temperature"
+    assert optimisation.get_violation(charged) == 0
+    assert optimisation.get_violation(stopped) > 0
+
+    # Repeated designs are memoised
+    optimisation.evaluate(designs)
+    assert len(optimisation.history) == 2
+
+    best = optimisation.optimise(n_initial=8, n_iterations=4, seed=0)
+    assert optimisation.get_violation(best) == 0
+    assert best["Charging time [s]"] <= charged["Charging time [s]"]
+    # the stored energy constraint is active at the optimum
+    assert best["Stored energy per unit area [J.m-2]"] == pytest.approx(6e7, rel=0.1)
+    assert best["Capsule radius [m]"] < 0.0275
+    assert len(optimisation.history) > 8
+
+    with pytest.raises(ValueError, match="Unknown design variables"):
+        ltes.DesignOptimisation(param, bounds={"Inlet velocity [m.s-1]": (0, 1)})
+    with pytest.raises(ValueError, match="Unknown outputs"):
+        ltes.DesignOptimisation(param, objective="Cost")
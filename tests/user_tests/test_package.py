@@ -1,5 +1,24 @@
+import subprocess
+import sys
+
+import pytest
+
 import encapsulated_ltes as m
 
 
 def test_version():
     assert m.__version__
+
+
+def test_lazy_imports():
+    # Plotting and the entry points are only imported when used
+    code = (
+        "import sys, encapsulated_ltes as m; m.FullModel; "
+        "assert 'matplotlib' not in sys.modules; "
+        "assert 'encapsulated_ltes.entry_point' not in sys.modules; "
+        "m.set_plotting_format; assert 'matplotlib' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    assert "set_plotting_format" in dir(m)
+    with pytest.raises(AttributeError, match="no attribute 'plot_everything'"):
+        _ = m.plot_everything
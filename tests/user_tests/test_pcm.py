@@ -0,0 +1,65 @@
+import numpy as np
+import pybamm
+import pytest
+from scipy.special import erf
+
+import encapsulated_ltes as ltes
+
+
+def get_dsc_curve(width=1.5):
+    """Enthalpy of a paraffin melting over a few kelvins around 333.15 K"""
+    T = np.linspace(290, 380, 181)
+    h = 1850 * T + 213000 * 0.5 * (1 + erf((T - 333.15) / width))
+    return T, h
+
+
+def test_pcm_properties():
+    T, h = get_dsc_curve()
+    properties = ltes.PCMProperties(T, h)
+    T_start, T_end = properties.melting_range
+    assert 325 < T_start < 333.15 < T_end < 341
+    np.testing.assert_allclose(properties.T_m, 333.15, atol=1e-2)
+    np.testing.assert_allclose(properties.L, 213000, rtol=1e-2)
+    np.testing.assert_allclose([properties.c_p_s, properties.c_p_l], 1850, rtol=1e-2)
+    fraction = properties.get_liquid_fraction([300, T_start, 333.15, T_end, 370])
+    np.testing.assert_allclose(fraction, [0, 0, 0.5, 1, 1], atol=1e-2)
+
+    with pytest.raises(ValueError, match="increase strictly"):
+        ltes.PCMProperties(T, -h)
+    with pytest.raises(ValueError, match="below and above"):
+        ltes.PCMProperties(T, h, melting_range=(280, 340))
+
+    # the tables of the temperature and the enthalpy are inverse of each other
+    param = ltes.set_pcm_properties(
+        ltes.get_parameter_values("Nallusamy2007"), properties
+    )
+    assert param["Melting temperature [K]"] == properties.T_m
+    T_test = pybamm.Vector(np.array([250, 310, 332, 333.15, 334, 360, 450]))
+    H = param.evaluate(param["PCM enthalpy [J.m-3]"](T_test))
+    y = pybamm.StateVector(slice(0, len(H)))
+    T_of_H = param.process_symbol(param["PCM temperature [K]"](y))
+    np.testing.assert_allclose(T_of_H.evaluate(y=H), T_test.entries, atol=2e-2)
+    # the derivative for the Jacobian is positive, and small during melting
+    dTdH = np.diag(T_of_H.jac(y).evaluate(y=H).toarray())
+    assert np.all(dTdH > 0)
+    assert dTdH[3] < 0.05 * dTdH[1]
+
+
+def test_tabulated_closures():
+    # a narrow melting range approaches the isothermal closures
+    param = ltes.get_parameter_values("Nallusamy2007")
+    tabulated = ltes.set_pcm_properties(
+        param, ltes.PCMProperties(*get_dsc_curve(width=0.3))
+    )
+    outputs = {}
+    for closures, parameter_values in [("smooth", param), ("tabulated", tabulated)]:
+        model = ltes.FullModel(
+            options={"closures": closures, "output variables": "0D KPIs only"}
+        )
+        var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+        simulation = ltes.LTESSimulation(
+            model, parameter_values=parameter_values, var_pts=var_pts
+        )
+        solution = simulation.solve([0, 20000], t_interp=np.linspace(0, 20000, 21))
+        outputs[closures] = solution["Outlet temperature [K]"].entries
+    np.testing.assert_allclose(outputs["tabulated"], outputs["smooth"], atol=0.5)
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+import encapsulated_ltes as ltes
+
+
+def test_profiled_simulation(tmp_path):
+    profiler = ltes.Profiler()
+    with profiler.stage("model"):
+        model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, profiler=profiler)
+    t = np.linspace(0, 10000, 11)
+    solution = sim.solve([0, 10000], t_interp=t)
+
+    report = ltes.get_profile(solution)
+    for stage in [
+        "model",
+        "build",
+        "solve",
+        "solver set-up",
+        "time stepping",
+    ]:
+        assert report.stages[stage]["calls"] == 1
+        assert report.stages[stage]["wall time [s]"] > 0
+    assert report.stages["build"]["peak memory [MB]"] > 0
+    # only the post-processing asked for is recorded
+    assert "post-processing" not in report.stages
+    n_states = solution.y.shape[0]
+    assert report.statistics["number of states"] == n_states
+    assert 0 < report.statistics["Jacobian nnz"] <= n_states**2
+    assert report.statistics["number of steps"] > 0
+
+    path = tmp_path / "profile.json"
+    report.to_json(path)
+    assert json.loads(path.read_text()) == report.to_dict()
+
+    # Solves are added up, and the model is only built once
+    compact = sim.solve([0, 10000], t_interp=t, storage_policy=ltes.StoragePolicy())
+    report = ltes.get_profile(compact)
+    for stage in ["solve", "solver set-up", "time stepping"]:
+        assert report.stages[stage]["calls"] == 2
+    for stage in ["build", "post-processing"]:
+        assert report.stages[stage]["calls"] == 1
+    np.testing.assert_allclose(
+        ltes.evaluate(compact, "Outlet temperature [K]", t=t),
+        ltes.evaluate(solution, "Outlet temperature [K]", t=t),
+        atol=1e-2,
+    )
+
+    assert ltes.get_profile(ltes.LTESSimulation(model).solve([0, 100])) is None
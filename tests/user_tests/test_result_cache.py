@@ -0,0 +1,96 @@
+import numpy as np
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.result_cache import get_cache_key
+
+
+def test_result_cache(tmp_path, monkeypatch):
+    cache = ltes.ResultCache(tmp_path)
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 6000, 61)
+
+    sim = ltes.LTESSimulation(model, var_pts=var_pts)
+    solution = sim.solve([0, 6000], t_interp=t, cache=cache)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    # A hit does not build the model
+    sim = ltes.LTESSimulation(model, var_pts=var_pts)
+    cached = sim.solve([0, 6000], t_interp=t, cache=cache)
+    assert sim.built_model is None
+    assert sim.solution is cached
+    name = "Phase-change material temperature [K]"
+    np.testing.assert_array_equal(cached[name].entries, solution[name].entries)
+    np.testing.assert_allclose(
+        ltes.evaluate(cached, name, t=3000, x=0.1, r=0.01),
+        ltes.evaluate(solution, name, t=3000, x=0.1, r=0.01),
+    )
+    assert cached.report == solution.report
+
+    # Any change in the configuration is a miss
+    param = model.default_parameter_values
+    param["Heat transfer coefficient [W.m-2.K-1]"] = 1000
+    sim = ltes.LTESSimulation(model, parameter_values=param, var_pts=var_pts)
+    sim.solve([0, 6000], t_interp=t, cache=cache)
+    sim = ltes.LTESSimulation(model, var_pts=var_pts)
+    sim.solve([0, 6000], t_interp=t[::2], cache=cache)
+    assert len(list(tmp_path.glob("*.npz"))) == 3
+
+    # Each input of a batch is cached separately, and only the misses are solved
+    name = "Heat transfer coefficient [W.m-2.K-1]"
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, inputs=[name])
+    single = sim.solve([0, 6000], t_interp=t, inputs={name: 500}, cache=cache)
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, inputs=[name])
+    batch = sim.solve(
+        [0, 6000], t_interp=t, inputs=[{name: 500}, {name: 1000}], cache=cache
+    )
+    assert all(isinstance(s, ltes.CompactSolution) for s in batch)
+    assert batch[0].report == single.report
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, inputs=[name])
+    cached = sim.solve(
+        [0, 6000], t_interp=t, inputs=[{name: 500}, {name: 1000}], cache=cache
+    )
+    assert sim.built_model is None
+    outlet = "Outlet temperature [K]"
+    for hit, result in zip(cached, batch):
+        np.testing.assert_array_equal(hit[outlet].entries, result[outlet].entries)
+    assert len(list(tmp_path.glob("*.npz"))) == 5
+
+    # Least recently used results are evicted
+    size = cache.size
+    cache.max_size = size / 2
+    cache.evict()
+    assert 0 < cache.size <= size / 2
+
+    # Opt-out
+    monkeypatch.setenv("ENCAPSULATED_LTES_NO_CACHE", "1")
+    cache = ltes.ResultCache(tmp_path / "disabled")
+    sim.solve([0, 6000], t_interp=t, cache=cache)
+    assert not (tmp_path / "disabled").exists()
+
+
+def make_inlet_temperature(T):
+    return lambda t: T + 0 * t
+
+
+def test_cache_key_of_functions():
+    model = ltes.ReducedModel()
+    keys = []
+    for function in [
+        make_inlet_temperature(343.15),
+        make_inlet_temperature(353.15),
+        make_inlet_temperature(343.15),
+    ]:
+        param = model.default_parameter_values
+        param["Inlet temperature [K]"] = function
+        sim = ltes.LTESSimulation(model, parameter_values=param)
+        keys.append(get_cache_key(sim, [0, 6000]))
+    # functions are identified by the values of their closure
+    assert keys[0] != keys[1]
+    assert keys[0] == keys[2]
+
+    # functions without source code are never found in the cache
+    param = model.default_parameter_values
+    param["Inlet temperature [K]"] = eval("lambda t: 343.15 + 0 * t")
+    sim = ltes.LTESSimulation(model, parameter_values=param)
+    assert get_cache_key(sim, [0, 6000]) != get_cache_key(sim, [0, 6000])
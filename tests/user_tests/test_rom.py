@@ -0,0 +1,65 @@
+import itertools
+
+import numpy as np
+import pybamm
+import pytest
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.rom import deim_indices, randomized_svd
+
+INPUTS = ["Inlet temperature [K]", "Inlet velocity [m.s-1]"]
+
+
+def test_randomized_svd():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((60, 8)) @ rng.standard_normal((8, 40))
+    U, S = randomized_svd(X, 8, seed=0)
+    np.testing.assert_allclose(S, np.linalg.svd(X, compute_uv=False)[:8])
+    np.testing.assert_allclose(U @ (U.T @ X), X, atol=1e-10)
+
+    # DEIM interpolates the columns of the basis exactly
+    indices = deim_indices(U)
+    assert len(set(indices)) == 8
+    np.testing.assert_allclose(U @ np.linalg.solve(U[indices], U[indices]), U)
+
+
+def test_reduced_order_model():
+    model = ltes.FullModel(options={"closures": "smooth"})
+    var_pts = {model.variables["r [m]"]: 20, model.variables["x [m]"]: 40}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, inputs=INPUTS)
+    rom = ltes.ReducedOrderModel(sim, seed=0)
+    t = np.linspace(0, 6000, 61)
+    with pytest.raises(ValueError, match="trained first"):
+        rom.solve(t)
+
+    training = [
+        dict(zip(INPUTS, values))
+        for values in itertools.product([340, 345, 350], [5e-4, 7.5e-4, 1e-3])
+    ]
+    rom.train(training, t)
+    assert list(rom.rank) == list(sim.state_slices)[:3]
+
+    # inputs outside the training set
+    inputs = dict(zip(INPUTS, (343, 6.3e-4)))
+    solution = rom.solve(t, inputs)
+    assert isinstance(solution, pybamm.Solution)
+    outputs = rom.solve(t, inputs, variables=["Outlet temperature [K]"])
+    np.testing.assert_array_equal(outputs["Time [s]"], t)
+    np.testing.assert_allclose(
+        outputs["Outlet temperature [K]"],
+        solution["Outlet temperature [K]"].entries,
+        atol=1e-10,
+    )
+
+    report = rom.validate(t, inputs)
+    for error in report["Projection error"].values():
+        assert error < 0.05
+    for error in report["Reduced-order model error"].values():
+        assert error < 0.15
+    # the inlet to bed temperature difference is 38 K
+    assert report["Outlet temperature error [K]"] < 1.5
+    energy = report["Relative error in energy conservation [%]"]
+    assert energy["Reduced-order model"] < 2
+
+    with pytest.raises(TypeError, match="full model"):
+        ltes.ReducedOrderModel(ltes.LTESSimulation(ltes.ReducedModel()))
@@ -0,0 +1,45 @@
+import numpy as np
+import pybamm
+import pytest
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.sensitivities import SENSITIVITY_PARAMETERS
+
+
+@pytest.mark.parametrize("model_class", [ltes.ReducedModel, ltes.FullModel])
+def test_sensitivities_against_finite_differences(model_class):
+    model = model_class(options={"closures": "smooth"})
+    param = ltes.get_parameter_values("Nallusamy2007")
+    sim = ltes.LTESSimulation(
+        model,
+        parameter_values=param,
+        inputs=SENSITIVITY_PARAMETERS,
+        var_pts={model.variables["r [m]"]: 6, model.variables["x [m]"]: 12},
+        solver=pybamm.IDAKLUSolver(rtol=1e-10, atol=1e-10),
+    )
+    # the full model has the algebraic constraint of the PCM temperature
+    errors = ltes.check_sensitivities(
+        sim, [0, 10000], t_interp=np.linspace(0, 10000, 51), step=1e-4
+    )
+    for variable_errors in errors.values():
+        for error in variable_errors.values():
+            assert error < 1e-3
+
+    # Spatial variables keep the shape of the entries
+    solution = sim.solve(
+        [0, 1000], t_interp=np.linspace(0, 1000, 11), calculate_sensitivities=True
+    )
+    sensitivities = ltes.get_sensitivities(
+        solution, ["Heat transfer fluid temperature [K]"], ["Porosity"]
+    )
+    assert sensitivities["Heat transfer fluid temperature [K]"]["Porosity"].shape == (
+        12,
+        11,
+    )
+
+
+def test_model_options():
+    with pytest.raises(pybamm.OptionError):
+        ltes.FullModel(options={"closures": "wrong"})
+    with pytest.raises(pybamm.OptionError):
+        ltes.FullModel(options={"wrong": "smooth"})
@@ -0,0 +1,57 @@
+import asyncio
+
+import numpy as np
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.service import PredictionService
+
+
+def test_batched_requests():
+    service = PredictionService(var_pts={"r": 5, "x": 10}, max_wait=0.05)
+    requests = [
+        {"id": 0, "model": "Reduced model", "t_eval": [0, 3000]},
+        {
+            "id": 1,
+            "model": "Reduced model",
+            "t_eval": [0, 3000],
+            "inputs": {"Heat transfer coefficient [W.m-2.K-1]": 1000},
+        },
+        {
+            "id": 2,
+            "model": "Reduced model",
+            "t_eval": [0, 3000],
+            "inlet temperature": [[0, 343.15], [1500, 353.15]],
+        },
+        {"id": 3, "model": "Unknown model", "t_eval": [0, 3000]},
+    ]
+
+    async def run():
+        await service.start()
+        try:
+            return await asyncio.gather(*[service.predict(r) for r in requests])
+        finally:
+            await service.stop()
+
+    responses = asyncio.run(run())
+
+    assert responses[0]["metrics"]["batch size"] == 2
+    assert responses[1]["metrics"]["batch size"] == 2
+    assert "error" in responses[3]
+    for response in responses[:3]:
+        assert len(response["variables"]["Time [s]"]) == 101
+
+    # Compare against a direct solve
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 5, model.variables["x [m]"]: 10}
+    param = ltes.get_parameter_values("Nallusamy2007")
+    sim = ltes.LTESSimulation(model, parameter_values=param, var_pts=var_pts)
+    sol = sim.solve([0, 3000], t_interp=np.linspace(0, 3000, 101))
+    np.testing.assert_allclose(
+        responses[0]["variables"]["Outlet temperature [K]"],
+        sol["Outlet temperature [K]"].entries,
+        rtol=1e-5,
+    )
+
+    # A higher inlet temperature in the second half heats the outlet more
+    T_out = np.array(responses[2]["variables"]["Outlet temperature [K]"])
+    assert T_out[-1] > responses[0]["variables"]["Outlet temperature [K]"][-1]
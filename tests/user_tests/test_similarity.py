@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import encapsulated_ltes as ltes
+
+
+def get_var_pts(model):
+    return {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+
+
+def test_dimensionless_groups():
+    param = ltes.get_parameter_values("Nallusamy2007")
+    groups = ltes.get_dimensionless_groups(param)
+    assert groups["Biot number"] == pytest.approx(100 * 27.5e-3 / 0.4)
+
+    # A different design with the same groups has the same dimensionless response
+    other = param.copy()
+    other.update(
+        {
+            "Capsule radius [m]": 0.02,
+            "Pipe length [m]": 1.0,
+            "Solid phase density [kg.m-3]": 1200,
+            "Latent heat [J.kg-1]": 180000,
+            "Melting temperature [K]": 350,
+        }
+    )
+    other = ltes.set_dimensionless_groups(groups, other)
+    other_groups = ltes.get_dimensionless_groups(other)
+    for name, value in groups.items():
+        assert other_groups[name] == pytest.approx(value)
+
+    responses = []
+    for parameter_values in [param, other]:
+        scales = ltes.get_scales(parameter_values)
+        t = np.linspace(0, 2, 21) * scales["Time scale [s]"]
+        model = ltes.FullModel()
+        sim = ltes.LTESSimulation(
+            model, parameter_values=parameter_values, var_pts=get_var_pts(model)
+        )
+        T_out = sim.solve([0, t[-1]], t_interp=t)["Outlet temperature [K]"].entries
+        responses.append(
+            (T_out - scales["Melting temperature [K]"])
+            / scales["Temperature difference [K]"]
+        )
+    np.testing.assert_allclose(*responses, atol=1e-3)
+
+    with pytest.raises(ValueError, match="Unknown dimensionless groups"):
+        ltes.set_dimensionless_groups({"Reynolds number": 1}, param)
+
+
+def test_similarity_library(tmp_path):
+    param = ltes.get_parameter_values("Nallusamy2007")
+    model = ltes.FullModel()
+    grid = {
+        "Biot number": np.geomspace(2, 20, 5),
+        "Peclet number": np.geomspace(2, 8, 5),
+    }
+    library = ltes.SimilarityLibrary.build(
+        grid, t_max=6, n_t=61, model=model, var_pts=get_var_pts(model)
+    )
+
+    design = ltes.set_dimensionless_groups(
+        {"Biot number": 7, "Peclet number": 5}, param
+    )
+    prediction = library.predict(design)
+    model = ltes.FullModel()
+    sim = ltes.LTESSimulation(
+        model, parameter_values=design, var_pts=get_var_pts(model)
+    )
+    t = prediction["Time [s]"]
+    solution = sim.solve([0, t[-1]], t_interp=t)
+    # The error estimate is of the order of the actual error
+    for name in ["Outlet temperature [K]", "X-averaged state of charge"]:
+        error = np.max(np.abs(prediction[name] - solution[name].entries))
+        assert error <= 2 * prediction[f"{name} error"]
+
+    # Many designs at once, and the library round-trips through a file
+    groups = {"Biot number": [3, 4, 10], "Peclet number": 2.5}
+    path = tmp_path / "library.npz"
+    library.save(path)
+    loaded = ltes.SimilarityLibrary.load(path)
+    assert loaded.fixed == library.fixed
+    results = loaded(groups)
+    assert results["Outlet temperature [K]"].shape == (3, 61)
+    np.testing.assert_array_equal(
+        results["X-averaged state of charge"],
+        library(groups)["X-averaged state of charge"],
+    )
+
+    with pytest.raises(ValueError, match="outside the range"):
+        library({"Biot number": 30, "Peclet number": 5})
+    with pytest.raises(ValueError, match="is fixed"):
+        library({"Biot number": 7, "Peclet number": 5, "Porosity": 0.3})
@@ -0,0 +1,56 @@
+import numpy as np
+import pybamm
+import pytest
+
+import encapsulated_ltes as ltes
+
+pytest.importorskip("h5py")
+
+
+def test_stored_solution(tmp_path):
+    param = ltes.get_parameter_values("Nallusamy2007")
+    L = param["Pipe length [m]"]
+    R = param["Capsule radius [m]"]
+    model = ltes.FullModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    t = np.linspace(0, 6000, 101)
+    sim = pybamm.Simulation(model, parameter_values=param, var_pts=var_pts)
+    solution = sim.solve([0, 6000], t_interp=t)
+    ltes.write_solution(tmp_path / "solution.h5", sim, chunk_size=16)
+
+    with ltes.StoredSolution(tmp_path / "solution.h5") as stored:
+        for name in [
+            "Phase-change material temperature [degC]",
+            "Heat transfer fluid temperature [K]",
+            "X-averaged state of charge",
+        ]:
+            np.testing.assert_allclose(
+                stored[name].entries, solution[name].entries, atol=1e-10
+            )
+        name = "Phase-change material temperature [degC]"
+        t_probe = np.linspace(0, 6000, 37)
+        np.testing.assert_allclose(
+            stored[name](t=t_probe, x=0.5 * L, r=0.8 * R),
+            solution[name](t=t_probe, x=0.5 * L, r=0.8 * R),
+            rtol=1e-6,
+        )
+
+
+def test_solve_to_file(tmp_path):
+    model = ltes.ReducedModel()
+    var_pts = {model.variables["r [m]"]: 10, model.variables["x [m]"]: 20}
+    sim = ltes.LTESSimulation(model, var_pts=var_pts, initial_state_input=True)
+    t = np.linspace(0, 6000, 101)
+    stored = ltes.solve_to_file(
+        sim, tmp_path / "solution.h5", [0, 6000], t, n_chunks=4, chunk_size=16
+    )
+    solution = sim.solve([0, 6000], t_interp=t)
+    np.testing.assert_array_equal(stored.t, t)
+    name = "Outlet temperature [K]"
+    np.testing.assert_allclose(stored[name].entries, solution[name].entries, rtol=1e-4)
+    stored.close()
+
+    with pytest.raises(ValueError, match="initial_state_input"):
+        ltes.solve_to_file(
+            ltes.LTESSimulation(model, var_pts=var_pts), tmp_path / "s.h5", [0, 1], t
+        )
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import encapsulated_ltes as ltes
+from encapsulated_ltes.uq import UQ_VARIABLES, sample
+
+
+def test_streaming_statistics():
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal((2000, 3)) * [1, 2, 3]
+    statistics = ltes.StreamingStatistics()
+    for start in range(0, len(values), 64):
+        statistics.update(values[start : start + 64])
+
+    assert statistics.count == len(values)
+    np.testing.assert_allclose(statistics.mean, values.mean(axis=0))
+    np.testing.assert_allclose(statistics.variance, values.var(axis=0, ddof=1))
+    for p, quantile in statistics.quantiles.items():
+        error = np.abs(quantile - np.quantile(values, p, axis=0))
+        assert np.all(error < 0.1 * np.array([1, 2, 3]))
+
+
+def test_sobol_indices_ishigami():
+    d = 3
+    distribution = stats.uniform(-np.pi, 2 * np.pi)
+    samples = sample(
+        {i: distribution for i in range(2 * d)}, 4096, method="sobol", seed=0
+    )
+
+    def ishigami(x):
+        x1, x2, x3 = x[..., 0], x[..., 1], x[..., 2]
+        return (np.sin(x1) + 7 * np.sin(x2) ** 2 + 0.1 * x3**4 * np.sin(x1))[..., None]
+
+    indices = ltes.StreamingSobolIndices(d)
+    for start in range(0, len(samples), 128):
+        A = samples[start : start + 128, :d]
+        B = samples[start : start + 128, d:]
+        AB = np.tile(A, (d, 1, 1))
+        for i in range(d):
+            AB[i, :, i] = B[:, i]
+        indices.update(ishigami(A), ishigami(B), ishigami(AB))
+
+    np.testing.assert_allclose(indices.first_order[:, 0], [0.314, 0.442, 0], atol=0.02)
+    np.testing.assert_allclose(indices.total[:, 0], [0.558, 0.442, 0.244], atol=0.02)
+
+
+def test_uncertainty_study():
+    model = ltes.FullModel(options={"output variables": "0D KPIs only"})
+    distributions = {
+        "Heat transfer coefficient [W.m-2.K-1]": stats.uniform(80, 40),
+        "Latent heat [J.kg-1]": stats.norm(213000, 10000),
+    }
+    study = ltes.UncertaintyStudy(
+        distributions,
+        model=model,
+        parameter_values=ltes.get_parameter_values("Nallusamy2007"),
+        var_pts={model.variables["r [m]"]: 4, model.variables["x [m]"]: 6},
+    )
+    t_eval = [0, 5000]
+    t_interp = np.linspace(0, 5000, 11)
+    statistics = study.run(16, t_eval, t_interp=t_interp, batch_size=5, seed=0)
+
+    samples = sample(distributions, 16, seed=0)
+    values = study.evaluate(samples, t_eval, t_interp)
+    for name in UQ_VARIABLES:
+        assert statistics[name].count == 16
+        np.testing.assert_allclose(statistics[name].mean, values[name].mean(axis=0))
+
+    study.run(4, t_eval, t_interp=t_interp, sobol_indices=True, seed=0)
+    indices = study.sobol_indices["Outlet temperature [K]"]
+    assert indices.count == 4
+    assert indices.first_order.shape == (2, len(t_interp))
+    assert study.statistics["Outlet temperature [K]"].count == 8
+
+    with pytest.raises(ValueError, match="Sampling method"):
+        sample(distributions, 4, method="grid")
+    with pytest.raises(ValueError, match="power of 2, not 12"):
+        study.run(12, t_eval)
+    assert sample(distributions, 12, method="lhs", seed=0).shape == (12, 2)